@@ -0,0 +1,88 @@
+"""
+Command Line Tools
+------------------
+
+Run from the backend directory:
+    python -m app.cli export --format parquet --output clients.parquet [--include-last-login]
+    python -m app.cli import-clients partners.csv [--format ndjson] [--errors errors.ndjson]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+def _export(args):
+    from .services.clients import ClientService
+    from .utils.columnar import pyarrow_available
+
+    if args.format in ("arrow", "parquet") and not pyarrow_available():
+        sys.exit("Columnar exports require pyarrow")
+
+    async def run():
+        if args.format in ("arrow", "parquet"):
+            stream = ClientService.export_columnar(args.format, args.include_last_login)
+        elif args.format == "csv":
+            stream = ClientService.export_csv()
+        else:
+            stream = ClientService.export_ndjson()
+        with open(args.output, "wb") as output:
+            async for data in stream:
+                output.write(data)
+
+    asyncio.run(run())
+    print(f"Clients exported to {args.output}")
+
+def _import_clients(args):
+    from .services.imports import run_import
+
+    # The checkpoint file holds the last committed row; rerunning resumes after it
+    checkpoint_path = args.checkpoint or f"{args.input}.checkpoint"
+    start_row = 0
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as checkpoint:
+            start_row = json.load(checkpoint)["checkpoint_row"]
+        print(f"Resuming after row {start_row}")
+
+    with open(args.input, encoding="utf-8-sig") as source:
+        text = source.read()
+
+    written_errors = 0
+    def on_chunk(progress):
+        nonlocal written_errors
+        with open(args.errors, "a") as errors:
+            for error in progress["errors"][written_errors:]:
+                errors.write(json.dumps(error) + "\n")
+        written_errors = len(progress["errors"])
+        with open(checkpoint_path, "w") as checkpoint:
+            json.dump({"checkpoint_row": progress["checkpoint_row"]}, checkpoint)
+        print(f"Row {progress['checkpoint_row']}: {progress['clients_created']} created, {written_errors} errors")
+
+    progress = run_import(text, args.format, start_row, on_chunk)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"Import finished: {progress['clients_created']} clients created, {len(progress['errors'])} rows failed (see {args.errors})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Export all clients to a file")
+    export.add_argument("--format", choices=["ndjson", "csv", "arrow", "parquet"], default="parquet")
+    export.add_argument("--output", required=True)
+    export.add_argument("--include-last-login", action="store_true")
+    export.set_defaults(handler=_export)
+
+    import_clients = commands.add_parser("import-clients", help="Create clients in bulk from CSV or NDJSON")
+    import_clients.add_argument("input")
+    import_clients.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    import_clients.add_argument("--errors", default="import-errors.ndjson", help="Per-row errors are appended here")
+    import_clients.add_argument("--checkpoint", help="Defaults to <input>.checkpoint")
+    import_clients.set_defaults(handler=_import_clients)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
 import os
+from typing import List
 
 print("\n=== Loading Environment Variables ===")
 load_dotenv()
@@ -13,13 +14,80 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = os.getenv("SUPABASE_URL")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
     JWT_SECRET: str = os.getenv("JWT_SECRET")
-    JWT_ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
+    JWT_ALGORITHM: str = "HS256"  # HS256, or EdDSA/ES256 with keys from JWT_KEYS_DIR
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # Short-lived; renewed through /auth/refresh
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours, sliding on every refresh
+
+    # Asymmetric signing settings (used when JWT_ALGORITHM is EdDSA or ES256)
+    JWT_KEYS_DIR: str = os.getenv("JWT_KEYS_DIR", "keys")  # One PEM per key, file stem is the kid
+    JWT_SIGNING_KID: str = os.getenv("JWT_SIGNING_KID", "")  # Defaults to the last private key by name
+    JWKS_CACHE_MAX_AGE_SECONDS: int = 86400  # 24 hours
+
+    # Logout revocation settings
+    TOKEN_DENYLIST_SYNC_SECONDS: int = 5  # How quickly other workers see a logout
+
+    # Session activity settings
+    SESSION_ACTIVITY_FLUSH_SECONDS: int = 60  # Max write rate of Sessions.last_activity per session
+    SESSION_IDLE_TIMEOUT_MINUTES: int = 1440  # Sessions idle longer than this cannot be refreshed
+    MAX_SESSIONS_PER_CLIENT: int = 10  # Oldest sessions are evicted at login beyond this; 0 for no limit
+
+    # Expired row sweeper settings
+    EXPIRY_SWEEP_INTERVAL_SECONDS: int = 300  # 5 minutes
+    EXPIRY_SWEEP_JITTER_SECONDS: int = 60
+    EXPIRY_SWEEP_BATCH_SIZE: int = 500
+    EXPIRY_SWEEP_TIME_BUDGET_SECONDS: int = 10
+
+    # Soft-deleted client purge settings
+    CLIENT_PURGE_INTERVAL_SECONDS: int = 300  # 5 minutes
+    CLIENT_PURGE_BATCH_SIZE: int = 200
     
     # Password reset settings
     PASSWORD_RESET_TOKEN_EXPIRE_MINUTES: int = 30  # 30 minutes
+    PASSWORD_RESET_MIN_INTERVAL_SECONDS: int = 60  # At most one reset email per client per window
+    PASSWORD_RESET_TOKEN_FORMAT: str = "database"  # "database" (ResetTokens rows) or "stateless" (HMAC-signed)
+    PASSWORD_RESET_CAMPAIGN_CHUNK_SIZE: int = 500
+    PASSWORD_RESET_CAMPAIGN_EMAILS_PER_SECOND: float = 20
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")  # Default to local development
 
+    # Bulk client import settings
+    CLIENT_IMPORT_CHUNK_SIZE: int = 1000
+    CLIENT_IMPORT_HASH_WORKERS: int = 0  # Password hashing processes; 0 uses every CPU
+
+    # Change feed settings
+    CHANGE_FEED_SAFETY_LAG_SECONDS: int = 5  # Newer changes wait until in-flight transactions have committed
+    
+    # Response compression settings
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Smaller bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # Per-request brotli; snapshots use a higher quality once per version
+    
+    # Client search settings
+    CLIENT_SEARCH_BACKEND: str = "database"  # "database" (pg_trgm) or "memory" (per-worker index fed by the change feed)
+    CLIENT_SEARCH_SYNC_SECONDS: int = 10
+    CLIENT_SEARCH_MIN_SIMILARITY: float = 0.3  # Trigram similarity below which fuzzy matches are dropped
+
+    # Admin settings
+    ADMIN_CLIENT_IDS: List[int] = []  # Client IDs allowed to use the /admin endpoints
+
+    # Email settings (emails are only logged when SMTP_HOST is empty)
+    SMTP_HOST: str = os.getenv("SMTP_HOST", "")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USERNAME: str = os.getenv("SMTP_USERNAME", "")
+    SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
+    SMTP_USE_TLS: bool = True
+    SMTP_POOL_SIZE: int = 2
+    EMAIL_FROM: str = os.getenv("EMAIL_FROM", "no-reply@localhost")
+    EMAIL_DEFAULT_LOCALE: str = "en"  # Must have a directory in app/templates/email
+    EMAIL_OUTBOX_POLL_SECONDS: int = 5
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 7  # Sent and failed emails (bodies hold reset links) are deleted after this
+
+    # Verified-credential cache settings (opt-in)
+    CREDENTIAL_CACHE_ENABLED: bool = False
+    CREDENTIAL_CACHE_TTL_SECONDS: int = 300  # 5 minutes
+    CREDENTIAL_CACHE_MAX_ENTRIES: int = 1024
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -1,8 +1,21 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import auth, clients
+from fastapi.responses import ORJSONResponse
+from .routes import auth, clients, admin
 from .config.settings import settings
 from .database.supabase import supabase
+from .utils.security import get_jwks_json
+from .utils.denylist import token_denylist
+from .utils.activity import session_activity
+from .utils.sweeper import ExpirySweeper, DeletedClientPurger
+from .utils.email import outbox_worker, email_transport
+from .utils.background import run_periodically, cancel_tasks
+from .utils.search_index import client_search_index
+from .utils.compression import CompressionMiddleware
+from .services.clients import ClientService
+from .services.imports import shutdown_hash_pool
+import asyncio
 
 # Define allowed origins
 origins = [
@@ -12,13 +25,76 @@ origins = [
     "http://127.0.0.1:5173"
 ]
 
+expiry_sweeper = ExpirySweeper(
+    batch_size=settings.EXPIRY_SWEEP_BATCH_SIZE,
+    time_budget_seconds=settings.EXPIRY_SWEEP_TIME_BUDGET_SECONDS
+)
+
+client_purger = DeletedClientPurger(
+    batch_size=settings.CLIENT_PURGE_BATCH_SIZE,
+    time_budget_seconds=settings.EXPIRY_SWEEP_TIME_BUDGET_SECONDS
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start periodic maintenance jobs; they are cancelled on shutdown
+    tasks = [
+        asyncio.create_task(run_periodically(
+            "token-denylist-sync",
+            settings.TOKEN_DENYLIST_SYNC_SECONDS,
+            lambda: token_denylist.sync(supabase)
+        )),
+        asyncio.create_task(run_periodically(
+            "session-activity-flush",
+            settings.SESSION_ACTIVITY_FLUSH_SECONDS,
+            lambda: session_activity.flush(supabase)
+        )),
+        asyncio.create_task(run_periodically(
+            "expiry-sweeper",
+            settings.EXPIRY_SWEEP_INTERVAL_SECONDS,
+            lambda: expiry_sweeper.run(supabase),
+            jitter_seconds=settings.EXPIRY_SWEEP_JITTER_SECONDS
+        )),
+        asyncio.create_task(run_periodically(
+            "client-purger",
+            settings.CLIENT_PURGE_INTERVAL_SECONDS,
+            lambda: client_purger.run(supabase),
+            jitter_seconds=settings.EXPIRY_SWEEP_JITTER_SECONDS
+        )),
+        asyncio.create_task(run_periodically(
+            "email-outbox",
+            settings.EMAIL_OUTBOX_POLL_SECONDS,
+            lambda: outbox_worker.drain(supabase)
+        )),
+    ]
+    if settings.CLIENT_SEARCH_BACKEND == "memory":
+        client_search_index.similarity_threshold = settings.CLIENT_SEARCH_MIN_SIMILARITY
+        tasks.append(asyncio.create_task(run_periodically(
+            "client-search-index",
+            settings.CLIENT_SEARCH_SYNC_SECONDS,
+            lambda: client_search_index.sync(ClientService.fetch_changes)
+        )))
+    try:
+        yield
+    finally:
+        await cancel_tasks(tasks)
+        # Don't lose the activity recorded since the last flush
+        try:
+            await asyncio.to_thread(session_activity.flush, supabase)
+        except Exception:
+            pass
+        email_transport.close()
+        await asyncio.to_thread(shutdown_hash_pool)
+
 app = FastAPI(
     title="Client Authentication API",
     description="API for client authentication and management",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -30,18 +106,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresses large bodies, streaming exports included; added after CORS so it
+# wraps it and sees the final headers
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(clients.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Client Authentication API"}
 
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks():
+    # Consumers cache this and verify tokens locally; a new kid is published
+    # well before it signs anything, so a long max-age is safe across rotation
+    return Response(
+        content=get_jwks_json(),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE_SECONDS}"}
+    )
+
 @app.get("/health/database")
 async def check_db():
     try:
-        result = supabase.table("Clients").select("count", count="exact").execute()
+        result = supabase.table("Clients").select("count", count="exact").is_("deleted_at", "null").execute()
         return {"status": "connected", "client_count": result.count}
     except Exception as e:
-        return {"status": "error", "message": str(e)} 
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
+
+@app.get("/health/sweeper")
+async def check_sweeper():
+    return {"expiry": expiry_sweeper.metrics, "client_purge": client_purger.metrics}
+
+@app.get("/health/email")
+async def check_email():
+    return outbox_worker.metrics
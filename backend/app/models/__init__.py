@@ -1,2 +1,5 @@
-from .client import ClientBase, ClientCreate, ClientUpdate, ClientInDB, ClientResponse
-from .auth import Token, LoginRequest, SessionCreate 
\ No newline at end of file
+from .client import (
+    ClientBase, ClientCreate, ClientUpdate, ClientInDB, ClientResponse,
+    ClientBatchIds, ClientBatchUpdate, ClientBatchUpdateItem, ClientBatchItemResult, ClientBatchResponse
+)
+from .auth import Token, LoginRequest, SessionCreate, SessionResponse, SessionPage, RefreshRequest 
\ No newline at end of file
@@ -1,9 +1,16 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from datetime import datetime
+from typing import List, Optional
+import re
 
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class LoginRequest(BaseModel):
     email: str
@@ -16,13 +23,51 @@ class SessionCreate(BaseModel):
     client_id: int
     expires_at: datetime
 
+class SessionResponse(BaseModel):
+    session_id: str
+    client_id: int
+    created_at: datetime
+    expires_at: Optional[datetime] = None
+    last_activity: Optional[datetime] = None
+
+class SessionPage(BaseModel):
+    sessions: List[SessionResponse]
+    next_cursor: Optional[str] = None  # Pass as `after` to fetch the next page
+
 # New models for forgot password functionality
 class PasswordResetRequest(BaseModel):
     email: str
+    locale: Optional[str] = None  # Language of the reset email, e.g. "es"
 
 class PasswordResetTokenVerify(BaseModel):
     token: str
 
 class PasswordReset(BaseModel):
     token: str
-    new_password: str 
\ No newline at end of file
+    new_password: str
+
+class PasswordResetCampaignRequest(BaseModel):
+    # Clients matching all given filters get a reset email; at least one is required
+    client_ids: Optional[List[int]] = None
+    email_domain: Optional[str] = None
+    created_before: Optional[datetime] = None
+    locale: Optional[str] = None
+
+    @field_validator('email_domain')
+    def validate_email_domain(cls, v):
+        # Matched with ILIKE, so wildcards such as "%" and "_" must not get through
+        if v is not None:
+            if not re.match(r"^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", v):
+                raise ValueError(f"Invalid email domain: {v}")
+            return v.lower()
+        return v
+
+class PasswordResetCampaignStatus(BaseModel):
+    campaign_id: str
+    status: str  # "running", "completed" or "failed"
+    clients_processed: int
+    tokens_issued: int
+    emails_queued: int
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
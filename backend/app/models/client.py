@@ -1,8 +1,11 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import re
 
+# Upper bound on ids/updates accepted by the /clients batch endpoints
+CLIENT_BATCH_MAX_ITEMS = 100
+
 class ClientBase(BaseModel):
     client_name: str
     email: str
@@ -35,4 +38,52 @@ class ClientInDB(ClientBase):
     update_at: Optional[datetime] = None
 
 class ClientResponse(ClientInDB):
-    pass 
\ No newline at end of file
+    pass
+
+class ClientBatchIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=CLIENT_BATCH_MAX_ITEMS)
+
+class ClientBatchUpdateItem(ClientUpdate):
+    id: int
+
+class ClientBatchUpdate(BaseModel):
+    updates: List[ClientBatchUpdateItem] = Field(..., min_length=1, max_length=CLIENT_BATCH_MAX_ITEMS)
+
+class ClientBatchItemResult(BaseModel):
+    id: int
+    status: int  # HTTP status code for this item
+    client: Optional[ClientResponse] = None
+    detail: Optional[str] = None
+
+class ClientBatchResponse(BaseModel):
+    results: List[ClientBatchItemResult]
+
+class ClientImportRowError(BaseModel):
+    row: int  # 1-based data row number in the input
+    error: str
+
+class ClientImportStatus(BaseModel):
+    import_id: str
+    status: str  # "running", "completed" or "failed"
+    rows_processed: int
+    clients_created: int
+    errors: List[ClientImportRowError]
+    checkpoint_row: int  # Pass as start_row to resume after a failure
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+class ClientChange(BaseModel):
+    op: str  # "upsert" or "delete"
+    id: int
+    changed_at: datetime
+    client: Optional[ClientResponse] = None  # Present for upserts
+
+class ClientChangePage(BaseModel):
+    changes: List[ClientChange]
+    next_cursor: Optional[str] = None  # Pass as `since` on the next call
+    has_more: bool
+
+class ClientSearchPage(BaseModel):
+    clients: List[ClientResponse]
+    next_offset: Optional[int] = None  # Pass as `offset` on the next call
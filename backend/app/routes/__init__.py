@@ -1 +1 @@
-from . import auth, clients 
\ No newline at end of file
+from . import auth, clients, admin
\ No newline at end of file
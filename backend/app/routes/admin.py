@@ -0,0 +1,59 @@
+"""
+Admin Routes
+------------
+
+Operations on many clients at once. Only clients listed in
+ADMIN_CLIENT_IDS may call them.
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, File, Query, UploadFile
+from ..models.auth import PasswordResetCampaignRequest, PasswordResetCampaignStatus
+from ..models.client import ClientImportStatus
+from ..services.auth import AuthService
+from ..services.campaigns import PasswordResetCampaignService
+from ..services.imports import ClientImportService
+from ..config.settings import settings
+from ..utils.negotiation import MsgPackRoute
+
+async def require_admin(claims: dict = Depends(AuthService.get_token_claims)) -> dict:
+    if int(claims.get("sub", 0)) not in settings.ADMIN_CLIENT_IDS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return claims
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)], route_class=MsgPackRoute)
+
+@router.post("/password-reset-campaigns", response_model=PasswordResetCampaignStatus, status_code=202)
+async def start_password_reset_campaign(request: PasswordResetCampaignRequest):
+    """
+    Force a password reset for every client matching the filter
+    
+    Runs in the background; poll the returned campaign for progress.
+    """
+    return await PasswordResetCampaignService.start_campaign(request)
+
+@router.get("/password-reset-campaigns/{campaign_id}", response_model=PasswordResetCampaignStatus)
+async def get_password_reset_campaign(campaign_id: str):
+    return await PasswordResetCampaignService.get_campaign(campaign_id)
+
+@router.post("/clients/import", response_model=ClientImportStatus, status_code=202)
+async def import_clients(
+    file: UploadFile = File(...),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start_row: int = Query(0, ge=0),
+):
+    """
+    Create clients in bulk from a CSV or NDJSON upload
+    
+    Runs in the background; poll the returned import for progress and
+    per-row errors. After a failure, upload the same file again with
+    start_row set to the reported checkpoint_row to resume.
+    """
+    try:
+        text = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Import file must be UTF-8 encoded")
+    return await ClientImportService.start_import(text, format, start_row)
+
+@router.get("/clients/import/{import_id}", response_model=ClientImportStatus)
+async def get_client_import(import_id: str):
+    return await ClientImportService.get_import(import_id)
@@ -5,6 +5,7 @@ Authentication Routes
 This module defines the authentication-related API endpoints:
 - User signup (registration)
 - User login (authentication)
+- Token refresh (refresh token rotation)
 - User logout (token invalidation)
 - Password reset request
 - Password reset verification
@@ -16,13 +17,14 @@ protected endpoints.
 
 from fastapi import APIRouter, HTTPException, Depends, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from ..models.auth import LoginRequest, Token, LogoutRequest, PasswordResetRequest, PasswordResetTokenVerify, PasswordReset
+from ..models.auth import LoginRequest, Token, LogoutRequest, PasswordResetRequest, PasswordResetTokenVerify, PasswordReset, RefreshRequest
 from ..models.client import ClientCreate, ClientResponse
 from ..services.auth import AuthService
 from ..database.supabase import supabase
+from ..utils.negotiation import MsgPackRoute
 
 security = HTTPBearer()
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], route_class=MsgPackRoute)
 
 @router.post("/signup", response_model=ClientResponse)
 async def signup(client: ClientCreate):
@@ -49,6 +51,20 @@ async def login(credentials: LoginRequest):
     """
     return await AuthService.login_user(credentials)
 
+@router.post("/refresh", response_model=Token)
+async def refresh(refresh_request: RefreshRequest):
+    """
+    Refresh an access token
+    
+    Exchanges a refresh token for a new short-lived access token and a new
+    refresh token. Each refresh token is single use; reusing one revokes
+    the session.
+    
+    Returns:
+        Token: New access and refresh tokens
+    """
+    return await AuthService.refresh_session(refresh_request)
+
 @router.post("/logout")
 async def logout(credentials: HTTPAuthorizationCredentials = Security(security)):
     """
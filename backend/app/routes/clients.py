@@ -1,29 +1,107 @@
-from fastapi import APIRouter, HTTPException, Depends, Security
+from fastapi import APIRouter, HTTPException, Depends, Security, Query, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import List
-from ..models.client import ClientResponse, ClientUpdate
+from typing import List, Optional
+from ..models.client import (
+    ClientResponse, ClientUpdate, ClientBatchIds, ClientBatchUpdate, ClientBatchResponse, ClientChangePage,
+    ClientSearchPage
+)
+from ..models.auth import SessionPage
 from ..services.clients import ClientService
+from ..services.sessions import SessionService
 from ..services.auth import AuthService
+from ..utils.responses import trusted_json_response
+from ..utils.columnar import COLUMNAR_FORMATS, pyarrow_available
+from ..utils.compression import snapshot_response
+from ..utils.negotiation import MsgPackRoute, prefers_msgpack
+from ..config.settings import settings
 
 security = HTTPBearer()
-router = APIRouter(prefix="/clients", tags=["clients"])
+router = APIRouter(prefix="/clients", tags=["clients"], route_class=MsgPackRoute)
 
 @router.get("/", response_model=List[ClientResponse])
-async def get_clients(credentials: HTTPAuthorizationCredentials = Security(security)):
-    return await ClientService.get_all_clients()
+async def get_clients(request: Request, claims: dict = Depends(AuthService.get_token_claims)):
+    # Served from a versioned snapshot; its compressed bodies are reused until the table changes
+    snapshot = await ClientService.get_all_clients_snapshot(msgpack=prefers_msgpack(request.headers.get("accept")))
+    return await snapshot_response(snapshot, request.headers.get("accept-encoding"), settings.COMPRESSION_MINIMUM_SIZE)
+
+@router.post("/batch-get", response_model=ClientBatchResponse)
+async def batch_get_clients(batch: ClientBatchIds, claims: dict = Depends(AuthService.get_token_claims)):
+    return await ClientService.batch_get_clients(batch.ids)
+
+@router.patch("/batch", response_model=ClientBatchResponse)
+async def batch_update_clients(batch: ClientBatchUpdate, claims: dict = Depends(AuthService.get_token_claims)):
+    return await ClientService.batch_update_clients(batch)
+
+@router.post("/batch-delete", response_model=ClientBatchResponse)
+async def batch_delete_clients(batch: ClientBatchIds, claims: dict = Depends(AuthService.get_token_claims)):
+    return await ClientService.batch_delete_clients(batch.ids)
+
+# Declared before /{client_id} so "changes", "search" and "export" are not parsed as ids
+@router.get("/changes", response_model=ClientChangePage)
+async def get_client_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    claims: dict = Depends(AuthService.get_token_claims)
+):
+    return await ClientService.get_changes(since, limit)
+
+@router.get("/search", response_model=ClientSearchPage)
+async def search_clients(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    claims: dict = Depends(AuthService.get_token_claims)
+):
+    return trusted_json_response(await ClientService.search_clients(q, limit, offset))
+
+@router.get("/export")
+async def export_clients(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|arrow|parquet)$"),
+    include_last_login: bool = False,
+    claims: dict = Depends(AuthService.get_token_claims)
+):
+    if format in COLUMNAR_FORMATS:
+        if not pyarrow_available():
+            raise HTTPException(status_code=501, detail="Columnar exports require pyarrow")
+        return StreamingResponse(
+            ClientService.export_columnar(format, include_last_login),
+            media_type=COLUMNAR_FORMATS[format],
+            headers={"Content-Disposition": f'attachment; filename="clients.{format}"'}
+        )
+    if format == "csv":
+        return StreamingResponse(
+            ClientService.export_csv(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="clients.csv"'}
+        )
+    return StreamingResponse(ClientService.export_ndjson(), media_type="application/x-ndjson")
 
 @router.get("/{client_id}", response_model=ClientResponse)
-async def get_client(client_id: int, credentials: HTTPAuthorizationCredentials = Security(security)):
-    return await ClientService.get_client_by_id(client_id)
+async def get_client(client_id: int, claims: dict = Depends(AuthService.get_token_claims)):
+    return trusted_json_response(await ClientService.get_client_by_id(client_id))
 
 @router.put("/{client_id}", response_model=ClientResponse)
 async def update_client(
     client_id: int, 
     client_update: ClientUpdate,
-    credentials: HTTPAuthorizationCredentials = Security(security)
+    claims: dict = Depends(AuthService.get_token_claims)
 ):
-    return await ClientService.update_client(client_id, client_update)
+    return trusted_json_response(await ClientService.update_client(client_id, client_update))
 
 @router.delete("/{client_id}")
-async def delete_client(client_id: int, credentials: HTTPAuthorizationCredentials = Security(security)):
-    return await ClientService.delete_client(client_id) 
\ No newline at end of file
+async def delete_client(client_id: int, claims: dict = Depends(AuthService.get_token_claims)):
+    return await ClientService.delete_client(client_id)
+
+@router.get("/{client_id}/sessions", response_model=SessionPage)
+async def get_client_sessions(
+    client_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = None,
+    claims: dict = Depends(AuthService.get_token_claims)
+):
+    return await SessionService.list_client_sessions(client_id, limit, after)
+
+@router.post("/{client_id}/sessions/revoke-all")
+async def revoke_all_client_sessions(client_id: int, claims: dict = Depends(AuthService.get_token_claims)):
+    return await SessionService.revoke_all_sessions(client_id)
@@ -1 +1 @@
-from . import auth, clients 
\ No newline at end of file
+from . import auth, clients, sessions, campaigns, imports
\ No newline at end of file
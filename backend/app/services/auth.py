@@ -1,11 +1,17 @@
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
-from ..models.auth import LoginRequest, Token, PasswordResetRequest, PasswordReset
+from ..models.auth import LoginRequest, Token, PasswordResetRequest, PasswordReset, RefreshRequest
 from ..models.client import ClientCreate
 from ..database.supabase import supabase
-from ..utils.security import verify_password, create_access_token, get_password_hash
+from ..utils.security import (
+    verify_client_password, access_token_claims, create_access_token, decode_access_token, get_password_hash,
+    create_refresh_token, hash_refresh_token, credential_cache, reset_token_signer, TokenError
+)
+from ..utils.reset_tokens import ResetTokenError, is_stateless_reset_token
 from ..utils.email import send_password_reset_email
-from datetime import datetime, timedelta
+from ..utils.denylist import token_denylist
+from ..utils.activity import session_activity
+from datetime import datetime, timedelta, timezone
 from ..config.settings import settings
 import re
 import logging
@@ -101,7 +107,7 @@ class AuthService:
         
         try:
             # First, get the client by email
-            client_result = supabase.table("Clients").select("*").eq("email", credentials.email).execute()
+            client_result = supabase.table("Clients").select("*").eq("email", credentials.email).is_("deleted_at", "null").execute()
             if not client_result.data:
                 raise HTTPException(status_code=401, detail="Invalid email or password")
             
@@ -119,7 +125,7 @@ class AuthService:
             print(f"Debug - Attempting to verify password: '{credentials.password}'")
             
             # Verify the password
-            password_verified = verify_password(credentials.password, auth['password_hash'])
+            password_verified = verify_client_password(client['id'], credentials.password, auth['password_hash'])
             print(f"Debug - Password verification result: {password_verified}")
             
             if not password_verified:
@@ -131,21 +137,27 @@ class AuthService:
                 "last_login": current_time.isoformat()
             }).eq("auth_id", auth['auth_id']).execute()
             
-            # Create a session
+            # Create a session; it holds the hash of the current refresh token
+            session_id = uuid.uuid4().hex
+            refresh_token, refresh_token_hash = create_refresh_token(session_id)
             session_data = {
-                "session_id": create_access_token({"sub": str(client['id'])}),
+                "session_id": session_id,
                 "client_id": client['id'],
                 "created_at": current_time.isoformat(),
-                "expires_at": (current_time + timedelta(days=1)).isoformat()
+                "expires_at": (current_time + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)).isoformat(),
+                "refresh_token_hash": refresh_token_hash
             }
             
-            session_result = supabase.table("Sessions").insert(session_data).execute()
-            print(f"Session created: {session_result.data}")
+            # Insert and evict the client's oldest sessions beyond the cap in one transaction
+            session_result = supabase.rpc("create_session", {
+                "p_session": session_data,
+                "p_max_sessions": settings.MAX_SESSIONS_PER_CLIENT
+            }).execute()
+            [created] = session_result.data
+            print(f"Session created: {session_id}, evicted {created['evicted']} old sessions")
             
-            return Token(
-                access_token=session_data["session_id"],
-                token_type="bearer"
-            )
+            # The token carries the generation the session was stamped with under the client lock
+            return AuthService._issue_tokens(client['id'], session_id, refresh_token, created['generation'])
             
         except HTTPException:
             raise
@@ -155,6 +167,100 @@ class AuthService:
             print(f"Debug - Error args: {e.args}")
             raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    @staticmethod
+    def _issue_tokens(client_id, session_id: str, refresh_token: str, generation: int) -> Token:
+        return Token(
+            access_token=create_access_token(access_token_claims(client_id, session_id, generation)),
+            token_type="bearer",
+            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            refresh_token=refresh_token
+        )
+
+    @staticmethod
+    async def refresh_session(refresh_request: RefreshRequest):
+        """
+        Rotate a refresh token and issue a new access token
+        
+        The session's stored refresh token hash is swapped in a single
+        conditional update, so each refresh token can be used exactly once.
+        Presenting the token that was just rotated out means it was copied,
+        so the whole session is revoked. Any other mismatch (a guessed or
+        garbled token, an expired or idle session) is only rejected: the
+        session id is not secret, so it must not be enough to end a session.
+        
+        Args:
+            refresh_request: The request containing the current refresh token
+            
+        Returns:
+            Token: A new access token and refresh token
+            
+        Raises:
+            HTTPException: If the refresh token is invalid, expired or reused
+        """
+        session_id, _, secret = refresh_request.refresh_token.partition(".")
+        if not session_id or not secret:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+        
+        try:
+            current_time = datetime.utcnow()
+            presented_hash = hash_refresh_token(refresh_request.refresh_token)
+            new_refresh_token, new_refresh_token_hash = create_refresh_token(session_id)
+            idle_cutoff = current_time - timedelta(minutes=settings.SESSION_IDLE_TIMEOUT_MINUTES)
+            result = supabase.table("Sessions").update({
+                "refresh_token_hash": new_refresh_token_hash,
+                "previous_refresh_token_hash": presented_hash,
+                "expires_at": (current_time + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)).isoformat(),
+                "last_activity": current_time.isoformat()
+            }).eq("session_id", session_id).eq(
+                "refresh_token_hash", presented_hash
+            ).gt("expires_at", current_time.isoformat()).or_(
+                f'last_activity.is.null,last_activity.gt."{idle_cutoff.isoformat()}"'
+            ).execute()
+            
+            if not result.data:
+                # Only a replay of the rotated-out token proves it leaked; delete
+                # conditionally so a concurrent rotation is not undone by a stale read
+                revoked = supabase.table("Sessions").delete().eq("session_id", session_id).eq(
+                    "previous_refresh_token_hash", presented_hash
+                ).execute()
+                if revoked.data:
+                    logger.debug(f"Refresh token reused, revoked session: {session_id}")
+                raise HTTPException(status_code=401, detail="Invalid refresh token")
+            
+            session = result.data[0]
+            return AuthService._issue_tokens(session['client_id'], session_id, new_refresh_token, session.get('generation') or 0)
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.debug(f"Refresh error: {str(e)}")
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    @staticmethod
+    async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+        """
+        Verify a bearer access token without touching the database
+        
+        Returns:
+            dict: The token claims ("sub" is the client ID, "sid" the session)
+        """
+        try:
+            claims = decode_access_token(token)
+        except TokenError:
+            claims = None
+        if (
+            claims is None
+            or token_denylist.is_revoked(claims.get("jti"), claims.get("exp", 0))
+            or token_denylist.is_generation_revoked(int(claims.get("sub", 0)), claims.get("gen", 0))
+        ):
+            raise HTTPException(
+                status_code=401,
+                detail="Invalid or expired token",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        session_activity.record(claims.get("sid"))
+        return claims
+
     @staticmethod
     async def get_current_user(token: str = Depends(oauth2_scheme)):
         try:
@@ -169,8 +275,37 @@ class AuthService:
 
     @staticmethod
     async def logout_user(token: str):
+        """
+        Revoke an access token and end its session
+        
+        The token's jti goes into the denylist until the token's own expiry,
+        and the session row is deleted so its refresh token stops working.
+        
+        Args:
+            token: The access token to revoke
+            
+        Returns:
+            dict: Success message
+        """
         try:
-            supabase.auth.sign_out()
+            claims = decode_access_token(token)
+        except TokenError:
+            # Already expired or never valid; nothing left to revoke
+            return {"message": "Successfully logged out"}
+        
+        try:
+            jti, exp = claims.get("jti"), claims.get("exp")
+            if jti and exp:
+                token_denylist.revoke(jti, exp)
+                # Logging out twice (double click, two tabs) is not an error
+                supabase.table("RevokedTokens").upsert({
+                    "jti": jti,
+                    "expires_at": datetime.fromtimestamp(exp, tz=timezone.utc).isoformat()
+                }, on_conflict="jti", ignore_duplicates=True).execute()
+            
+            if claims.get("sid"):
+                supabase.table("Sessions").delete().eq("session_id", claims["sid"]).execute()
+            
             return {"message": "Successfully logged out"}
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
@@ -193,45 +328,30 @@ class AuthService:
         logger.debug(f"Received email: {reset_request.email}")
         
         try:
-            # Check if client exists with this email
-            client_result = supabase.table("Clients").select("*").eq("email", reset_request.email).execute()
-            
-            if not client_result.data:
-                # For security reasons, don't reveal that the email doesn't exist
-                # Just return success as if we sent an email
-                logger.debug(f"Email not found: {reset_request.email}")
-                return {"message": "If your email is registered, you will receive a password reset link"}
-            
-            client = client_result.data[0]
-            client_id = client['id']
-            logger.debug(f"Found client with ID: {client_id}")
+            if settings.PASSWORD_RESET_TOKEN_FORMAT == "stateless":
+                return await AuthService._request_stateless_password_reset(reset_request)
             
             # Generate a unique reset token
             reset_token = str(uuid.uuid4())
             
-            # Store the reset token with expiration time
-            current_time = datetime.utcnow()
-            expiration_time = current_time + timedelta(minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES)
-            
-            # Check if there's an existing token and delete it
-            existing_token = supabase.table("ResetTokens").select("*").eq("client_id", client_id).execute()
-            if existing_token.data:
-                logger.debug(f"Deleting existing reset token for client: {client_id}")
-                supabase.table("ResetTokens").delete().eq("client_id", client_id).execute()
-            
-            # Insert new token
-            reset_token_data = {
-                "token": reset_token,
-                "client_id": client_id,
-                "created_at": current_time.isoformat(),
-                "expires_at": expiration_time.isoformat()
-            }
+            # Look up the client and upsert its single reset token in one conditional
+            # write; nothing is written if a token was issued within the throttle window
+            token_result = supabase.rpc("issue_reset_token", {
+                "p_email": reset_request.email,
+                "p_token": reset_token,
+                "p_ttl_seconds": settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES * 60,
+                "p_min_interval_seconds": settings.PASSWORD_RESET_MIN_INTERVAL_SECONDS
+            }).execute()
+            
+            if token_result.data is None:
+                # For security reasons, don't reveal whether the email exists or was throttled
+                logger.debug(f"No reset token issued for: {reset_request.email}")
+                return {"message": "If your email is registered, you will receive a password reset link"}
             
-            token_result = supabase.table("ResetTokens").insert(reset_token_data).execute()
-            logger.debug(f"Reset token created: {token_result.data}")
+            logger.debug(f"Reset token issued for client: {token_result.data}")
             
             # Send reset email
-            email_sent = await send_password_reset_email(reset_request.email, reset_token)
+            email_sent = await send_password_reset_email(reset_request.email, reset_token, reset_request.locale)
             logger.debug(f"Reset email sent: {email_sent}")
             
             return {"message": "If your email is registered, you will receive a password reset link"}
@@ -243,6 +363,34 @@ class AuthService:
             # For security, return the same message as success
             return {"message": "If your email is registered, you will receive a password reset link"}
     
+    @staticmethod
+    async def _request_stateless_password_reset(reset_request: PasswordResetRequest):
+        """
+        Issue a signed reset token without storing anything
+        
+        The client and its password hash come back in one query through the
+        Authentication foreign key embedding.
+        """
+        client_result = supabase.table("Clients").select(
+            "id, Authentication(password_hash)"
+        ).eq("email", reset_request.email).is_("deleted_at", "null").execute()
+        
+        if not client_result.data or not client_result.data[0]['Authentication']:
+            logger.debug(f"Email not found: {reset_request.email}")
+            return {"message": "If your email is registered, you will receive a password reset link"}
+        
+        client = client_result.data[0]
+        reset_token = reset_token_signer.create(
+            client['id'],
+            client['Authentication'][0]['password_hash'],
+            settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES * 60
+        )
+        
+        email_sent = await send_password_reset_email(reset_request.email, reset_token, reset_request.locale)
+        logger.debug(f"Reset email sent: {email_sent}")
+        
+        return {"message": "If your email is registered, you will receive a password reset link"}
+    
     @staticmethod
     async def verify_reset_token(token: str):
         """
@@ -260,6 +408,15 @@ class AuthService:
         logger.debug("\n=== Verifying password reset token ===")
         logger.debug(f"Token: {token}")
         
+        if is_stateless_reset_token(token):
+            # Signature and expiry only; whether it was already used is settled at reset time
+            try:
+                client_id, _ = reset_token_signer.verify(token)
+            except ResetTokenError as e:
+                logger.debug(f"Token verification error: {str(e)}")
+                raise HTTPException(status_code=400, detail="Invalid or expired token")
+            return {"client_id": client_id}
+        
         try:
             # Get the token from the database
             token_result = supabase.table("ResetTokens").select("*").eq("token", token).execute()
@@ -302,31 +459,25 @@ class AuthService:
         """
         logger.debug("\n=== Resetting password ===")
         
+        if is_stateless_reset_token(reset_data.token):
+            return await AuthService._reset_password_stateless(reset_data)
+        
+        # Hash before touching the database so the transaction below stays short
+        password_hash = get_password_hash(reset_data.new_password)
+        
         try:
-            # Verify the token first
-            verification = await AuthService.verify_reset_token(reset_data.token)
-            client_id = verification["client_id"]
-            
-            # Get the authentication record
-            auth_result = supabase.table("Authentication").select("*").eq("client_id", client_id).execute()
-            
-            if not auth_result.data:
-                raise HTTPException(status_code=400, detail="Authentication record not found")
-            
-            auth_id = auth_result.data[0]['auth_id']
-            
-            # Update the password
-            password_hash = get_password_hash(reset_data.new_password)
-            update_result = supabase.table("Authentication").update({
-                "password_hash": password_hash,
-                "updated_at": datetime.utcnow().isoformat()
-            }).eq("auth_id", auth_id).execute()
-            
-            if not update_result.data:
-                raise HTTPException(status_code=400, detail="Failed to update password")
+            # Consume the token and update the password in one transaction;
+            # a token that is missing, expired or already used matches nothing
+            result = supabase.rpc("consume_reset_token", {
+                "p_token": reset_data.token,
+                "p_password_hash": password_hash
+            }).execute()
+            
+            if result.data is None:
+                raise HTTPException(status_code=400, detail="Invalid or expired token")
             
-            # Delete the used token
-            supabase.table("ResetTokens").delete().eq("token", reset_data.token).execute()
+            # Forget any cached verifications of the old password
+            credential_cache.invalidate_client(result.data)
             
             logger.debug("Password reset successful")
             return {"message": "Password has been reset successfully"}
@@ -335,4 +486,36 @@ class AuthService:
             raise
         except Exception as e:
             logger.debug(f"Password reset error: {str(e)}")
-            raise HTTPException(status_code=400, detail="Failed to reset password") 
+            raise HTTPException(status_code=400, detail="Failed to reset password")
+    
+    @staticmethod
+    async def _reset_password_stateless(reset_data: PasswordReset):
+        """
+        Reset a password with a stateless token in a single round trip
+        
+        The reset_password_stateless database function only updates the hash
+        while it still matches the token's fingerprint, which makes the
+        token single use.
+        """
+        try:
+            client_id, fingerprint = reset_token_signer.verify(reset_data.token)
+        except ResetTokenError as e:
+            logger.debug(f"Token verification error: {str(e)}")
+            raise HTTPException(status_code=400, detail="Invalid or expired token")
+        
+        try:
+            result = supabase.rpc("reset_password_stateless", {
+                "p_client_id": client_id,
+                "p_fingerprint": fingerprint,
+                "p_password_hash": get_password_hash(reset_data.new_password)
+            }).execute()
+        except Exception as e:
+            logger.debug(f"Password reset error: {str(e)}")
+            raise HTTPException(status_code=400, detail="Failed to reset password")
+        
+        if not result.data:
+            raise HTTPException(status_code=400, detail="Invalid or expired token")
+        
+        credential_cache.invalidate_client(client_id)
+        logger.debug("Password reset successful")
+        return {"message": "Password has been reset successfully"}
@@ -0,0 +1,149 @@
+"""
+Password Reset Campaigns
+------------------------
+
+Forces password resets for many clients at once, e.g. after a credential
+leak. A campaign walks the matching clients in keyset-paginated chunks and,
+per chunk, issues all reset tokens with one bulk upsert and queues all
+emails with one bulk insert into the email outbox.
+
+Delivery is rate limited by scheduling: the n-th email of a campaign gets
+next_attempt_at = start + n / PASSWORD_RESET_CAMPAIGN_EMAILS_PER_SECOND and
+its token's expiry is counted from that moment, so the outbox worker sends
+at the configured rate and every link stays valid for the usual lifetime
+after it arrives.
+
+Campaigns run as background tasks; their progress is kept in memory by the
+worker that started them.
+"""
+
+from fastapi import HTTPException
+from ..models.auth import PasswordResetCampaignRequest
+from ..database.supabase import supabase
+from ..config.settings import settings
+from ..utils.email import render_password_reset_email
+from ..utils.outbox import enqueue_emails
+from ..utils.security import reset_token_signer
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+campaigns = {}  # campaign_id -> progress dict
+_campaign_tasks = set()
+
+class PasswordResetCampaignService:
+    @staticmethod
+    async def start_campaign(request: PasswordResetCampaignRequest):
+        if not (request.client_ids or request.email_domain or request.created_before):
+            raise HTTPException(status_code=400, detail="A client filter is required")
+        
+        campaign_id = uuid.uuid4().hex
+        campaigns[campaign_id] = {
+            "campaign_id": campaign_id,
+            "status": "running",
+            "clients_processed": 0,
+            "tokens_issued": 0,
+            "emails_queued": 0,
+            "started_at": datetime.now(timezone.utc),
+            "finished_at": None,
+            "error": None
+        }
+        task = asyncio.create_task(PasswordResetCampaignService._run(campaign_id, request))
+        # Hold a reference so the task isn't garbage collected mid-run
+        _campaign_tasks.add(task)
+        task.add_done_callback(_campaign_tasks.discard)
+        return campaigns[campaign_id]
+
+    @staticmethod
+    async def get_campaign(campaign_id: str):
+        campaign = campaigns.get(campaign_id)
+        if campaign is None:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        return campaign
+
+    @staticmethod
+    def _fetch_chunk(request: PasswordResetCampaignRequest, after_id: int) -> list:
+        columns = "id, email"
+        if settings.PASSWORD_RESET_TOKEN_FORMAT == "stateless":
+            columns += ", Authentication(password_hash)"
+        query = supabase.table("Clients").select(columns).is_("deleted_at", "null").gt("id", after_id)
+        if request.client_ids:
+            query = query.in_("id", request.client_ids)
+        if request.email_domain:
+            # Safe to embed: the request model only accepts letters, digits, "." and "-"
+            query = query.ilike("email", f"%@{request.email_domain}")
+        if request.created_before:
+            query = query.lt("created_at", request.created_before.isoformat())
+        return query.order("id").limit(settings.PASSWORD_RESET_CAMPAIGN_CHUNK_SIZE).execute().data
+
+    @staticmethod
+    def _process_chunk(clients: list, first_index: int, started: datetime, locale: str) -> tuple:
+        rate = settings.PASSWORD_RESET_CAMPAIGN_EMAILS_PER_SECOND
+        ttl = timedelta(minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES)
+        token_rows, emails = [], []
+        now = datetime.now(timezone.utc)
+        for offset, client in enumerate(clients):
+            if not client.get("email"):
+                continue
+            send_at = started + timedelta(seconds=(first_index + offset) / rate)
+            if settings.PASSWORD_RESET_TOKEN_FORMAT == "stateless":
+                if not client.get("Authentication"):
+                    continue
+                lifetime = int((send_at + ttl - now).total_seconds())
+                token = reset_token_signer.create(client["id"], client["Authentication"][0]["password_hash"], lifetime)
+            else:
+                token = str(uuid.uuid4())
+                token_rows.append({
+                    "token": token,
+                    "client_id": client["id"],
+                    # Issued now: issue_reset_token throttles on created_at, so a
+                    # future time would block the client's own resets until then
+                    "created_at": now.isoformat(),
+                    "expires_at": (send_at + ttl).isoformat()
+                })
+            subject, body_text, body_html = render_password_reset_email(token, locale)
+            emails.append({
+                "recipient": client["email"],
+                "subject": subject,
+                "body_text": body_text,
+                "body_html": body_html,
+                "next_attempt_at": send_at.isoformat()
+            })
+
+        if token_rows:
+            # Replaces any outstanding token thanks to the unique client_id index
+            supabase.table("ResetTokens").upsert(token_rows, on_conflict="client_id").execute()
+        enqueue_emails(supabase, emails)
+        # Stateless tokens live only in the emails, so every queued email is an issued token
+        tokens_issued = len(emails) if settings.PASSWORD_RESET_TOKEN_FORMAT == "stateless" else len(token_rows)
+        return tokens_issued, len(emails)
+
+    @staticmethod
+    async def _run(campaign_id: str, request: PasswordResetCampaignRequest):
+        progress = campaigns[campaign_id]
+        started = progress["started_at"]
+        after_id = 0
+        try:
+            while True:
+                clients = await asyncio.to_thread(PasswordResetCampaignService._fetch_chunk, request, after_id)
+                if not clients:
+                    break
+                tokens, emails = await asyncio.to_thread(
+                    PasswordResetCampaignService._process_chunk,
+                    clients, progress["emails_queued"], started, request.locale
+                )
+                progress["clients_processed"] += len(clients)
+                progress["tokens_issued"] += tokens
+                progress["emails_queued"] += emails
+                after_id = clients[-1]["id"]
+                logger.info(f"Campaign {campaign_id}: {progress['clients_processed']} clients processed")
+            progress["status"] = "completed"
+        except Exception as e:
+            logger.warning(f"Campaign {campaign_id} failed: {str(e)}")
+            progress["status"] = "failed"
+            progress["error"] = str(e)
+        finally:
+            progress["finished_at"] = datetime.now(timezone.utc)
@@ -1,23 +1,242 @@
 from fastapi import HTTPException
-from ..models.client import ClientUpdate
+from ..models.client import ClientUpdate, ClientBatchUpdate
 from ..database.supabase import supabase
+from ..config.settings import settings
+from ..utils.denylist import token_denylist
+from datetime import datetime, timedelta, timezone
+import asyncio
+import base64
+import csv
+import io
 import logging
+import orjson
+from ..utils.columnar import encode_columnar
+from ..utils.search_index import client_search_index
+from ..utils.compression import SnapshotCache
+from ..utils import negotiation
 
 logger = logging.getLogger(__name__)
 
+# Exactly the fields of ClientResponse, so rows can be served without revalidation
+CLIENT_COLUMNS = "id, client_name, email, created_at, update_at"
+CLIENT_FIELDS = tuple(column.strip() for column in CLIENT_COLUMNS.split(","))
+
+# Serialized (and lazily compressed) bodies of GET /clients/, rebuilt when the table changes
+clients_snapshot = SnapshotCache()
+clients_msgpack_snapshot = SnapshotCache(negotiation.MSGPACK_MEDIA_TYPE)
+
+def _client_fields(row: dict) -> dict:
+    # Writes return every column; keep only the public ones
+    return {field: row.get(field) for field in CLIENT_FIELDS}
+
+def _encode_change_cursor(changed_at: str, client_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{changed_at}|{client_id}".encode()).decode()
+
+def _decode_change_cursor(cursor: str) -> tuple:
+    try:
+        changed_at, client_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        # Round-trip through datetime so only a well-formed timestamp reaches the filter
+        return datetime.fromisoformat(changed_at).isoformat(), int(client_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _after_filter(time_column: str, id_column: str, changed_at: str, client_id: int) -> str:
+    return f'{time_column}.gt."{changed_at}",and({time_column}.eq."{changed_at}",{id_column}.gt.{client_id})'
+
 class ClientService:
     @staticmethod
     async def get_all_clients():
         try:
-            response = supabase.table("Clients").select("*").execute()
+            response = supabase.table("Clients").select(CLIENT_COLUMNS).is_("deleted_at", "null").execute()
             return response.data
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    @staticmethod
+    def _clients_version():
+        """
+        Return a cheap fingerprint of the client list
+        
+        Every insert, update and soft delete moves update_at (trigger), and every
+        hard delete leaves a tombstone, so the newest of each identifies the
+        list. Both are read from the top of the change feed indexes, never by
+        counting rows. A transaction can commit late with an earlier timestamp,
+        so while the newest change is within CHANGE_FEED_SAFETY_LAG_SECONDS the
+        version also rolls over every lag period until the table settles.
+        """
+        newest_client = (
+            supabase.table("Clients").select("id, update_at")
+            .order("update_at", desc=True).order("id", desc=True).limit(1).execute().data
+        )
+        newest_tombstone = (
+            supabase.table("ClientTombstones").select("client_id, deleted_at")
+            .order("deleted_at", desc=True).order("client_id", desc=True).limit(1).execute().data
+        )
+        client_key = (newest_client[0]["update_at"], newest_client[0]["id"]) if newest_client else None
+        tombstone_key = (newest_tombstone[0]["deleted_at"], newest_tombstone[0]["client_id"]) if newest_tombstone else None
+        lag = settings.CHANGE_FEED_SAFETY_LAG_SECONDS
+        now = datetime.now(timezone.utc)
+        changed = [datetime.fromisoformat(key[0]) for key in (client_key, tombstone_key) if key and key[0]]
+        settling = None
+        if changed and now - max(changed) < timedelta(seconds=lag):
+            settling = int(now.timestamp() // max(lag, 1))
+        return (client_key, tombstone_key, settling)
+
+    @staticmethod
+    async def get_all_clients_snapshot(msgpack: bool = False):
+        """
+        Return the serialized client list (JSON, or MessagePack when `msgpack`),
+        rebuilt only when it has changed
+        """
+        cache, encode = (clients_msgpack_snapshot, negotiation.packb) if msgpack else (clients_snapshot, orjson.dumps)
+        
+        def build():
+            rows = supabase.table("Clients").select(CLIENT_COLUMNS).is_("deleted_at", "null").execute().data
+            return encode(rows)
+        
+        try:
+            version = await asyncio.to_thread(ClientService._clients_version)
+            return await asyncio.to_thread(cache.get, version, build)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @staticmethod
+    async def iter_client_chunks(chunk_size: int = 1000, columns: str = CLIENT_COLUMNS):
+        """
+        Yield all clients in id order, one keyset-paginated chunk at a time
+        
+        Only one chunk is held in memory at once, whatever the table size.
+        """
+        after_id = 0
+        while True:
+            response = await asyncio.to_thread(
+                lambda: supabase.table("Clients").select(columns).is_("deleted_at", "null")
+                .gt("id", after_id).order("id").limit(chunk_size).execute()
+            )
+            if not response.data:
+                return
+            yield response.data
+            if len(response.data) < chunk_size:
+                return
+            after_id = response.data[-1]["id"]
+
+    @staticmethod
+    async def export_ndjson(chunk_size: int = 1000):
+        async for chunk in ClientService.iter_client_chunks(chunk_size):
+            yield b"".join(orjson.dumps(row) + b"\n" for row in chunk)
+
+    @staticmethod
+    async def export_csv(chunk_size: int = 1000):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CLIENT_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        yield buffer.getvalue().encode()
+        async for chunk in ClientService.iter_client_chunks(chunk_size):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(chunk)
+            yield buffer.getvalue().encode()
+
+    @staticmethod
+    async def export_columnar(fmt: str, include_last_login: bool = False, chunk_size: int = 10000):
+        columns = CLIENT_COLUMNS + (", Authentication(last_login)" if include_last_login else "")
+        chunks = ClientService.iter_client_chunks(chunk_size, columns)
+        async for data in encode_columnar(chunks, fmt, include_last_login):
+            if data:
+                yield data
+
+    @staticmethod
+    async def get_changes(since: str = None, limit: int = 500):
+        return await asyncio.to_thread(ClientService.fetch_changes, since, limit)
+
+    @staticmethod
+    def fetch_changes(since: str = None, limit: int = 500) -> dict:
+        """
+        Return client creates/updates and deletes after a cursor, oldest first
+        
+        Live rows are ordered by (update_at, id), which a trigger maintains on
+        every write (including soft deletes), and purged clients come from the
+        ClientTombstones table. Both are read by keyset from their own index
+        and merged. Changes newer than
+        CHANGE_FEED_SAFETY_LAG_SECONDS are held back so that a transaction that
+        commits late with an earlier timestamp cannot be skipped.
+        
+        Omit `since` for a full initial sync; afterwards pass `next_cursor`.
+        """
+        horizon = (datetime.now(timezone.utc) - timedelta(seconds=settings.CHANGE_FEED_SAFETY_LAG_SECONDS)).isoformat()
+        try:
+            clients_query = supabase.table("Clients").select(CLIENT_COLUMNS + ", deleted_at").lt("update_at", horizon)
+            tombstones_query = supabase.table("ClientTombstones").select("client_id, deleted_at").lt("deleted_at", horizon)
+            if since:
+                changed_at, client_id = _decode_change_cursor(since)
+                clients_query = clients_query.or_(_after_filter("update_at", "id", changed_at, client_id))
+                tombstones_query = tombstones_query.or_(_after_filter("deleted_at", "client_id", changed_at, client_id))
+            else:
+                # A fresh mirror has nothing to delete
+                tombstones_query = None
+            
+            # A soft-deleted client is a delete to mirrors; its purge later adds a tombstone too
+            changes = [
+                {"op": "delete", "id": row["id"], "changed_at": row["update_at"]} if row.pop("deleted_at")
+                else {"op": "upsert", "id": row["id"], "changed_at": row["update_at"], "client": row}
+                for row in clients_query.order("update_at").order("id").limit(limit).execute().data
+            ]
+            if tombstones_query is not None:
+                changes += [
+                    {"op": "delete", "id": row["client_id"], "changed_at": row["deleted_at"]}
+                    for row in tombstones_query.order("deleted_at").order("client_id").limit(limit).execute().data
+                ]
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        changes.sort(key=lambda change: (datetime.fromisoformat(change["changed_at"]), change["id"]))
+        changes = changes[:limit]
+        if changes:
+            next_cursor = _encode_change_cursor(changes[-1]["changed_at"], changes[-1]["id"])
+        else:
+            next_cursor = since
+        return {"changes": changes, "next_cursor": next_cursor, "has_more": len(changes) == limit}
+
+    @staticmethod
+    async def search_clients(q: str, limit: int = 20, offset: int = 0):
+        """
+        Search live clients by name or email
+        
+        Prefix matches on either field rank first, ordered by the matching
+        field, then fuzzy (trigram) matches by similarity, ties broken by id.
+        The database backend answers from the pg_trgm and prefix indexes in
+        daddybase.sql; the memory backend from this worker's ClientSearchIndex,
+        in a thread so its lock is never waited on by the event loop.
+        """
+        q = q.strip()
+        if not q:
+            # Would be a prefix of every client on the database path
+            raise HTTPException(status_code=400, detail="Search query must not be blank")
+        try:
+            if settings.CLIENT_SEARCH_BACKEND == "memory" and client_search_index.ready:
+                rows = await asyncio.to_thread(client_search_index.search, q, limit + 1, offset)
+            else:
+                rows = supabase.rpc("search_clients", {
+                    "p_query": q,
+                    "p_limit": limit + 1,
+                    "p_offset": offset,
+                    "p_min_similarity": settings.CLIENT_SEARCH_MIN_SIMILARITY
+                }).execute().data
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        # One extra row tells us whether another page exists without a count query
+        return {
+            "clients": [_client_fields(row) for row in rows[:limit]],
+            "next_offset": offset + limit if len(rows) > limit else None
+        }
+
     @staticmethod
     async def get_client_by_id(client_id: int):
         try:
-            response = supabase.table("Clients").select("*").eq("id", client_id).execute()
+            response = supabase.table("Clients").select(CLIENT_COLUMNS).eq("id", client_id).is_("deleted_at", "null").execute()
             if not response.data:
                 raise HTTPException(status_code=404, detail="Client not found")
             return response.data[0]
@@ -27,46 +246,102 @@ class ClientService:
     @staticmethod
     async def update_client(client_id: int, client_update: ClientUpdate):
         try:
-            # First check if client exists
-            result = supabase.table("Clients").select("*").eq("id", client_id).execute()
+            # The update itself skips deleted clients, so a concurrent soft delete cannot be undone
+            update_data = client_update.dict(exclude_unset=True)
+            result = (
+                supabase.table("Clients").update(update_data).eq("id", client_id).is_("deleted_at", "null").execute()
+            )
             if not result.data:
                 raise HTTPException(status_code=404, detail="Client not found")
-            
-            # Update client
-            update_data = client_update.dict(exclude_unset=True)
-            result = supabase.table("Clients").update(update_data).eq("id", client_id).execute()
-            return result.data[0]
+            return _client_fields(result.data[0])
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
     @staticmethod
     async def delete_client(client_id: int):
-        logger.debug(f"\n=== Starting client deletion process for ID: {client_id} ===")
+        """
+        Soft delete a client
+        
+        One transaction marks the client deleted, bumps its session generation
+        (revoking every outstanding access token) and deletes its sessions and
+        reset tokens, so nothing can be refreshed or reset afterwards. Lookups
+        ignore deleted clients from then on; the purger removes the rows and
+        their remaining dependents later.
+        """
+        logger.debug(f"\n=== Soft deleting client ID: {client_id} ===")
         
         try:
-            # First delete session records
-            logger.debug("Deleting session records...")
-            session_result = supabase.table("Sessions").delete().eq("client_id", client_id).execute()
-            logger.debug(f"Session deletion response: {session_result}")
-            
-            # Then delete authentication records
-            logger.debug("Deleting authentication records...")
-            auth_result = supabase.table("Authentication").delete().eq("client_id", client_id).execute()
-            logger.debug(f"Authentication deletion response: {auth_result}")
-            
-            # Finally delete client
-            logger.debug("Deleting client record...")
-            client_result = supabase.table("Clients").delete().eq("id", client_id).execute()
-            logger.debug(f"Client deletion response: {client_result}")
-            
-            if not client_result.data:
-                raise HTTPException(status_code=404, detail="Client not found")
-            
-            logger.debug("=== Client deletion successful ===")
-            return {"message": "Client deleted successfully"}
-            
+            result = supabase.rpc("soft_delete_clients", {"p_ids": [client_id]}).execute()
         except Exception as e:
-            logger.debug(f"\n=== Error during deletion ===")
-            logger.debug(f"Error type: {type(e)}")
-            logger.debug(f"Error message: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+            logger.debug(f"Error during deletion: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        if not result.data:
+            raise HTTPException(status_code=404, detail="Client not found")
+        
+        for row in result.data:
+            token_denylist.revoke_generation(row["id"], row["session_generation"])
+        return {"message": "Client deleted successfully"}
+
+    @staticmethod
+    def _batch_results(ids: list, found: dict, success_status: int, missing_detail: str = "Client not found") -> dict:
+        results = []
+        for client_id in ids:
+            if client_id in found:
+                results.append({"id": client_id, "status": success_status, "client": found[client_id]})
+            else:
+                results.append({"id": client_id, "status": 404, "detail": missing_detail})
+        return {"results": results}
+
+    @staticmethod
+    async def batch_get_clients(ids: list):
+        """
+        Fetch many clients with one query; each id gets its own result and status
+        """
+        ids = list(dict.fromkeys(ids))
+        try:
+            response = supabase.table("Clients").select(CLIENT_COLUMNS).in_("id", ids).is_("deleted_at", "null").execute()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return ClientService._batch_results(ids, {row["id"]: row for row in response.data}, 200)
+
+    @staticmethod
+    async def batch_update_clients(batch: ClientBatchUpdate):
+        """
+        Apply many partial updates with one set-based UPDATE
+        
+        Fields left out of an item keep their current value. Later items
+        for the same id win.
+        """
+        updates = {}
+        for item in batch.updates:
+            updates[item.id] = {"id": item.id, **item.model_dump(exclude={"id"}, exclude_unset=True)}
+        try:
+            response = supabase.rpc("batch_update_clients", {"p_updates": list(updates.values())}).execute()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        found = {row["id"]: _client_fields(row) for row in response.data or []}
+        return ClientService._batch_results(list(updates), found, 200)
+
+    @staticmethod
+    async def batch_delete_clients(ids: list):
+        """
+        Soft delete many clients with one call, like delete_client
+        """
+        ids = list(dict.fromkeys(ids))
+        try:
+            response = supabase.rpc("soft_delete_clients", {"p_ids": ids}).execute()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        deleted = set()
+        for row in response.data or []:
+            token_denylist.revoke_generation(row["id"], row["session_generation"])
+            deleted.add(row["id"])
+        results = [
+            {"id": client_id, "status": 200} if client_id in deleted
+            else {"id": client_id, "status": 404, "detail": "Client not found"}
+            for client_id in ids
+        ]
+        return {"results": results}
@@ -0,0 +1,197 @@
+"""
+Bulk Client Import
+------------------
+
+Creates many clients at once from CSV (client_name,email,password header)
+or NDJSON input.
+
+Rows are processed in chunks of CLIENT_IMPORT_CHUNK_SIZE:
+1. every row is validated with ClientCreate; failures are reported per row
+2. passwords are bcrypt-hashed across a process pool, so hashing scales with
+   cores instead of running serially on the event loop
+3. the chunk is written by the import_clients database function, which
+   inserts the Clients and Authentication rows as two multi-row statements
+   in one transaction and skips emails that are already registered
+
+Because each chunk commits atomically, the last row of the last committed
+chunk is a safe checkpoint: re-running with `start_row` set to it resumes
+without duplicates. The CLI keeps this in a checkpoint file; the API
+reports it in the job progress.
+"""
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from concurrent.futures import ProcessPoolExecutor
+from ..models.client import ClientCreate
+from ..database.supabase import supabase
+from ..config.settings import settings
+from ..utils.security import pwd_context
+from datetime import datetime, timezone
+import asyncio
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import uuid
+
+logger = logging.getLogger(__name__)
+
+imports = {}  # import_id -> progress dict
+_import_tasks = set()
+_hash_pool = None
+
+def _hash_password(password: str) -> str:
+    # Runs in a worker process; must stay a plain top-level function
+    return pwd_context.hash(password)
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # Never fork the API process: the children would inherit its event
+        # loop, background threads and open connections
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.CLIENT_IMPORT_HASH_WORKERS or None,
+            mp_context=multiprocessing.get_context(method)
+        )
+    return _hash_pool
+
+def shutdown_hash_pool():
+    """
+    Stop the hashing processes, if any were started; called on app shutdown
+    """
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+def parse_rows(text: str, fmt: str):
+    """
+    Yield (row_number, raw dict or error message) for each data row, numbered from 1
+    """
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            # DictReader files fields beyond the header under the key None
+            yield number, row if None not in row else "Row has more fields than the header"
+        return
+    for number, line in enumerate((line for line in text.splitlines() if line.strip()), start=1):
+        try:
+            row = json.loads(line)
+            yield number, row if isinstance(row, dict) else "Row is not a JSON object"
+        except ValueError as e:
+            yield number, f"Invalid JSON: {str(e)}"
+
+def import_chunk(chunk: list) -> tuple:
+    """
+    Validate, hash and insert one chunk of (row_number, raw row)
+
+    Returns:
+        tuple: (number of clients created, list of per-row errors)
+    """
+    errors, valid = [], []
+    seen_emails = set()
+    for number, raw in chunk:
+        if isinstance(raw, str):
+            errors.append({"row": number, "error": raw})
+            continue
+        try:
+            client = ClientCreate(**raw)
+        except ValidationError as e:
+            errors.append({"row": number, "error": "; ".join(error["msg"] for error in e.errors())})
+            continue
+        except (TypeError, ValueError) as e:
+            # A malformed row must not abort the chunk
+            errors.append({"row": number, "error": str(e)})
+            continue
+        if client.email in seen_emails:
+            errors.append({"row": number, "error": "Duplicate email in import"})
+            continue
+        seen_emails.add(client.email)
+        valid.append((number, client))
+
+    if not valid:
+        return 0, errors
+
+    hashes = list(get_hash_pool().map(_hash_password, [client.password for _, client in valid], chunksize=16))
+    result = supabase.rpc("import_clients", {"p_rows": [
+        {"client_name": client.client_name, "email": client.email, "password_hash": password_hash}
+        for (_, client), password_hash in zip(valid, hashes)
+    ]}).execute()
+
+    created = set(result.data or [])
+    for number, client in valid:
+        if client.email not in created:
+            errors.append({"row": number, "error": "Email already registered"})
+    errors.sort(key=lambda error: error["row"])
+    return len(created), errors
+
+def run_import(text: str, fmt: str, start_row: int = 0, on_chunk=None) -> dict:
+    """
+    Import every row after `start_row`, calling `on_chunk(progress)` after each committed chunk
+    """
+    progress = {"rows_processed": 0, "clients_created": 0, "errors": [], "checkpoint_row": start_row}
+    chunk = []
+
+    def flush():
+        created, errors = import_chunk(chunk)
+        progress["rows_processed"] += len(chunk)
+        progress["clients_created"] += created
+        progress["errors"].extend(errors)
+        progress["checkpoint_row"] = chunk[-1][0]
+        chunk.clear()
+        if on_chunk:
+            on_chunk(progress)
+
+    for number, raw in parse_rows(text, fmt):
+        if number <= start_row:
+            continue
+        chunk.append((number, raw))
+        if len(chunk) >= settings.CLIENT_IMPORT_CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+    return progress
+
+class ClientImportService:
+    @staticmethod
+    async def start_import(text: str, fmt: str, start_row: int = 0):
+        if fmt not in ("csv", "ndjson"):
+            raise HTTPException(status_code=400, detail="Format must be csv or ndjson")
+
+        import_id = uuid.uuid4().hex
+        progress = {
+            "import_id": import_id,
+            "status": "running",
+            "rows_processed": 0,
+            "clients_created": 0,
+            "errors": [],
+            "checkpoint_row": start_row,
+            "started_at": datetime.now(timezone.utc),
+            "finished_at": None,
+            "error": None
+        }
+        imports[import_id] = progress
+
+        async def run():
+            try:
+                await asyncio.to_thread(run_import, text, fmt, start_row, progress.update)
+                progress["status"] = "completed"
+            except Exception as e:
+                logger.warning(f"Import {import_id} failed after row {progress['checkpoint_row']}: {str(e)}")
+                progress["status"] = "failed"
+                progress["error"] = str(e)
+            finally:
+                progress["finished_at"] = datetime.now(timezone.utc)
+
+        task = asyncio.create_task(run())
+        _import_tasks.add(task)
+        task.add_done_callback(_import_tasks.discard)
+        return progress
+
+    @staticmethod
+    async def get_import(import_id: str):
+        progress = imports.get(import_id)
+        if progress is None:
+            raise HTTPException(status_code=404, detail="Import not found")
+        return progress
@@ -0,0 +1,76 @@
+from fastapi import HTTPException
+from ..database.supabase import supabase
+from ..utils.denylist import token_denylist
+import base64
+import logging
+
+logger = logging.getLogger(__name__)
+
+SESSION_COLUMNS = "session_id, client_id, created_at, expires_at, last_activity"
+
+def _encode_cursor(session: dict) -> str:
+    raw = f"{session['created_at']}|{session['session_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Values are quoted into a PostgREST filter, so they must not contain quotes
+    if '"' in created_at or '"' in session_id:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, session_id
+
+class SessionService:
+    @staticmethod
+    async def list_client_sessions(client_id: int, limit: int = 50, after: str = None):
+        """
+        List a client's sessions, oldest first, using keyset pagination
+
+        Pages are ordered by (created_at, session_id) and the cursor encodes
+        the last row of the previous page, so every page is an index range
+        scan on Sessions (client_id, created_at, session_id) whatever its depth.
+
+        Returns:
+            dict: The sessions on this page and the cursor for the next one
+        """
+        try:
+            query = supabase.table("Sessions").select(SESSION_COLUMNS).eq("client_id", client_id)
+            if after:
+                created_at, session_id = _decode_cursor(after)
+                query = query.or_(
+                    f'created_at.gt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",session_id.gt."{session_id}")'
+                )
+            # Fetch one extra row to learn whether another page exists
+            result = query.order("created_at").order("session_id").limit(limit + 1).execute()
+            sessions = result.data[:limit]
+            next_cursor = _encode_cursor(sessions[-1]) if len(result.data) > limit else None
+            return {"sessions": sessions, "next_cursor": next_cursor}
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @staticmethod
+    async def revoke_all_sessions(client_id: int):
+        """
+        Log a client out everywhere
+
+        The revoke_client_sessions database function bumps the client's
+        session generation and deletes its sessions in one transaction.
+        Access tokens carry the generation they were issued under, so every
+        outstanding token is rejected from the new generation on.
+        """
+        logger.debug(f"Revoking all sessions for client: {client_id}")
+        try:
+            result = supabase.rpc("revoke_client_sessions", {"p_client_id": client_id}).execute()
+            if result.data is None:
+                raise HTTPException(status_code=404, detail="Client not found")
+            token_denylist.revoke_generation(client_id, result.data)
+            return {"message": "All sessions revoked"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
@@ -1 +1 @@
-from .security import verify_password, get_password_hash, create_access_token 
\ No newline at end of file
+from .security import verify_password, verify_client_password, get_password_hash, create_access_token, decode_access_token
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Session Activity Tracking
+-------------------------
+
+Keeps Sessions.last_activity current without a write per request.
+
+Authenticated requests only record their session id and a timestamp in
+memory. A lifespan task flushes everything recorded since the previous run
+as one batched update (the touch_sessions database function), so each
+session is written at most once per SESSION_ACTIVITY_FLUSH_SECONDS however
+busy it is. last_activity therefore lags real activity by at most one flush
+interval, which is plenty for idle timeouts measured in minutes or hours.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+class SessionActivityTracker:
+    def __init__(self):
+        self._pending = {}  # session_id -> last seen (unix time)
+
+    def record(self, session_id: str):
+        if session_id:
+            self._pending[session_id] = time.time()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def flush(self, supabase) -> int:
+        """
+        Write all pending activity in one round trip
+
+        Returns:
+            int: The number of sessions flushed
+        """
+        # Swap rather than copy so requests keep recording into a fresh dict
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        # One pass over the items keeps each id paired with its own timestamp
+        session_ids, activity = [], []
+        for session_id, ts in pending.items():
+            session_ids.append(session_id)
+            activity.append(datetime.fromtimestamp(ts, tz=timezone.utc).isoformat())
+        try:
+            supabase.rpc("touch_sessions", {
+                "p_session_ids": session_ids,
+                "p_activity": activity
+            }).execute()
+        except Exception:
+            # Put the batch back (newer activity wins) so it goes out on the next run
+            for session_id, ts in pending.items():
+                if self._pending.get(session_id, 0) < ts:
+                    self._pending[session_id] = ts
+            raise
+        logger.debug(f"Flushed activity for {len(pending)} sessions")
+        return len(pending)
+
+session_activity = SessionActivityTracker()
@@ -0,0 +1,37 @@
+"""
+Background Task Helpers
+-----------------------
+
+Small helpers for periodic maintenance jobs started from the application
+lifespan (see app/main.py). Jobs are plain synchronous callables, since the
+Supabase client is synchronous; they run in a worker thread so they never
+block the event loop serving requests.
+"""
+
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+async def run_periodically(name: str, interval_seconds: float, job, jitter_seconds: float = 0):
+    """
+    Run `job` every `interval_seconds` until cancelled
+
+    A random delay of up to `jitter_seconds` is added to each wait so that
+    workers started together do not hit the database in lockstep. Errors are
+    logged and the loop carries on with the next run.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds + random.uniform(0, jitter_seconds))
+        try:
+            await asyncio.to_thread(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Background job '{name}' failed: {str(e)}")
+
+async def cancel_tasks(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,200 @@
+"""
+Response Compression
+--------------------
+
+gzip/brotli compression for response bodies, negotiated from the request's
+Accept-Encoding (brotli preferred when both are acceptable).
+
+`CompressionMiddleware` compresses anything at least COMPRESSION_MINIMUM_SIZE
+bytes long, including streaming exports. A streamed response goes through one
+compressor from its first chunk to its last, so the client receives a single
+gzip/brotli stream; each chunk is flushed so rows still arrive as they are
+produced.
+Responses that already carry a Content-Encoding are passed through, which is
+how precompressed snapshots (see `SnapshotCache`) avoid being compressed
+again. Formats that are compressed already (Parquet) are left alone.
+
+`SnapshotCache` holds one version of an expensive response body. Each
+encoding is compressed once per version, at a higher level than is affordable
+per request, and then served as-is until the version changes.
+
+brotli is an optional dependency; without it only gzip is offered.
+"""
+
+import asyncio
+import threading
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Already compressed; recompressing costs CPU for nothing
+INCOMPRESSIBLE_MEDIA_TYPES = {"application/vnd.apache.parquet", "application/gzip", "application/zip"}
+
+# Snapshots are compressed once per version, so they can afford more effort
+SNAPSHOT_GZIP_LEVEL = 9
+SNAPSHOT_BROTLI_QUALITY = 9
+
+def brotli_available() -> bool:
+    return brotli is not None
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """
+    Pick "br", "gzip" or None from an Accept-Encoding header value
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def compress(data: bytes, encoding: str, level: int = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=SNAPSHOT_BROTLI_QUALITY if level is None else level)
+    compressor = zlib.compressobj(SNAPSHOT_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+class _StreamCompressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, more: bool) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + (self._brotli.flush() if more else self._brotli.finish())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH if more else zlib.Z_FINISH)
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether compression is worth it
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                media_type = headers.get("content-type", "").split(";")[0].strip()
+                if (
+                    "content-encoding" in headers
+                    or media_type in INCOMPRESSIBLE_MEDIA_TYPES
+                    or (not more and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                body = compressor.compress(body, more)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+            else:
+                body = compressor.compress(body, more)
+            await send({"type": "http.response.body", "body": body, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
+
+class Snapshot:
+    def __init__(self, version, body: bytes, media_type: str):
+        self.version = version
+        self.body = body
+        self.media_type = media_type
+        self._encoded = {}  # encoding -> compressed body
+        self._lock = threading.Lock()
+
+    def encoded_body(self, encoding: str) -> bytes:
+        """
+        Return the body compressed with `encoding`, compressing it on first use
+        """
+        encoded = self._encoded.get(encoding)
+        if encoded is None:
+            with self._lock:
+                encoded = self._encoded.get(encoding)
+                if encoded is None:
+                    encoded = self._encoded[encoding] = compress(self.body, encoding)
+        return encoded
+
+class SnapshotCache:
+    def __init__(self, media_type: str = "application/json"):
+        self.media_type = media_type
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self, version, build) -> Snapshot:
+        """
+        Return the snapshot for `version`, calling `build()` for its body if the
+        cached one is older
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshot = Snapshot(version, build(), self.media_type)
+        return snapshot
+
+async def snapshot_response(snapshot: Snapshot, accept_encoding: str, minimum_size: int = 1024) -> Response:
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding or "") if len(snapshot.body) >= minimum_size else None
+    if encoding is None:
+        return Response(content=snapshot.body, media_type=snapshot.media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    # Only the first request for a version pays for compression, off the event loop
+    body = await asyncio.to_thread(snapshot.encoded_body, encoding)
+    return Response(content=body, media_type=snapshot.media_type, headers=headers)
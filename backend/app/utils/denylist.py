@@ -0,0 +1,155 @@
+"""
+Access Token Denylist
+---------------------
+
+Tracks revoked access tokens by `jti` until they would have expired anyway.
+
+Revoked ids are grouped into sets keyed by the time bucket their token's
+`exp` falls into. A lookup is one dict get plus one set membership test and
+takes no lock; writers serialize among themselves and drop whole buckets
+once their window has passed, so memory stays proportional to the tokens
+revoked within one access token lifetime.
+
+Revoking every session of a client is a single counter bump instead: tokens
+embed the client's session generation (`gen`) at issue time, and any token
+whose generation is below the client's current one is rejected. A bump only
+matters until the last token issued before it has expired, so it is kept for
+one access token lifetime and then dropped.
+
+Revocations are persisted to the RevokedTokens table (and the generation to
+Clients.session_generation), and every worker pulls new rows in the
+background (see `sync`), so a logout on one worker is honoured by all of
+them within TOKEN_DENYLIST_SYNC_SECONDS. Reads are paginated, since PostgREST
+caps a response at 1000 rows, and each incremental read starts
+`sync_overlap_seconds` before the newest row already seen: revoked_at is
+stamped when a transaction starts, so a row can become visible after rows
+with later timestamps.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from ..config.settings import settings
+
+def _paginate(build_query, page_size: int):
+    # build_query() must return a freshly ordered query; pages are cut with range()
+    offset = 0
+    while True:
+        rows = build_query().range(offset, offset + page_size - 1).execute().data
+        yield from rows
+        if len(rows) < page_size:
+            return
+        offset += page_size
+
+class TokenDenylist:
+    def __init__(
+        self,
+        bucket_seconds: int = 60,
+        page_size: int = 1000,
+        sync_overlap_seconds: int = 30,
+        token_lifetime_seconds: int = 900
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.page_size = page_size
+        self.sync_overlap_seconds = sync_overlap_seconds
+        self.token_lifetime_seconds = token_lifetime_seconds
+        self._buckets = {}  # bucket index -> set of jti
+        self._write_lock = threading.Lock()
+        self._generations = {}  # client_id -> (lowest session generation still valid, when it stops mattering)
+        self.last_synced_at = None  # revoked_at of the newest row pulled from the table
+        self.last_generation_synced_at = None  # sessions_revoked_at of the newest client pulled
+
+    def _bucket(self, exp: float) -> int:
+        return int(exp // self.bucket_seconds)
+
+    def is_revoked(self, jti: str, exp: float) -> bool:
+        bucket = self._buckets.get(self._bucket(exp))
+        return bucket is not None and jti in bucket
+
+    def is_generation_revoked(self, client_id: int, generation: int) -> bool:
+        current = self._generations.get(client_id)
+        return current is not None and generation < current[0]
+
+    def revoke_generation(self, client_id: int, generation: int, revoked_at: float = None):
+        # Tokens issued before the bump are all expired one lifetime after it
+        forget_at = (revoked_at or time.time()) + self.token_lifetime_seconds
+        with self._write_lock:
+            current = self._generations.get(client_id)
+            if current is None or (generation, forget_at) > current:
+                self._generations[client_id] = (generation, forget_at)
+
+    def revoke(self, jti: str, exp: float):
+        now = time.time()
+        if exp <= now:
+            return
+        with self._write_lock:
+            key = self._bucket(exp)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = {jti}
+            else:
+                bucket.add(jti)
+            self._prune(now)
+
+    def _prune(self, now: float):
+        # A bucket is dead once every exp it could hold is in the past
+        horizon = self._bucket(now)
+        for key in [key for key in self._buckets if key < horizon]:
+            del self._buckets[key]
+
+    def _prune_generations(self, now: float):
+        for client_id in [client_id for client_id, (_, forget_at) in self._generations.items() if forget_at <= now]:
+            del self._generations[client_id]
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in list(self._buckets.values()))
+
+    def sync(self, supabase):
+        """
+        Pull revocations recorded by other workers since the last sync
+        """
+        since = self.last_synced_at
+        now = datetime.now(timezone.utc)
+
+        def revoked_tokens():
+            query = supabase.table("RevokedTokens").select("jti, expires_at, revoked_at")
+            if since is not None:
+                # Re-read the overlap window for late commits; re-adding a jti is harmless
+                window_start = datetime.fromisoformat(since) - timedelta(seconds=self.sync_overlap_seconds)
+                query = query.gte("revoked_at", window_start.isoformat())
+            else:
+                query = query.gt("expires_at", now.isoformat())
+            return query.order("revoked_at").order("jti")
+
+        newest = None
+        for row in _paginate(revoked_tokens, self.page_size):
+            self.revoke(row["jti"], datetime.fromisoformat(row["expires_at"]).timestamp())
+            newest = row["revoked_at"]
+        if newest is not None:
+            self.last_synced_at = newest
+        with self._write_lock:
+            self._prune(time.time())
+
+        generation_since = self.last_generation_synced_at
+
+        def revoked_generations():
+            query = supabase.table("Clients").select("id, session_generation, sessions_revoked_at")
+            if generation_since is not None:
+                window_start = datetime.fromisoformat(generation_since) - timedelta(seconds=self.sync_overlap_seconds)
+            else:
+                # Older bumps can no longer reject anything
+                window_start = now - timedelta(seconds=self.token_lifetime_seconds)
+            return query.gte("sessions_revoked_at", window_start.isoformat()).order("sessions_revoked_at").order("id")
+
+        newest = None
+        for row in _paginate(revoked_generations, self.page_size):
+            revoked_at = row["sessions_revoked_at"]
+            self.revoke_generation(row["id"], row["session_generation"], datetime.fromisoformat(revoked_at).timestamp())
+            newest = revoked_at
+        if newest is not None:
+            self.last_generation_synced_at = newest
+        with self._write_lock:
+            self._prune_generations(time.time())
+
+token_denylist = TokenDenylist(token_lifetime_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
@@ -2,45 +2,73 @@
 Email Utility Module
 
 This module provides functionality for sending emails, particularly
-for the password reset feature. In a production environment, this would
-integrate with a proper email service like SendGrid, Mailgun, or AWS SES.
+for the password reset feature.
 
-For demonstration purposes, this just prints the emails to the console
-and returns success.
+Emails are not sent inline: they are written to the EmailOutbox table and
+delivered by the outbox worker (see app/utils/outbox.py) over a pooled SMTP
+connection. Without SMTP_HOST configured the worker only logs each message,
+which is convenient for local development.
 """
 
 import logging
 from ..config.settings import settings
+from ..database.supabase import supabase
+from .outbox import EmailOutboxWorker, enqueue_email
+from .smtp_pool import LoggingTransport, SMTPConnectionPool
+from .templates import EmailTemplateRegistry
 
 logger = logging.getLogger(__name__)
 
-async def send_password_reset_email(email: str, token: str) -> bool:
+if settings.SMTP_HOST:
+    email_transport = SMTPConnectionPool(
+        settings.SMTP_HOST,
+        settings.SMTP_PORT,
+        username=settings.SMTP_USERNAME,
+        password=settings.SMTP_PASSWORD,
+        use_tls=settings.SMTP_USE_TLS,
+        size=settings.SMTP_POOL_SIZE
+    )
+else:
+    email_transport = LoggingTransport()
+
+outbox_worker = EmailOutboxWorker(
+    email_transport,
+    sender=settings.EMAIL_FROM,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retention_days=settings.EMAIL_OUTBOX_RETENTION_DAYS
+)
+
+# Values shared by every message are baked into the compiled templates
+email_templates = EmailTemplateRegistry(
+    settings.EMAIL_DEFAULT_LOCALE,
+    static_context={
+        "frontend_url": settings.FRONTEND_URL,
+        "expire_minutes": settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES
+    }
+)
+
+def render_password_reset_email(token: str, locale: str = None) -> tuple:
     """
-    Sends a password reset email with a reset link
+    Returns:
+        tuple: (subject, text body, HTML body)
+    """
+    reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token}"
+    return email_templates.render("password_reset", locale, reset_url=reset_url)
+
+async def send_password_reset_email(email: str, token: str, locale: str = None) -> bool:
+    """
+    Queues a password reset email with a reset link
     
     Args:
         email: The recipient's email address
         token: The password reset token
+        locale: Optional language for the email, e.g. "es"
         
     Returns:
-        bool: True if email is sent successfully
+        bool: True if the email was queued successfully
     """
-    # In a production environment, this would actually send an email
-    reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token}"
-    
-    # Log the email that would be sent
-    logger.info(f"\n{'='*50}")
-    logger.info(f"SENDING PASSWORD RESET EMAIL")
-    logger.info(f"{'='*50}")
-    logger.info(f"To: {email}")
-    logger.info(f"Subject: Password Reset Request")
-    logger.info(f"Body:")
-    logger.info(f"Hello,")
-    logger.info(f"You have requested to reset your password.")
-    logger.info(f"Please click on the following link to reset your password:")
-    logger.info(f"{reset_url}")
-    logger.info(f"If you did not request this, please ignore this email.")
-    logger.info(f"{'='*50}\n")
-    
-    # In a real implementation, this would return the actual send status
-    return True 
\ No newline at end of file
+    subject, body_text, body_html = render_password_reset_email(token, locale)
+    enqueue_email(supabase, email, subject, body_text, body_html)
+    logger.debug(f"Password reset email queued for {email}")
+    return True
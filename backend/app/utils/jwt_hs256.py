@@ -0,0 +1,88 @@
+"""
+HS256 JWT Codec
+---------------
+
+A specialized encoder/decoder for the single token shape this API issues:
+HS256-signed JWTs with a small flat claims dict.
+
+Everything that does not depend on the claims is computed once per codec:
+- the base64url header segment ({"alg":"HS256","typ":"JWT"})
+- the keyed HMAC object, which is copied per token instead of re-keyed
+
+Claims are serialized with orjson and `exp` is handled as an integer Unix
+timestamp, so neither encoding nor validation allocates datetimes.
+Tokens are wire-compatible with python-jose and PyJWT.
+"""
+
+import base64
+import hashlib
+import hmac
+import time
+
+import orjson
+
+class TokenError(ValueError):
+    """Raised when a token is malformed, has a bad signature or is expired."""
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+class HS256Codec:
+    def __init__(self, secret: str):
+        self._mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+        self._header = _b64encode(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+        self._prefix = self._header + b"."
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: dict, expires_in: int = None) -> str:
+        """
+        Encode claims into a signed token
+
+        Args:
+            claims: The claims to sign; not modified
+            expires_in: Optional lifetime in seconds, stored as `exp`
+
+        Returns:
+            str: The compact-serialized JWT
+        """
+        if expires_in is not None:
+            claims = {**claims, "exp": int(time.time()) + expires_in}
+        signing_input = self._prefix + _b64encode(orjson.dumps(claims))
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        """
+        Verify a token's signature and expiry and return its claims
+
+        Raises:
+            TokenError: If the token is malformed, forged or expired
+        """
+        try:
+            raw = token.encode("ascii")
+            signing_input, _, signature = raw.rpartition(b".")
+            header, _, payload = signing_input.partition(b".")
+            if header != self._header or not payload:
+                # Any other alg (including "none") is rejected outright
+                raise TokenError("Unsupported token header")
+            if not hmac.compare_digest(self._sign(signing_input), _b64decode(signature)):
+                raise TokenError("Signature verification failed")
+            claims = orjson.loads(_b64decode(payload))
+        except TokenError:
+            raise
+        except (ValueError, UnicodeError) as e:
+            raise TokenError("Malformed token") from e
+
+        if not isinstance(claims, dict):
+            raise TokenError("Malformed token")
+        if verify_exp:
+            exp = claims.get("exp")
+            if exp is not None and (not isinstance(exp, (int, float)) or exp <= time.time()):
+                raise TokenError("Token has expired")
+        return claims
@@ -0,0 +1,146 @@
+"""
+Asymmetric JWT Signing
+----------------------
+
+Signs access tokens with EdDSA (Ed25519) or ES256 (P-256) keys so that
+downstream services can verify them locally against our published JWKS
+instead of calling back or sharing JWT_SECRET.
+
+Keys are loaded from PEM files in JWT_KEYS_DIR; each file's stem is its
+`kid`. Private keys can sign, public-only PEMs are kept for verification of
+tokens signed by retired keys. JWT_SIGNING_KID selects the key used for new
+tokens (defaulting to the last private key by name), so rotation is:
+1. drop a new key into the directory and publish it (JWKS picks it up)
+2. point JWT_SIGNING_KID at it
+3. replace the old private key with its public half until its tokens expire
+
+Header segments and the JWKS document are precomputed per key ring.
+"""
+
+import base64
+import time
+from pathlib import Path
+
+import orjson
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
+
+from .jwt_hs256 import TokenError
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+class _SigningKey:
+    def __init__(self, kid: str, private_key=None, public_key=None):
+        self.kid = kid
+        self.private_key = private_key
+        self.public_key = public_key or private_key.public_key()
+
+        if isinstance(self.public_key, ed25519.Ed25519PublicKey):
+            self.alg = "EdDSA"
+            raw = self.public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+            self.jwk = {"kty": "OKP", "crv": "Ed25519", "x": _b64encode(raw).decode()}
+        elif isinstance(self.public_key, ec.EllipticCurvePublicKey) and isinstance(self.public_key.curve, ec.SECP256R1):
+            self.alg = "ES256"
+            numbers = self.public_key.public_numbers()
+            self.jwk = {
+                "kty": "EC",
+                "crv": "P-256",
+                "x": _b64encode(numbers.x.to_bytes(32, "big")).decode(),
+                "y": _b64encode(numbers.y.to_bytes(32, "big")).decode(),
+            }
+        else:
+            raise ValueError(f"Unsupported key type for kid '{kid}': only Ed25519 and P-256 keys are supported")
+
+        self.jwk.update({"kid": kid, "alg": self.alg, "use": "sig"})
+        self.header = _b64encode(orjson.dumps({"alg": self.alg, "kid": kid, "typ": "JWT"}))
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if self.alg == "EdDSA":
+            return self.private_key.sign(signing_input)
+        r, s = decode_dss_signature(self.private_key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+        return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+    def verify(self, signature: bytes, signing_input: bytes):
+        if self.alg == "EdDSA":
+            self.public_key.verify(signature, signing_input)
+            return
+        if len(signature) != 64:
+            raise InvalidSignature()
+        der = encode_dss_signature(int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big"))
+        self.public_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+
+class AsymmetricKeyRing:
+    def __init__(self, keys, signing_kid: str = None):
+        if not keys:
+            raise ValueError("At least one signing key is required")
+        self._keys = {key.kid: key for key in keys}
+        self._by_header = {key.header: key for key in keys}
+
+        signers = [key for key in keys if key.private_key is not None]
+        if signing_kid:
+            signer = self._keys.get(signing_kid)
+            if signer is None or signer.private_key is None:
+                raise ValueError(f"No private key found for JWT_SIGNING_KID '{signing_kid}'")
+        elif signers:
+            signer = signers[-1]
+        else:
+            raise ValueError("No private key available for signing")
+        self._signer = signer
+        self._prefix = signer.header + b"."
+        self.jwks_json = orjson.dumps({"keys": [key.jwk for key in keys]})
+
+    @classmethod
+    def from_directory(cls, directory: str, signing_kid: str = None) -> "AsymmetricKeyRing":
+        keys = []
+        for path in sorted(Path(directory).glob("*.pem")):
+            data = path.read_bytes()
+            if b"PRIVATE KEY" in data:
+                keys.append(_SigningKey(path.stem, private_key=serialization.load_pem_private_key(data, password=None)))
+            else:
+                keys.append(_SigningKey(path.stem, public_key=serialization.load_pem_public_key(data)))
+        return cls(keys, signing_kid)
+
+    @property
+    def signing_kid(self) -> str:
+        return self._signer.kid
+
+    def encode(self, claims: dict, expires_in: int = None) -> str:
+        if expires_in is not None:
+            claims = {**claims, "exp": int(time.time()) + expires_in}
+        signing_input = self._prefix + _b64encode(orjson.dumps(claims))
+        return (signing_input + b"." + _b64encode(self._signer.sign(signing_input))).decode()
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        try:
+            raw = token.encode("ascii")
+            signing_input, _, signature = raw.rpartition(b".")
+            header, _, payload = signing_input.partition(b".")
+            key = self._by_header.get(header)
+            if key is None:
+                # Not one of our precomputed headers; fall back to reading the kid
+                parsed = orjson.loads(_b64decode(header))
+                key = self._keys.get(parsed.get("kid")) if isinstance(parsed, dict) else None
+                if key is None or parsed.get("alg") != key.alg:
+                    raise TokenError("Unknown signing key")
+            key.verify(_b64decode(signature), signing_input)
+            claims = orjson.loads(_b64decode(payload))
+        except TokenError:
+            raise
+        except InvalidSignature as e:
+            raise TokenError("Signature verification failed") from e
+        except (ValueError, UnicodeError) as e:
+            raise TokenError("Malformed token") from e
+
+        if not isinstance(claims, dict):
+            raise TokenError("Malformed token")
+        if verify_exp:
+            exp = claims.get("exp")
+            if exp is not None and (not isinstance(exp, (int, float)) or exp <= time.time()):
+                raise TokenError("Token has expired")
+        return claims
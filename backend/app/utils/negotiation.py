@@ -0,0 +1,149 @@
+"""
+MessagePack Content Negotiation
+-------------------------------
+
+Internal services can talk MessagePack instead of JSON to skip the JSON
+encode/decode on both ends. JSON stays the default; the React frontend
+never sends these headers.
+
+Routers opt in with `APIRouter(..., route_class=MsgPackRoute)`:
+- `Content-Type: application/msgpack` bodies are decoded with msgpack and
+  handed to FastAPI as the already-parsed body, so they validate into the
+  same pydantic models as JSON bodies.
+- `Accept: application/msgpack` responses are rendered by `MsgPackResponse`.
+  Each route's handler is built twice, once per response class, so the
+  response_model is still validated and encoded exactly once.
+- Trusted responses (`trusted_json_response`) defer rendering, so they are
+  rendered straight to MessagePack from their content, never to JSON first.
+  Their status, headers and background task carry over.
+
+Error responses (HTTPException, validation errors) stay JSON.
+
+msgpack is an optional dependency; without it Accept falls back to JSON and
+MessagePack request bodies are refused with 415.
+"""
+
+from typing import Any
+
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+
+from .responses import TrustedJSONResponse
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+def _media_type(value: str) -> str:
+    return value.split(";")[0].strip().lower()
+
+def is_msgpack(content_type: str) -> bool:
+    return _media_type(content_type or "") in MSGPACK_MEDIA_TYPES
+
+def prefers_msgpack(accept: str) -> bool:
+    """
+    Whether an Accept header ranks MessagePack above JSON
+    """
+    if msgpack is None or not accept:
+        return False
+    msgpack_quality = json_quality = 0.0
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        media_type = _media_type(media_type)
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_quality = max(msgpack_quality, quality)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_quality = max(json_quality, quality)
+    # Ties go to JSON so "Accept: */*" keeps today's behaviour
+    return msgpack_quality > json_quality
+
+def _default(value):
+    # Rows come straight from the database, so anything left over is a
+    # datetime/date/UUID/Decimal; send the same text JSON would carry
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+def packb(content: Any) -> bytes:
+    return msgpack.packb(content, default=_default)
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
+
+class _MsgPackRequest(Request):
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            try:
+                self._json = msgpack.unpackb(await self.body())
+            except Exception as e:
+                raise HTTPException(status_code=400, detail="Invalid MessagePack body") from e
+        return self._json
+
+def _as_json_request(request: Request) -> Request:
+    # FastAPI only hands JSON content types to request.json(); relabel the body
+    # and let _MsgPackRequest.json() decode it instead
+    scope = dict(request.scope)
+    headers = MutableHeaders(scope=scope)
+    headers["content-type"] = "application/json"
+    scope["headers"] = headers.raw
+    return _MsgPackRequest(scope, request.receive)
+
+def _as_msgpack_response(response: TrustedJSONResponse) -> MsgPackResponse:
+    converted = MsgPackResponse(
+        content=response.content,
+        status_code=response.status_code,
+        background=response.background
+    )
+    # Everything but the JSON body's own Content-Type/Content-Length, repeated
+    # headers (Set-Cookie) included
+    converted.raw_headers.extend(
+        (key, value) for key, value in response.raw_headers if key not in (b"content-type", b"content-length")
+    )
+    return converted
+
+class MsgPackRoute(APIRoute):
+    def get_route_handler(self):
+        json_handler = super().get_route_handler()
+        response_class = self.response_class
+        try:
+            self.response_class = MsgPackResponse
+            msgpack_handler = super().get_route_handler()
+        finally:
+            self.response_class = response_class
+
+        async def handler(request: Request) -> Response:
+            if is_msgpack(request.headers.get("content-type")):
+                if msgpack is None:
+                    raise HTTPException(status_code=415, detail="MessagePack is not supported by this server")
+                request = _as_json_request(request)
+
+            if not prefers_msgpack(request.headers.get("accept")):
+                response = await json_handler(request)
+            else:
+                response = await msgpack_handler(request)
+                if isinstance(response, TrustedJSONResponse):
+                    response = _as_msgpack_response(response)
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return handler
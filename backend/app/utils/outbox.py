@@ -0,0 +1,131 @@
+"""
+Email Outbox
+------------
+
+Durable queue of outgoing emails backed by the EmailOutbox table.
+
+Request handlers only insert a row (`enqueue_email`), so SMTP latency and
+outages never reach the API. A lifespan task drains the table: it claims a
+batch of due messages with the claim_email_batch database function (which
+leases rows with SKIP LOCKED so several workers can drain concurrently),
+sends them over a pooled SMTP connection, marks all successes sent in one
+update and reschedules failures with exponential backoff. Messages that
+keep failing are marked failed after EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+Sent and failed messages still hold their rendered bodies, reset links
+included, so they are stamped with an expires_at `retention_days` out and
+deleted by the ExpirySweeper like any other expired row.
+"""
+
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+def enqueue_email(supabase, recipient: str, subject: str, body_text: str, body_html: str = None):
+    supabase.table("EmailOutbox").insert({
+        "recipient": recipient,
+        "subject": subject,
+        "body_text": body_text,
+        "body_html": body_html
+    }).execute()
+
+def enqueue_emails(supabase, messages: list):
+    """
+    Queue many emails with one multi-row insert
+
+    Each message is a dict with recipient, subject, body_text and optionally
+    body_html and next_attempt_at (to schedule delivery for later).
+    """
+    if messages:
+        supabase.table("EmailOutbox").insert(messages).execute()
+
+def build_message(sender: str, row: dict) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = row["recipient"]
+    message["Subject"] = row["subject"]
+    message.set_content(row["body_text"])
+    if row.get("body_html"):
+        message.add_alternative(row["body_html"], subtype="html")
+    return message
+
+class EmailOutboxWorker:
+    def __init__(
+        self,
+        transport,
+        sender: str,
+        batch_size: int = 50,
+        max_attempts: int = 8,
+        lease_seconds: int = 300,
+        backoff_base_seconds: float = 30,
+        backoff_max_seconds: float = 3600,
+        retention_days: float = 7
+    ):
+        self.transport = transport
+        self.sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.retention_days = retention_days
+        self.metrics = {"sent": 0, "retried": 0, "failed": 0}
+
+    def _expires_at(self) -> str:
+        return (datetime.now(timezone.utc) + timedelta(days=self.retention_days)).isoformat()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_base_seconds * 2 ** (attempts - 1), self.backoff_max_seconds)
+        return delay * random.uniform(0.8, 1.2)
+
+    def drain(self, supabase) -> int:
+        """
+        Send due messages until the outbox is empty or a batch comes back short
+
+        Returns:
+            int: The number of messages sent
+        """
+        sent_total = 0
+        while True:
+            batch = supabase.rpc("claim_email_batch", {
+                "p_limit": self.batch_size,
+                "p_lease_seconds": self.lease_seconds
+            }).execute().data or []
+
+            sent_ids = []
+            for row in batch:
+                try:
+                    self.transport.send(build_message(self.sender, row))
+                    sent_ids.append(row["id"])
+                except Exception as e:
+                    self._reschedule(supabase, row, e)
+
+            if sent_ids:
+                supabase.table("EmailOutbox").update({
+                    "status": "sent",
+                    "sent_at": datetime.now(timezone.utc).isoformat(),
+                    "expires_at": self._expires_at(),
+                    "locked_until": None
+                }).in_("id", sent_ids).execute()
+                self.metrics["sent"] += len(sent_ids)
+                sent_total += len(sent_ids)
+
+            if len(batch) < self.batch_size:
+                return sent_total
+
+    def _reschedule(self, supabase, row: dict, error: Exception):
+        attempts = row["attempts"] + 1
+        update = {"attempts": attempts, "last_error": str(error)[:500], "locked_until": None}
+        if attempts >= self.max_attempts:
+            update["status"] = "failed"
+            update["expires_at"] = self._expires_at()
+            self.metrics["failed"] += 1
+            logger.warning(f"Giving up on email {row['id']} after {attempts} attempts: {str(error)}")
+        else:
+            next_attempt = datetime.now(timezone.utc) + timedelta(seconds=self.backoff(attempts))
+            update["next_attempt_at"] = next_attempt.isoformat()
+            self.metrics["retried"] += 1
+        supabase.table("EmailOutbox").update(update).eq("id", row["id"]).execute()
@@ -0,0 +1,80 @@
+"""
+Stateless Password Reset Tokens
+-------------------------------
+
+Reset tokens that need no ResetTokens row. A token is
+
+    base64url("<client_id>:<expires_at>:<fingerprint>") "." base64url(HMAC-SHA256)
+
+where the fingerprint is the first 16 hex digits of SHA-256 over the
+client's current password hash. Signature and expiry are checked in memory.
+Single use comes from the fingerprint: the reset_password_stateless database
+function only updates the password while the stored hash still matches it,
+and the update itself changes the hash, so the token can never match again.
+
+Database tokens are UUIDs and never contain a ".", so both formats can be
+accepted side by side while PASSWORD_RESET_TOKEN_FORMAT is switched.
+"""
+
+import base64
+import hashlib
+import hmac
+import time
+
+FINGERPRINT_LENGTH = 16
+
+class ResetTokenError(ValueError):
+    """Raised when a stateless reset token is malformed, forged or expired."""
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def password_hash_fingerprint(password_hash: str) -> str:
+    return hashlib.sha256(password_hash.encode()).hexdigest()[:FINGERPRINT_LENGTH]
+
+def is_stateless_reset_token(token: str) -> bool:
+    return "." in token
+
+class ResetTokenSigner:
+    def __init__(self, secret: str):
+        # Derive a dedicated key so reset tokens can never pass as anything else
+        key = hmac.new(secret.encode(), b"password-reset-token", hashlib.sha256).digest()
+        self._mac = hmac.new(key, digestmod=hashlib.sha256)
+
+    def _sign(self, payload: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(payload)
+        return mac.digest()
+
+    def create(self, client_id: int, password_hash: str, expires_in: int) -> str:
+        payload = f"{client_id}:{int(time.time()) + expires_in}:{password_hash_fingerprint(password_hash)}".encode()
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload))}"
+
+    def verify(self, token: str) -> tuple:
+        """
+        Check a token's signature and expiry
+
+        Returns:
+            tuple: (client_id, fingerprint)
+
+        Raises:
+            ResetTokenError: If the token is malformed, forged or expired
+        """
+        try:
+            encoded_payload, _, encoded_signature = token.partition(".")
+            payload = _b64decode(encoded_payload)
+            if not hmac.compare_digest(self._sign(payload), _b64decode(encoded_signature)):
+                raise ResetTokenError("Signature verification failed")
+            client_id, expires_at, fingerprint = payload.decode().split(":")
+            client_id, expires_at = int(client_id), int(expires_at)
+        except ResetTokenError:
+            raise
+        except (ValueError, UnicodeError) as e:
+            raise ResetTokenError("Malformed token") from e
+
+        if expires_at <= time.time():
+            raise ResetTokenError("Token has expired")
+        return client_id, fingerprint
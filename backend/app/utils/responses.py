@@ -0,0 +1,62 @@
+"""
+Response Helpers
+----------------
+
+The app serializes responses with orjson (ORJSONResponse is the default
+response class, see app/main.py).
+
+Handlers that already hold rows shaped exactly like their response model,
+because the repository selected precisely those columns from a typed
+database, can return `trusted_json_response(rows)`. Returning a Response
+instance skips FastAPI's response_model validation, so the rows go straight
+from the Supabase client to orjson with no pydantic round trip. The
+response_model on the route is still used for the OpenAPI schema.
+
+The rows are kept on the response (`content`) and the JSON body is only
+rendered when the response is sent, so MessagePack routes (see
+app/utils/negotiation.py) can render the rows as MessagePack instead without
+encoding them as JSON first.
+"""
+
+from typing import Any, Mapping
+
+from fastapi.responses import ORJSONResponse
+from starlette.background import BackgroundTask
+
+class TrustedJSONResponse(ORJSONResponse):
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Mapping[str, str] = None,
+        media_type: str = None,
+        background: BackgroundTask = None
+    ):
+        self.content = content
+        self.status_code = status_code
+        if media_type is not None:
+            self.media_type = media_type
+        self.background = background
+        # No body yet, so Content-Length is left out until render_body()
+        self.body = None
+        self.init_headers(headers)
+
+    def render_body(self) -> bytes:
+        """
+        Render the JSON body on first use
+        """
+        if self.body is None:
+            self.body = self.render(self.content)
+            if (
+                b"content-length" not in (key for key, _ in self.raw_headers)
+                and not (self.status_code < 200 or self.status_code in (204, 304))
+            ):
+                self.raw_headers.append((b"content-length", str(len(self.body)).encode("latin-1")))
+        return self.body
+
+    async def __call__(self, scope, receive, send):
+        self.render_body()
+        await super().__call__(scope, receive, send)
+
+def trusted_json_response(content, status_code: int = 200, headers: Mapping[str, str] = None) -> TrustedJSONResponse:
+    return TrustedJSONResponse(content=content, status_code=status_code, headers=headers)
@@ -0,0 +1,290 @@
+"""
+In-Memory Client Search Index
+-----------------------------
+
+Optional alternative to the pg_trgm-backed search_clients database function
+(CLIENT_SEARCH_BACKEND = "memory"), for deployments that would rather spend
+RAM than database CPU on admin search.
+
+The index holds the live clients and:
+- a sorted list of (lowercased name or email, id) for prefix matching by
+  binary search
+- per field, the distinct lowercased values with the ids holding them, and
+  a (trigram, trigram count) -> values posting map for fuzzy matching
+
+Ranking is the same as the database function's: prefix matches first,
+ordered by the matching name or email (the smaller one if both match) and
+then id; then fuzzy matches by trigram similarity, ties broken by id.
+Similarity is pg_trgm's: trigrams of each alphanumeric word padded with two
+leading blanks and one trailing blank, shared / union of the trigram sets,
+taken for name and email separately and the better of the two used.
+
+Fuzzy candidates are found without scanning whole posting lists. A value
+with f trigrams needs some minimum number of shared trigrams to reach the
+threshold, so it must contain at least one of the query's rarest trigrams
+among values of that length; only those postings are read, and every
+candidate is then checked against the rest of the query. Values repeated
+across clients (names) are scored once. At most MAX_CANDIDATES values per
+field are scored, lengths closest to the query's first: a query whose rare
+trigrams are all common in the data can miss weak matches the database
+would return, never strong ones that share its rarest trigrams.
+
+The index follows the client change feed (ClientService.fetch_changes), so
+a lifespan task keeps it current by applying only what changed. The first
+sync collects the whole feed and builds the index in one pass (one sort of
+the prefix keys); later syncs insert changes into the sorted list one by
+one. Until the first sync completes `ready` is False and searches go to the
+database.
+"""
+
+import bisect
+import heapq
+import itertools
+import math
+import re
+import threading
+from collections import Counter
+
+_WORD = re.compile(r"[^\W_]+")
+
+def trigrams(text: str) -> set:
+    # Padded like pg_trgm so short words and word starts still produce trigrams
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+FIELDS = ("client_name", "email")
+
+# Fuzzy values scored per field and query; bounds the cost of a search
+MAX_CANDIDATES = 2000
+
+_EMPTY = frozenset()
+
+class ClientSearchIndex:
+    def __init__(self, similarity_threshold: float = 0.3):
+        self.similarity_threshold = similarity_threshold
+        self._clients = {}  # id -> client dict
+        self._values = tuple({} for _ in FIELDS)  # per field: lowercased value -> set of ids
+        self._postings = tuple({} for _ in FIELDS)  # per field: (trigram, value trigram count) -> set of values
+        self._sizes = tuple(Counter() for _ in FIELDS)  # per field: trigram count -> number of values
+        self._prefix_keys = []  # sorted (lowercased name or email, id)
+        self._lock = threading.Lock()
+        self.cursor = None  # change feed position
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    @staticmethod
+    def _keys(client: dict) -> set:
+        return {value.lower() for value in (client.get(field) for field in FIELDS) if value}
+
+    def _remove(self, client_id: int):
+        client = self._clients.pop(client_id, None)
+        if client is None:
+            return
+        for field, values, postings, sizes in zip(FIELDS, self._values, self._postings, self._sizes):
+            value = (client.get(field) or "").lower()
+            ids = values.get(value)
+            if ids is None:
+                continue
+            ids.discard(client_id)
+            if ids:
+                continue
+            # Last client with this value
+            del values[value]
+            grams = trigrams(value)
+            sizes[len(grams)] -= 1
+            for gram in grams:
+                key = (gram, len(grams))
+                postings[key].discard(value)
+                if not postings[key]:
+                    del postings[key]
+        for key in self._keys(client):
+            index = bisect.bisect_left(self._prefix_keys, (key, client_id))
+            if index < len(self._prefix_keys) and self._prefix_keys[index] == (key, client_id):
+                del self._prefix_keys[index]
+
+    @staticmethod
+    def _index(client: dict, clients: dict, values: tuple, postings: tuple, sizes: tuple):
+        client_id = client["id"]
+        clients[client_id] = client
+        for field, field_values, field_postings, field_sizes in zip(FIELDS, values, postings, sizes):
+            value = client.get(field)
+            if not value:
+                continue
+            value = value.lower()
+            ids = field_values.get(value)
+            if ids is not None:
+                ids.add(client_id)
+                continue
+            field_values[value] = {client_id}
+            grams = trigrams(value)
+            field_sizes[len(grams)] += 1
+            for gram in grams:
+                key = (gram, len(grams))
+                holders = field_postings.get(key)
+                if holders is None:
+                    holders = field_postings[key] = set()
+                holders.add(value)
+
+    def _add(self, client: dict):
+        # Incremental updates only; a full load goes through build()
+        self._index(client, self._clients, self._values, self._postings, self._sizes)
+        for key in self._keys(client):
+            bisect.insort(self._prefix_keys, (key, client["id"]))
+
+    def build(self, clients):
+        """
+        Replace the index contents with `clients` in one pass
+        """
+        indexed, prefix_keys = {}, []
+        values, postings, sizes = tuple({} for _ in FIELDS), tuple({} for _ in FIELDS), tuple(Counter() for _ in FIELDS)
+        for client in clients:
+            self._index(client, indexed, values, postings, sizes)
+            prefix_keys.extend((key, client["id"]) for key in self._keys(client))
+        prefix_keys.sort()
+        # Searches keep running on the old structures until the swap
+        with self._lock:
+            self._clients, self._values, self._postings, self._sizes = indexed, values, postings, sizes
+            self._prefix_keys = prefix_keys
+
+    def apply(self, changes: list):
+        for change in changes:
+            # Per change, so a large page never holds searches up for long
+            with self._lock:
+                self._remove(change["id"])
+                if change["op"] == "upsert":
+                    self._add(change["client"])
+
+    def sync(self, fetch_changes, page_size: int = 5000):
+        """
+        Apply every change after the current cursor
+        """
+        if not self.ready:
+            self._initial_sync(fetch_changes, page_size)
+            return
+        while True:
+            page = fetch_changes(self.cursor, page_size)
+            self.apply(page["changes"])
+            self.cursor = page["next_cursor"]
+            if not page["has_more"]:
+                return
+
+    def _initial_sync(self, fetch_changes, page_size: int):
+        # The cursor only moves once the index is built, so a failed first
+        # sync starts over instead of leaving the index half loaded
+        clients, cursor = {}, self.cursor
+        while True:
+            page = fetch_changes(cursor, page_size)
+            for change in page["changes"]:
+                if change["op"] == "upsert":
+                    clients[change["id"]] = change["client"]
+                else:
+                    clients.pop(change["id"], None)
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+        self.build(clients.values())
+        self.cursor = cursor
+        self.ready = True
+
+    def _prefix_matches(self, query: str, limit: int) -> list:
+        matches = []
+        seen = set()
+        index = bisect.bisect_left(self._prefix_keys, (query, -1))
+        while index < len(self._prefix_keys) and len(matches) < limit:
+            key, client_id = self._prefix_keys[index]
+            if not key.startswith(query):
+                break
+            if client_id not in seen:
+                seen.add(client_id)
+                matches.append(client_id)
+            index += 1
+        return matches
+
+    def _minimum_shared(self, query_size: int, size: int) -> int:
+        # Fewest shared trigrams with which shared / (query + size - shared)
+        # reaches the threshold (rounded down a hair so float error never
+        # drops a match)
+        threshold = self.similarity_threshold
+        return max(1, math.ceil(threshold * (query_size + size) / (1 + threshold) - 1e-9))
+
+    def _scored_values(self, query_grams: set, postings: dict, sizes: Counter) -> list:
+        """
+        Return (similarity, value) for the values of one field that reach the
+        threshold
+        """
+        query_size = len(query_grams)
+        # Per value length: the query's postings among values of that length,
+        # rarest first, and the shared trigrams needed to reach the threshold
+        holders, needed, sources = {}, {}, []
+        for size in sizes:
+            needed[size] = self._minimum_shared(query_size, size)
+            if needed[size] > min(query_size, size) or not sizes[size]:
+                continue
+            holders[size] = sorted((postings.get((gram, size), _EMPTY) for gram in query_grams), key=len)
+            # Any value sharing `needed` trigrams shares one of the
+            # query_size - needed + 1 rarest
+            sources += ((len(values), size, index) for index, values in enumerate(holders[size][:query_size - needed[size] + 1]))
+
+        # Rarest postings first, so the cap cuts the values least like the query
+        candidates = set()
+        for _, size, index in sorted(sources):
+            candidates.update((size, value) for value in itertools.islice(holders[size][index], MAX_CANDIDATES - len(candidates)))
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+
+        scored = []
+        for size, value in candidates:
+            shared, allowed_misses = 0, query_size - needed[size]
+            for values in holders[size]:
+                if value in values:
+                    shared += 1
+                elif allowed_misses:
+                    allowed_misses -= 1
+                else:
+                    break
+            else:
+                scored.append((shared / (query_size + size - shared), value))
+        return scored
+
+    def _fuzzy_matches(self, query: str, exclude: set, limit: int) -> list:
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        # Per client the better of its two fields counts; walk the scores from
+        # the top and take each client at the first (highest) one it reaches
+        levels = {}
+        for values, postings, sizes in zip(self._values, self._postings, self._sizes):
+            for score, value in self._scored_values(query_grams, postings, sizes):
+                if score >= self.similarity_threshold:
+                    levels.setdefault(score, []).append(values[value])
+        matches, seen = [], set(exclude)
+        for score in sorted(levels, reverse=True):
+            ids = {client_id for group in levels[score] for client_id in group if client_id not in seen}
+            matches += heapq.nsmallest(limit - len(matches), ids)
+            if len(matches) >= limit:
+                break
+            seen |= ids
+        return matches
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> list:
+        """
+        Return one page of ranked matches
+
+        Takes the index lock; call it from a worker thread, not the event loop.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        wanted = offset + limit
+        with self._lock:
+            ranked = self._prefix_matches(query, wanted)
+            if len(ranked) < wanted:
+                ranked += self._fuzzy_matches(query, set(ranked), wanted - len(ranked))
+            return [self._clients[client_id] for client_id in ranked[offset:wanted]]
+
+client_search_index = ClientSearchIndex()
@@ -1,8 +1,19 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from collections import OrderedDict
 from ..config.settings import settings
+from .jwt_hs256 import HS256Codec, TokenError
+from .jwt_keys import AsymmetricKeyRing
+from .reset_tokens import ResetTokenSigner
+import hashlib
+import hmac
 import logging
+import os
+import secrets
+import threading
+import time
+import uuid
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -27,13 +38,165 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         print(f"Debug - Error type: {type(e)}")
         return False
 
+class VerifiedCredentialCache:
+    """
+    Short-lived cache of recent successful password verifications.
+
+    Entries are keyed by an HMAC of (client_id, password, stored hash) under a
+    per-process random pepper, so no plaintext or reusable digest is kept in
+    memory. Changing the stored hash changes the key, and reset_password also
+    drops every entry for the client explicitly.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._pepper = os.urandom(32)
+        self._entries = OrderedDict()  # key -> (client_id, expires_at)
+        self._by_client = {}  # client_id -> set of keys
+        self._lock = threading.Lock()
+
+    def _key(self, client_id, plain_password: str, hashed_password: str) -> bytes:
+        message = b"\x00".join((
+            str(client_id).encode(),
+            plain_password.encode(),
+            hashed_password.encode(),
+        ))
+        return hmac.new(self._pepper, message, hashlib.sha256).digest()
+
+    def _discard(self, key: bytes):
+        client_id, _ = self._entries.pop(key)
+        keys = self._by_client.get(client_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_client[client_id]
+
+    def contains(self, client_id, plain_password: str, hashed_password: str) -> bool:
+        key = self._key(client_id, plain_password, hashed_password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry[1] <= time.monotonic():
+                self._discard(key)
+                return False
+            # Least recently used entries are the ones evicted by add()
+            self._entries.move_to_end(key)
+            return True
+
+    def add(self, client_id, plain_password: str, hashed_password: str):
+        key = self._key(client_id, plain_password, hashed_password)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (client_id, time.monotonic() + self.ttl_seconds)
+            self._by_client.setdefault(client_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_client(self, client_id):
+        with self._lock:
+            for key in list(self._by_client.get(client_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_client.clear()
+
+credential_cache = VerifiedCredentialCache(
+    ttl_seconds=settings.CREDENTIAL_CACHE_TTL_SECONDS,
+    max_entries=settings.CREDENTIAL_CACHE_MAX_ENTRIES,
+)
+
+def verify_client_password(client_id, plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a client's password, skipping the KDF for credentials verified
+    within the last CREDENTIAL_CACHE_TTL_SECONDS when the cache is enabled.
+    """
+    if not settings.CREDENTIAL_CACHE_ENABLED:
+        return verify_password(plain_password, hashed_password)
+    if credential_cache.contains(client_id, plain_password, hashed_password):
+        return True
+    result = verify_password(plain_password, hashed_password)
+    if result:
+        credential_cache.add(client_id, plain_password, hashed_password)
+    return result
+
 def get_password_hash(password: str) -> str:
     hash_result = pwd_context.hash(password)
     print(f"Debug - Generated password hash: {hash_result}")
     return hash_result
 
+# HS256 tokens go through the precomputed codec, EdDSA/ES256 through the key ring;
+# any other algorithm falls back to jose
+if settings.JWT_ALGORITHM == "HS256":
+    token_codec = HS256Codec(settings.JWT_SECRET)
+elif settings.JWT_ALGORITHM in ("EdDSA", "ES256"):
+    token_codec = AsymmetricKeyRing.from_directory(settings.JWT_KEYS_DIR, settings.JWT_SIGNING_KID or None)
+else:
+    token_codec = None
+
+def access_token_claims(client_id, session_id: str, generation: int) -> dict:
+    """
+    Build the claims of a session's access token
+
+    The token names its client, session and session generation (so revocation
+    can be checked locally), plus a unique id for the denylist.
+    """
+    return {
+        "sub": str(client_id),
+        "sid": session_id,
+        "jti": uuid.uuid4().hex,
+        "gen": generation
+    }
+
 def create_access_token(data: dict) -> str:
+    if token_codec is not None:
+        return token_codec.encode(data, expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM) 
\ No newline at end of file
+    return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify an access token and return its claims
+
+    Raises:
+        TokenError: If the token is invalid or expired
+    """
+    if token_codec is not None:
+        return token_codec.decode(token)
+    try:
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError as e:
+        raise TokenError(str(e)) from e
+
+reset_token_signer = ResetTokenSigner(settings.JWT_SECRET)
+
+def create_refresh_token(session_id: str) -> tuple:
+    """
+    Create an opaque refresh token for a session
+
+    The token is "<session_id>.<random secret>" so a refresh can address its
+    session directly; only the SHA-256 of the whole token is stored.
+
+    Returns:
+        tuple: (refresh_token, refresh_token_hash)
+    """
+    token = f"{session_id}.{secrets.token_urlsafe(32)}"
+    return token, hash_refresh_token(token)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def get_jwks_json() -> bytes:
+    """
+    The public JWKS document; empty for symmetric algorithms, which have
+    nothing that can be published.
+    """
+    if isinstance(token_codec, AsymmetricKeyRing):
+        return token_codec.jwks_json
+    return b'{"keys":[]}'
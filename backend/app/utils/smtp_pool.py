@@ -0,0 +1,118 @@
+"""
+SMTP Connection Pool
+--------------------
+
+Keeps a few authenticated SMTP connections open between sends so that a
+batch of emails pays the TCP/TLS/AUTH handshake once instead of per message.
+
+A connection that the server has dropped is detected on first use, replaced
+and the send retried once. When SMTP_HOST is not configured the
+LoggingTransport is used instead, which logs the message, including its
+plain text body, instead of sending it.
+"""
+
+import logging
+import queue
+import smtplib
+import ssl
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+class LoggingTransport:
+    def send(self, message: EmailMessage):
+        # Without a server the log is the only way to get at links in the body
+        body = message.get_body(preferencelist=("plain",))
+        logger.info(f"\n{'='*50}")
+        logger.info("EMAIL NOT SENT (SMTP_HOST unset)")
+        logger.info(f"{'='*50}")
+        logger.info(f"To: {message['To']}")
+        logger.info(f"Subject: {message['Subject']}")
+        logger.info("Body:")
+        logger.info(body.get_content().rstrip() if body is not None else "")
+        logger.info(f"{'='*50}\n")
+
+    def close(self):
+        pass
+
+class SMTPConnectionPool:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = False,
+        size: int = 2,
+        timeout: float = 30
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls(context=ssl.create_default_context())
+        if self.username:
+            connection.login(self.username, self.password)
+        self.connections_opened += 1
+        return connection
+
+    def _acquire(self) -> smtplib.SMTP:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, connection: smtplib.SMTP):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            self._quit(connection)
+
+    @staticmethod
+    def _quit(connection: smtplib.SMTP):
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def send(self, message: EmailMessage):
+        """
+        Send a message over a pooled connection
+
+        Raises:
+            smtplib.SMTPException, OSError: If the message could not be sent
+        """
+        connection = self._acquire()
+        try:
+            connection.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connection was closed by the server; retry once on a fresh one
+            connection = self._connect()
+            try:
+                connection.send_message(message)
+            except Exception:
+                connection.close()
+                raise
+        except smtplib.SMTPRecipientsRefused:
+            # The connection itself is still fine
+            self._release(connection)
+            raise
+        except Exception:
+            connection.close()
+            raise
+        self._release(connection)
+
+    def close(self):
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                return
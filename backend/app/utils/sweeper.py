@@ -0,0 +1,123 @@
+"""
+Expiry Sweeper
+--------------
+
+Deletes rows whose expires_at has passed from the tables that would
+otherwise grow forever: Sessions, ResetTokens, RevokedTokens and
+EmailOutbox (sent and failed emails past their retention period).
+
+Each run walks the tables in bounded batches through the sweep_expired
+database function, which deletes at most `batch_size` rows per call using
+the expires_at index. A run stops early once it has used its time budget;
+whatever is left is picked up by the next run. The lifespan task adds
+random jitter between runs so workers don't sweep in lockstep.
+
+DeletedClientPurger does the same for soft-deleted clients.
+
+Counters are kept per sweeper and exposed by /health/sweeper.
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SWEPT_TABLES = ("Sessions", "ResetTokens", "RevokedTokens", "EmailOutbox")
+
+class ExpirySweeper:
+    def __init__(self, batch_size: int, time_budget_seconds: float, tables=SWEPT_TABLES):
+        self.batch_size = batch_size
+        self.time_budget_seconds = time_budget_seconds
+        self.tables = tables
+        self.metrics = {
+            "runs": 0,
+            "failed_runs": 0,
+            "budget_exhausted_runs": 0,
+            "rows_deleted": {table: 0 for table in tables},
+            "last_run_at": None,
+            "last_run_seconds": None,
+            "last_run_rows_deleted": 0,
+        }
+
+    def run(self, supabase) -> int:
+        """
+        Sweep every table until it has no expired rows or the budget is spent
+
+        Returns:
+            int: The number of rows deleted in this run
+        """
+        started = time.monotonic()
+        deadline = started + self.time_budget_seconds
+        deleted = 0
+        exhausted = False
+        try:
+            for table in self.tables:
+                while True:
+                    if time.monotonic() >= deadline:
+                        exhausted = True
+                        break
+                    result = supabase.rpc("sweep_expired", {"p_table": table, "p_limit": self.batch_size}).execute()
+                    count = result.data or 0
+                    self.metrics["rows_deleted"][table] += count
+                    deleted += count
+                    if count < self.batch_size:
+                        break
+                if exhausted:
+                    break
+        except Exception:
+            self.metrics["failed_runs"] += 1
+            raise
+        finally:
+            self.metrics["runs"] += 1
+            self.metrics["last_run_at"] = time.time()
+            self.metrics["last_run_seconds"] = round(time.monotonic() - started, 3)
+            self.metrics["last_run_rows_deleted"] = deleted
+
+        if exhausted:
+            self.metrics["budget_exhausted_runs"] += 1
+            logger.info(f"Expiry sweep hit its {self.time_budget_seconds}s budget after deleting {deleted} rows")
+        elif deleted:
+            logger.debug(f"Expiry sweep deleted {deleted} rows")
+        return deleted
+
+class DeletedClientPurger:
+    """
+    Hard-deletes soft-deleted clients together with their sessions,
+    credentials and reset tokens, in bounded batches through the
+    purge_deleted_clients database function.
+    """
+
+    def __init__(self, batch_size: int, time_budget_seconds: float):
+        self.batch_size = batch_size
+        self.time_budget_seconds = time_budget_seconds
+        self.metrics = {
+            "runs": 0,
+            "failed_runs": 0,
+            "clients_purged": 0,
+            "last_run_at": None,
+            "last_run_seconds": None,
+        }
+
+    def run(self, supabase) -> int:
+        started = time.monotonic()
+        deadline = started + self.time_budget_seconds
+        purged = 0
+        try:
+            while time.monotonic() < deadline:
+                result = supabase.rpc("purge_deleted_clients", {"p_limit": self.batch_size}).execute()
+                count = result.data or 0
+                purged += count
+                self.metrics["clients_purged"] += count
+                if count < self.batch_size:
+                    break
+        except Exception:
+            self.metrics["failed_runs"] += 1
+            raise
+        finally:
+            self.metrics["runs"] += 1
+            self.metrics["last_run_at"] = time.time()
+            self.metrics["last_run_seconds"] = round(time.monotonic() - started, 3)
+
+        if purged:
+            logger.debug(f"Purged {purged} deleted clients")
+        return purged
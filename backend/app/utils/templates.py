@@ -0,0 +1,108 @@
+"""
+Email Templates
+---------------
+
+Localized email templates, compiled once when the module is imported.
+
+Templates live in app/templates/email/<locale>/ as three files per email:
+<name>.subject.txt, <name>.txt and optionally <name>.html. Placeholders use
+str.format syntax ("{reset_url}"; literal braces are written "{{" / "}}").
+
+Compiling splits each template into literal fragments and placeholders and
+substitutes the static context (values that are the same for every message,
+such as FRONTEND_URL) straight into the fragments, merging adjacent ones. A
+render is then a single join over a handful of pre-built strings; values
+are HTML-escaped for the HTML body only.
+"""
+
+import html
+import string
+from pathlib import Path
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+
+def normalize_locale(locale: str) -> str:
+    # Language tags are case-insensitive (RFC 5646); compare them lower-cased
+    return locale.strip().replace("_", "-").lower()
+
+class CompiledTemplate:
+    def __init__(self, source: str, static_context: dict = None, escape=None):
+        static_context = static_context or {}
+        self._escape = escape
+        self._parts = []  # literal strings and placeholder names, alternating as they appear
+        self._fields = []  # (index into _parts, field name) for the dynamic placeholders
+        literal = []
+        for text, field, format_spec, conversion in string.Formatter().parse(source):
+            literal.append(text)
+            if field is None:
+                continue
+            if format_spec or conversion:
+                raise ValueError(f"Format specs are not supported in email templates: {{{field}}}")
+            if field in static_context:
+                literal.append(self._render_value(static_context[field]))
+                continue
+            self._parts.append("".join(literal))
+            literal = []
+            self._fields.append((len(self._parts), field))
+            self._parts.append("")
+        self._parts.append("".join(literal))
+
+    def _render_value(self, value) -> str:
+        value = str(value)
+        return self._escape(value) if self._escape else value
+
+    def render(self, context: dict) -> str:
+        parts = self._parts.copy()
+        for index, field in self._fields:
+            parts[index] = self._render_value(context[field])
+        return "".join(parts)
+
+class EmailTemplate:
+    def __init__(self, subject: CompiledTemplate, text: CompiledTemplate, html_body: CompiledTemplate = None):
+        self.subject = subject
+        self.text = text
+        self.html = html_body
+
+    def render(self, **context) -> tuple:
+        """
+        Returns:
+            tuple: (subject, text body, HTML body or None)
+        """
+        return (
+            self.subject.render(context).strip(),
+            self.text.render(context),
+            self.html.render(context) if self.html else None
+        )
+
+class EmailTemplateRegistry:
+    def __init__(self, default_locale: str, static_context: dict = None, template_dir: Path = TEMPLATE_DIR):
+        self.default_locale = normalize_locale(default_locale)
+        self._templates = {}  # (locale, name) -> EmailTemplate
+        for locale_dir in sorted(path for path in template_dir.iterdir() if path.is_dir()):
+            for subject_file in locale_dir.glob("*.subject.txt"):
+                name = subject_file.name[:-len(".subject.txt")]
+                html_file = locale_dir / f"{name}.html"
+                self._templates[(normalize_locale(locale_dir.name), name)] = EmailTemplate(
+                    CompiledTemplate(subject_file.read_text(encoding="utf-8"), static_context),
+                    CompiledTemplate((locale_dir / f"{name}.txt").read_text(encoding="utf-8"), static_context),
+                    CompiledTemplate(html_file.read_text(encoding="utf-8"), static_context, escape=html.escape)
+                    if html_file.exists() else None
+                )
+
+    def get(self, name: str, locale: str = None) -> EmailTemplate:
+        """
+        Look up a template, falling back from "es-MX" to "es" to the default locale
+
+        Locales are matched case-insensitively, so "ES", "es_es" and "es-ES"
+        all find the "es" templates.
+        """
+        locale = normalize_locale(locale or "")
+        if locale:
+            for candidate in (locale, locale.split("-")[0]):
+                template = self._templates.get((candidate, name))
+                if template is not None:
+                    return template
+        return self._templates[(self.default_locale, name)]
+
+    def render(self, name: str, locale: str = None, **context) -> tuple:
+        return self.get(name, locale).render(**context)
@@ -0,0 +1,64 @@
+"""
+JWT Encode/Decode Benchmark
+---------------------------
+
+Compares the precomputed HS256 codec in app.utils.jwt_hs256 against
+python-jose and PyJWT for the access token issued at login: the same
+claims (built by the same helper) and lifetime.
+
+Run from the backend directory, with the app's settings available:
+    python -m benchmarks.bench_jwt [iterations]
+
+Libraries that are not installed are skipped.
+"""
+
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from app.config.settings import settings
+from app.utils.jwt_hs256 import HS256Codec
+from app.utils.security import access_token_claims
+
+SECRET = "benchmark-secret-benchmark-secret"
+CLAIMS = access_token_claims(12345, uuid.uuid4().hex, 3)
+LIFETIME = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+def _report(name: str, seconds: float, iterations: int):
+    print(f"{name:<28} {seconds / iterations * 1e6:8.2f} us/op")
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    codec = HS256Codec(SECRET)
+    token = codec.encode(CLAIMS, expires_in=LIFETIME)
+
+    _report("hs256 codec encode", timeit.timeit(lambda: codec.encode(CLAIMS, expires_in=LIFETIME), number=iterations), iterations)
+    _report("hs256 codec decode", timeit.timeit(lambda: codec.decode(token), number=iterations), iterations)
+
+    try:
+        from jose import jwt as jose_jwt
+    except ImportError:
+        print("python-jose not installed, skipping")
+    else:
+        def jose_encode():
+            to_encode = CLAIMS.copy()
+            to_encode["exp"] = datetime.utcnow() + timedelta(seconds=LIFETIME)
+            return jose_jwt.encode(to_encode, SECRET, algorithm="HS256")
+        _report("python-jose encode", timeit.timeit(jose_encode, number=iterations), iterations)
+        _report("python-jose decode", timeit.timeit(lambda: jose_jwt.decode(token, SECRET, algorithms=["HS256"]), number=iterations), iterations)
+
+    try:
+        import jwt as pyjwt
+    except ImportError:
+        print("PyJWT not installed, skipping")
+    else:
+        def pyjwt_encode():
+            to_encode = CLAIMS.copy()
+            to_encode["exp"] = datetime.utcnow() + timedelta(seconds=LIFETIME)
+            return pyjwt.encode(to_encode, SECRET, algorithm="HS256")
+        _report("PyJWT encode", timeit.timeit(pyjwt_encode, number=iterations), iterations)
+        _report("PyJWT decode", timeit.timeit(lambda: pyjwt.decode(token, SECRET, algorithms=["HS256"]), number=iterations), iterations)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+In-Memory Client Search Benchmark
+---------------------------------
+
+Builds a ClientSearchIndex over N synthetic clients and reports the build
+time, incremental update cost and the latency distribution
+(p50/p99/max) of ClientSearchIndex.search for three kinds of queries:
+
+- prefix: the start of a name or email, answered from the sorted key list
+- fuzzy: a misspelled full name, answered from the trigram postings
+- miss: text that matches nothing
+
+Every kind must stay under TARGET_P99_MS at the 99th percentile; the script
+exits with status 1 if one does not.
+
+Run from the backend directory:
+    python -m benchmarks.bench_search [clients] [queries per kind]
+
+The default of 1,000,000 clients needs a few GB of RAM.
+"""
+
+import random
+import sys
+import time
+
+from app.utils.search_index import ClientSearchIndex
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+    "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Ada", "Grace", "Alan", "Edsger", "Barbara", "Donald", "Margaret", "Ken", "Dennis", "Frances",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lovelace", "Hopper", "Turing", "Dijkstra", "Liskov", "Knuth", "Hamilton", "Thompson", "Ritchie", "Allen",
+]
+DOMAINS = ["example.com", "example.org", "mail.example.net", "corp.example.io"]
+
+TARGET_P99_MS = 10.0
+
+def make_clients(count: int, rng: random.Random) -> list:
+    clients = []
+    for client_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        clients.append({
+            "id": client_id,
+            "client_name": f"{first} {last}",
+            "email": f"{first[0].lower()}{last.lower()}{client_id}@{rng.choice(DOMAINS)}",
+        })
+    return clients
+
+def misspell(text: str, rng: random.Random) -> str:
+    # Swap two neighbouring letters, the most common typo
+    index = rng.randrange(1, len(text) - 1)
+    return text[:index - 1] + text[index] + text[index - 1] + text[index + 1:]
+
+def make_queries(clients: list, count: int, rng: random.Random) -> dict:
+    sample = [rng.choice(clients) for _ in range(count)]
+    return {
+        "prefix": [
+            client["email"][:rng.randint(1, 8)] if rng.random() < 0.5 else client["client_name"][:rng.randint(1, 8)]
+            for client in sample
+        ],
+        "fuzzy": [misspell(client["client_name"], rng) for client in sample],
+        "miss": [f"zq{rng.randrange(10 ** 6)}xv" for _ in range(count)],
+    }
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries_per_kind = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(42)
+    clients = make_clients(count, rng)
+
+    index = ClientSearchIndex()
+    started = time.perf_counter()
+    index.build(clients)
+    print(f"build {count:,} clients          {time.perf_counter() - started:8.2f} s")
+
+    updates = [
+        {"op": "upsert", "id": client["id"], "client": dict(client, client_name=f"Renamed {client['id']}")}
+        for client in rng.sample(clients, 1000)
+    ]
+    started = time.perf_counter()
+    index.apply(updates)
+    print(f"apply 1,000 updates            {(time.perf_counter() - started) * 1e3:8.2f} ms")
+
+    missed = []
+    for kind, queries in make_queries(clients, queries_per_kind, rng).items():
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, limit=21)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        p99 = percentile(timings, 0.99) * 1e3
+        print(
+            f"search {kind:<8} p50 {percentile(timings, 0.5) * 1e3:7.2f} ms"
+            f"  p99 {p99:7.2f} ms"
+            f"  max {timings[-1] * 1e3:7.2f} ms"
+        )
+        if p99 > TARGET_P99_MS:
+            missed.append(kind)
+
+    if missed:
+        print(f"p99 above {TARGET_P99_MS:g} ms: {', '.join(missed)}")
+        sys.exit(1)
+    print(f"all p99 within {TARGET_P99_MS:g} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Client List Serialization Benchmark
+-----------------------------------
+
+Measures the cost of turning N Clients rows (as returned by the Supabase
+client) into a JSON response body:
+
+- response_model: what FastAPI does for `response_model=List[ClientResponse]`
+  (validate every row, jsonable_encoder, stdlib json)
+- TypeAdapter: validate with a cached TypeAdapter and dump_json in Rust
+- model_construct: build models without validation, then orjson
+- trusted rows: orjson straight over the repository rows (the route fast path)
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization [rows]
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.client import ClientResponse
+
+def make_rows(count: int) -> list:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": i,
+            "client_name": f"Client {i}",
+            "email": f"client{i}@example.com",
+            "created_at": (start + timedelta(seconds=i)).isoformat(),
+            "update_at": None,
+        }
+        for i in range(count)
+    ]
+
+def best_of(func, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rows = make_rows(count)
+    adapter = TypeAdapter(List[ClientResponse])
+
+    def response_model_path():
+        return json.dumps(jsonable_encoder(adapter.validate_python(rows))).encode()
+
+    def type_adapter_path():
+        return adapter.dump_json(adapter.validate_python(rows))
+
+    def model_construct_path():
+        models = [ClientResponse.model_construct(**row) for row in rows]
+        return orjson.dumps(models, default=lambda model: model.__dict__)
+
+    def trusted_rows_path():
+        return orjson.dumps(rows)
+
+    print(f"Serializing {count} client rows (best of 5)")
+    for name, func in [
+        ("response_model", response_model_path),
+        ("TypeAdapter", type_adapter_path),
+        ("model_construct + orjson", model_construct_path),
+        ("trusted rows + orjson", trusted_rows_path),
+    ]:
+        print(f"{name:<28} {best_of(func) * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+In-memory stand-in for the parts of the Supabase client the services use.
+
+Tables are lists of dicts. Filters (eq, gt, or_, ...) are evaluated against
+them, so service logic built on conditional updates and deletes can be unit
+tested without a database. RPCs are plain Python callables registered per
+test, and every call is recorded in `calls`.
+"""
+
+from datetime import datetime, timezone
+import re
+
+def _coerce(value):
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        # Compare naive (utcnow) and aware timestamps alike
+        return parsed if parsed.tzinfo is None else parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _compare(op, left, right):
+    if op == "is":
+        return left is None if right in (None, "null") else left == right
+    if left is None:
+        return False
+    left, right = _coerce(left), _coerce(right)
+    if isinstance(left, (int, float)) and isinstance(right, str):
+        right = type(left)(right)
+    return {
+        "eq": left == right,
+        "neq": left != right,
+        "gt": left > right,
+        "gte": left >= right,
+        "lt": left < right,
+        "lte": left <= right,
+    }[op]
+
+def _split_top_level(expression):
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+def _parse_condition(condition):
+    # PostgREST logic trees: "a.gt.1,and(b.eq.2,c.is.null)"
+    match = re.fullmatch(r"(and|or)\((.*)\)", condition)
+    if match:
+        children = [_parse_condition(part) for part in _split_top_level(match.group(2))]
+        combine = all if match.group(1) == "and" else any
+        return lambda row: combine(child(row) for child in children)
+    column, op, value = condition.split(".", 2)
+    value = value[1:-1] if value.startswith('"') else value
+    if op == "is":
+        value = None if value == "null" else value
+    return lambda row: _compare(op, row.get(column), value)
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = None
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.limit_count = None
+        self.count = None
+        self._negate = False
+
+    # Actions
+    def select(self, columns="*", count=None):
+        self.action, self.count = "select", count
+        if columns != "*":
+            # Embedded resources ("Authentication(password_hash)") are stored
+            # on the row under the table name, already in their embedded shape
+            self.columns = [column.strip().split("(")[0] for column in _split_top_level(columns)]
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict="id", ignore_duplicates=False):
+        self.action, self.payload, self.on_conflict = "upsert", payload, on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # Filters
+    def _filter(self, predicate):
+        if self._negate:
+            self._negate = False
+            self.filters.append(lambda row: not predicate(row))
+        else:
+            self.filters.append(predicate)
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: _compare("eq", row.get(column), value))
+
+    def neq(self, column, value):
+        return self._filter(lambda row: _compare("neq", row.get(column), value))
+
+    def gt(self, column, value):
+        return self._filter(lambda row: _compare("gt", row.get(column), value))
+
+    def gte(self, column, value):
+        return self._filter(lambda row: _compare("gte", row.get(column), value))
+
+    def lt(self, column, value):
+        return self._filter(lambda row: _compare("lt", row.get(column), value))
+
+    def lte(self, column, value):
+        return self._filter(lambda row: _compare("lte", row.get(column), value))
+
+    def is_(self, column, value):
+        return self._filter(lambda row: _compare("is", row.get(column), value))
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(lambda row: row.get(column) in values)
+
+    def ilike(self, column, pattern):
+        regex = re.compile(
+            "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern), re.IGNORECASE
+        )
+        return self._filter(lambda row: row.get(column) is not None and regex.fullmatch(row[column]) is not None)
+
+    def or_(self, expression):
+        conditions = [_parse_condition(part) for part in _split_top_level(expression)]
+        return self._filter(lambda row: any(condition(row) for condition in conditions))
+
+    # Modifiers
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def range(self, start, end):
+        self.offset, self.limit_count = start, end - start + 1
+        return self
+
+    def _matching(self):
+        return [row for row in self.db.tables.setdefault(self.table, []) if all(f(row) for f in self.filters)]
+
+    def execute(self):
+        self.db.calls.append((self.table, self.action))
+        if self.db.fail_next:
+            error, self.db.fail_next = self.db.fail_next, None
+            raise error
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.action == "insert":
+            new_rows = [dict(row) for row in (self.payload if isinstance(self.payload, list) else [self.payload])]
+            rows.extend(new_rows)
+            return FakeResponse([dict(row) for row in new_rows])
+        if self.action == "upsert":
+            new_rows = [dict(row) for row in (self.payload if isinstance(self.payload, list) else [self.payload])]
+            written = []
+            for new_row in new_rows:
+                existing = next((row for row in rows if row.get(self.on_conflict) == new_row[self.on_conflict]), None)
+                if existing is None:
+                    rows.append(dict(new_row))
+                elif self.ignore_duplicates:
+                    # ON CONFLICT DO NOTHING: the row is left alone and not returned
+                    continue
+                else:
+                    existing.update(new_row)
+                written.append(new_row)
+            return FakeResponse(written)
+        if self.action == "update":
+            matched = self._matching()
+            for row in matched:
+                row.update(self.payload)
+            return FakeResponse([dict(row) for row in matched])
+        if self.action == "delete":
+            matched = self._matching()
+            matched_ids = {id(row) for row in matched}
+            self.db.tables[self.table] = [row for row in rows if id(row) not in matched_ids]
+            return FakeResponse([dict(row) for row in matched])
+
+        matched = self._matching()
+        total = len(matched)
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda row: (row.get(column) is None, _coerce(row.get(column))), reverse=desc)
+        start = getattr(self, "offset", 0)
+        if self.limit_count is not None:
+            matched = matched[start:start + self.limit_count]
+        elif start:
+            matched = matched[start:]
+        if self.columns is not None:
+            matched = [{column: row.get(column) for column in self.columns} for row in matched]
+        else:
+            matched = [dict(row) for row in matched]
+        return FakeResponse(matched, total if self.count else None)
+
+class FakeRpc:
+    def __init__(self, db, name, params):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        self.db.calls.append(("rpc", self.name))
+        self.db.rpc_calls.append((self.name, self.params))
+        if self.db.fail_next:
+            error, self.db.fail_next = self.db.fail_next, None
+            raise error
+        return FakeResponse(self.db.rpcs[self.name](**self.params))
+
+class FakeSupabase:
+    def __init__(self, **tables):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in tables.items()}
+        self.rpcs = {}
+        self.calls = []
+        self.rpc_calls = []
+        self.fail_next = None  # Exception raised by the next execute()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
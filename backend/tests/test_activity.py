@@ -0,0 +1,56 @@
+import pytest
+
+from app.utils import activity as activity_module
+from app.utils.activity import SessionActivityTracker
+
+from fake_supabase import FakeSupabase
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(activity_module.time, "time", lambda: now[0])
+    return now
+
+def test_flush_merges_activity_per_session(clock):
+    tracker = SessionActivityTracker()
+    supabase = FakeSupabase()
+    supabase.rpcs["touch_sessions"] = lambda p_session_ids, p_activity: None
+
+    tracker.record("a")
+    clock[0] += 5
+    tracker.record("b")
+    clock[0] += 5
+    tracker.record("a")
+    tracker.record(None)
+    assert len(tracker) == 2
+
+    assert tracker.flush(supabase) == 2
+    name, params = supabase.rpc_calls[0]
+    assert name == "touch_sessions"
+    activity = dict(zip(params["p_session_ids"], params["p_activity"]))
+    assert activity == {"a": "2023-11-14T22:13:30+00:00", "b": "2023-11-14T22:13:25+00:00"}
+    assert len(tracker) == 0
+    assert tracker.flush(supabase) == 0
+    assert len(supabase.rpc_calls) == 1
+
+def test_failed_flush_requeues_and_newer_activity_wins(clock):
+    tracker = SessionActivityTracker()
+    supabase = FakeSupabase()
+    tracker.record("a")
+    tracker.record("b")
+    queued_at = clock[0]
+
+    def touch_sessions(p_session_ids, p_activity):
+        # Requests keep recording while the flush is in flight
+        clock[0] += 10
+        tracker.record("a")
+        raise ConnectionError("database unavailable")
+
+    supabase.rpcs["touch_sessions"] = touch_sessions
+    with pytest.raises(ConnectionError):
+        tracker.flush(supabase)
+    assert tracker._pending == {"a": queued_at + 10, "b": queued_at}
+
+    supabase.rpcs["touch_sessions"] = lambda p_session_ids, p_activity: None
+    assert tracker.flush(supabase) == 2
+    assert len(tracker) == 0
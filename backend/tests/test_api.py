@@ -95,4 +95,110 @@ async def test_logout():
     token = await test_login()
     response = client.post("/auth/logout", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
-    assert response.json() == {"message": "Successfully logged out"} 
\ No newline at end of file
+    assert response.json() == {"message": "Successfully logged out"} 
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation():
+    response = client.post("/auth/login", json={
+        "email": test_client["email"],
+        "password": test_client["password"]
+    })
+    refresh_token = response.json()["refresh_token"]
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    data = response.json()
+    assert "access_token" in data
+    assert data["refresh_token"] != refresh_token
+
+    # Reusing the rotated token is rejected and revokes the session
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+    response = client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_logout_revokes_token():
+    token = await test_login()
+    response = client.post("/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    response = client.get("/clients", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_client_sessions_and_revoke_all():
+    token = await test_login()
+    client_id = client.get("/clients", headers={"Authorization": f"Bearer {token}"}).json()[0]["id"]
+    response = client.get(f"/clients/{client_id}/sessions?limit=1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["sessions"]) <= 1
+    assert "next_cursor" in data
+
+    response = client.post(f"/clients/{client_id}/sessions/revoke-all", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_export_clients():
+    token = await test_login()
+    response = client.get("/clients/export?format=ndjson", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert len(lines) > 0
+    response = client.get("/clients/export?format=csv", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.text.splitlines()[0] == "id,client_name,email,created_at,update_at"
+
+@pytest.mark.asyncio
+async def test_batch_get_clients():
+    token = await test_login()
+    client_id = await test_signup()
+    response = client.post(
+        "/clients/batch-get",
+        json={"ids": [client_id, 999999999]},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["status"] == 200
+    assert results[0]["client"]["id"] == client_id
+    assert results[1]["status"] == 404
+
+@pytest.mark.asyncio
+async def test_search_clients():
+    token = await test_login()
+    prefix = test_client["email"][:4]
+    response = client.get(f"/clients/search?q={prefix}&limit=5", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    data = response.json()
+    assert any(c["email"] == test_client["email"] for c in data["clients"])
+    assert len(data["clients"]) <= 5
+
+@pytest.mark.asyncio
+async def test_clients_list_compression():
+    token = await test_login()
+    plain = client.get("/clients/", headers={"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    response = client.get("/clients/", headers={"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    if len(plain.content) >= 1024:
+        assert response.headers["content-encoding"] == "gzip"
+    else:
+        # Too small to be worth compressing
+        assert "content-encoding" not in response.headers
+    assert response.json() == plain.json()
+
+@pytest.mark.asyncio
+async def test_login_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    response = client.post(
+        "/auth/login",
+        content=msgpack.packb({"email": test_client["email"], "password": test_client["password"]}),
+        headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    token = msgpack.unpackb(response.content)["access_token"]
+    response = client.get("/clients/", headers={"Authorization": f"Bearer {token}", "Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert isinstance(msgpack.unpackb(response.content), list)
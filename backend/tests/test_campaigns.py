@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from app.config.settings import settings
+from app.models.auth import PasswordResetCampaignRequest
+from app.services import campaigns as campaign_service
+from app.services.campaigns import PasswordResetCampaignService
+from app.utils.reset_tokens import password_hash_fingerprint
+from app.utils.security import reset_token_signer
+
+@pytest.fixture
+def clients_db(fake_supabase, monkeypatch):
+    monkeypatch.setattr(campaign_service, "supabase", fake_supabase)
+    monkeypatch.setattr(settings, "PASSWORD_RESET_CAMPAIGN_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "PASSWORD_RESET_CAMPAIGN_EMAILS_PER_SECOND", 10)
+    fake_supabase.tables["Clients"] = [
+        {"id": 1, "email": "a@leak.example", "created_at": "2024-01-01T00:00:00", "deleted_at": None,
+         "Authentication": [{"password_hash": "hash-1"}]},
+        {"id": 2, "email": "b@other.example", "created_at": "2024-01-01T00:00:00", "deleted_at": None,
+         "Authentication": [{"password_hash": "hash-2"}]},
+        {"id": 3, "email": "c@leak.example", "created_at": "2024-01-01T00:00:00", "deleted_at": "2024-02-01T00:00:00",
+         "Authentication": [{"password_hash": "hash-3"}]},
+        {"id": 4, "email": "d@LEAK.example", "created_at": "2024-01-01T00:00:00", "deleted_at": None,
+         "Authentication": [{"password_hash": "hash-4"}]},
+        {"id": 5, "email": "e@leak.example", "created_at": "2024-01-01T00:00:00", "deleted_at": None,
+         "Authentication": []},
+    ]
+    fake_supabase.tables["ResetTokens"] = [{"token": "old", "client_id": 1}]
+    fake_supabase.tables["EmailOutbox"] = []
+    return fake_supabase
+
+async def run_campaign(**filters):
+    campaign = await PasswordResetCampaignService.start_campaign(PasswordResetCampaignRequest(**filters))
+    while campaign["status"] == "running":
+        await asyncio.sleep(0.01)
+    return campaign
+
+@pytest.mark.asyncio
+async def test_database_tokens_campaign(clients_db, monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_RESET_TOKEN_FORMAT", "database")
+    before = datetime.now(timezone.utc)
+    campaign = await run_campaign(email_domain="leak.example")
+
+    assert campaign["status"] == "completed", campaign["error"]
+    # Deleted client 3 is skipped; chunks of 2 are walked by id
+    assert (campaign["clients_processed"], campaign["tokens_issued"], campaign["emails_queued"]) == (3, 3, 3)
+    tokens = {row["client_id"]: row for row in clients_db.tables["ResetTokens"]}
+    assert sorted(tokens) == [1, 4, 5]
+    # The client's previous token is replaced, not duplicated
+    assert tokens[1]["token"] != "old"
+
+    emails = clients_db.tables["EmailOutbox"]
+    assert [email["recipient"] for email in emails] == ["a@leak.example", "d@LEAK.example", "e@leak.example"]
+    assert tokens[4]["token"] in emails[1]["body_text"]
+    # 10 emails per second: each one is scheduled 100ms after the previous,
+    # and its token is valid for the usual lifetime from then
+    send_times = [datetime.fromisoformat(email["next_attempt_at"]) for email in emails]
+    assert [later - earlier for earlier, later in zip(send_times, send_times[1:])] == [timedelta(milliseconds=100)] * 2
+    assert datetime.fromisoformat(tokens[5]["expires_at"]) - send_times[2] == timedelta(
+        minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES
+    )
+    # Tokens are issued now, even for later emails, so the reset throttle
+    # window starts now too
+    for token in tokens.values():
+        assert before <= datetime.fromisoformat(token["created_at"]) <= datetime.now(timezone.utc)
+
+@pytest.mark.asyncio
+async def test_stateless_tokens_campaign(clients_db, monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_RESET_TOKEN_FORMAT", "stateless")
+    campaign = await run_campaign(email_domain="leak.example")
+
+    assert campaign["status"] == "completed", campaign["error"]
+    # Client 5 has no password to fingerprint, so it gets no email
+    assert (campaign["clients_processed"], campaign["tokens_issued"], campaign["emails_queued"]) == (3, 2, 2)
+    assert [row["token"] for row in clients_db.tables["ResetTokens"]] == ["old"]
+    email = clients_db.tables["EmailOutbox"][0]
+    token = email["body_text"].split("token=")[1].split()[0]
+    assert reset_token_signer.verify(token) == (1, password_hash_fingerprint("hash-1"))
+
+@pytest.mark.asyncio
+async def test_client_ids_filter(clients_db, monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_RESET_TOKEN_FORMAT", "database")
+    campaign = await run_campaign(client_ids=[2, 3])
+    assert (campaign["clients_processed"], campaign["emails_queued"]) == (1, 1)
+    assert clients_db.tables["EmailOutbox"][0]["recipient"] == "b@other.example"
+
+@pytest.mark.asyncio
+async def test_failed_campaign(clients_db, monkeypatch):
+    clients_db.fail_next = RuntimeError("database unavailable")
+    campaign = await run_campaign(client_ids=[1])
+    assert (campaign["status"], campaign["error"]) == ("failed", "database unavailable")
+    assert campaign["finished_at"] is not None
+
+@pytest.mark.parametrize("domain", ["%", "leak%.example", "le_k.example", "*.example", "leak.example,id.gt.0", "leak"])
+def test_email_domain_rejects_patterns(domain):
+    with pytest.raises(ValidationError):
+        PasswordResetCampaignRequest(email_domain=domain)
+
+def test_email_domain_is_lower_cased():
+    assert PasswordResetCampaignRequest(email_domain="Leak.Example").email_domain == "leak.example"
+
+@pytest.mark.asyncio
+async def test_filter_required():
+    with pytest.raises(Exception) as exc:
+        await PasswordResetCampaignService.start_campaign(PasswordResetCampaignRequest(locale="es"))
+    assert exc.value.status_code == 400
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.config.settings import settings
+from app.services import clients as client_service
+from app.services.clients import ClientService
+
+NOW = datetime.now(timezone.utc)
+
+def at(seconds_ago):
+    return (NOW - timedelta(seconds=seconds_ago)).isoformat()
+
+def client(client_id, changed, deleted=None):
+    return {
+        "id": client_id, "client_name": f"c{client_id}", "email": f"c{client_id}@example.com",
+        "created_at": at(1000), "update_at": changed, "deleted_at": deleted
+    }
+
+@pytest.fixture
+def feed_db(fake_supabase, monkeypatch):
+    monkeypatch.setattr(client_service, "supabase", fake_supabase)
+    monkeypatch.setattr(settings, "CHANGE_FEED_SAFETY_LAG_SECONDS", 5)
+    fake_supabase.tables["Clients"] = [
+        client(3, at(100)),
+        client(1, at(100)),
+        client(2, at(90), deleted=at(90)),
+        # Inside the safety lag: not visible yet
+        client(4, at(2)),
+    ]
+    fake_supabase.tables["ClientTombstones"] = [
+        {"client_id": 9, "deleted_at": at(95)},
+        {"client_id": 8, "deleted_at": at(1)},
+    ]
+    return fake_supabase
+
+def summary(page):
+    return [(change["op"], change["id"]) for change in page["changes"]]
+
+def test_initial_sync(feed_db):
+    page = ClientService.fetch_changes()
+    # Same timestamp ties break on id; a soft-deleted client is a delete
+    assert summary(page) == [("upsert", 1), ("upsert", 3), ("delete", 2)]
+    assert page["changes"][0]["client"] == {
+        key: value for key, value in client(1, at(100)).items() if key != "deleted_at"
+    }
+    assert page["has_more"] is False
+    # Tombstones are only read once there is a cursor
+    assert ("ClientTombstones", "select") not in feed_db.calls
+
+def test_pages_merge_tombstones_in_order(feed_db):
+    first = ClientService.fetch_changes(limit=1)
+    assert summary(first) == [("upsert", 1)]
+    assert first["has_more"] is True
+
+    # The cursor splits a timestamp shared by clients 1 and 3
+    second = ClientService.fetch_changes(first["next_cursor"], limit=2)
+    assert summary(second) == [("upsert", 3), ("delete", 9)]
+
+    third = ClientService.fetch_changes(second["next_cursor"], limit=2)
+    assert summary(third) == [("delete", 2)]
+    assert third["has_more"] is False
+
+    # Nothing new: the cursor stays put
+    empty = ClientService.fetch_changes(third["next_cursor"])
+    assert (empty["changes"], empty["next_cursor"]) == ([], third["next_cursor"])
+
+def test_safety_lag_releases_changes_later(feed_db, monkeypatch):
+    cursor = ClientService.fetch_changes()["next_cursor"]
+    assert ClientService.fetch_changes(cursor)["changes"] == []
+    # Once the lag has passed, the held back client and tombstone show up;
+    # tombstone 9 predates the initial sync and is not replayed
+    monkeypatch.setattr(settings, "CHANGE_FEED_SAFETY_LAG_SECONDS", 0)
+    later = ClientService.fetch_changes(cursor)
+    assert summary(later) == [("upsert", 4), ("delete", 8)]
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "MjAyNC0wMS0wMQ==", "eHx5"])
+def test_invalid_cursor(feed_db, cursor):
+    with pytest.raises(HTTPException) as exc:
+        ClientService.fetch_changes(cursor)
+    assert exc.value.status_code == 400
+
+def test_clients_version_follows_newest_change(feed_db, monkeypatch):
+    version = ClientService._clients_version()
+    # Client 4 and tombstone 8 changed within the lag, so the version is still settling
+    assert version[:2] == ((at(2), 4), (at(1), 8))
+    assert version[2] is not None
+
+    monkeypatch.setattr(settings, "CHANGE_FEED_SAFETY_LAG_SECONDS", 0)
+    settled = ClientService._clients_version()
+    assert settled == ((at(2), 4), (at(1), 8), None)
+    assert ClientService._clients_version() == settled
+    # A soft delete moves update_at, a hard delete leaves a tombstone
+    feed_db.tables["Clients"][0].update(update_at=at(0), deleted_at=at(0))
+    soft_deleted = ClientService._clients_version()
+    assert soft_deleted[0] == (at(0), 3)
+    feed_db.tables["ClientTombstones"].append({"client_id": 1, "deleted_at": at(0)})
+    assert ClientService._clients_version()[1] == (at(0), 1)
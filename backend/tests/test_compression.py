@@ -0,0 +1,157 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from starlette.responses import Response, StreamingResponse
+
+from app.utils import compression
+from app.utils.compression import CompressionMiddleware, SnapshotCache, negotiate_encoding, snapshot_response
+
+ROWS = [b'{"id": %d, "email": "client%d@example.com"}\n' % (i, i) for i in range(200)]
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+async def run(app, accept_encoding="gzip"):
+    # Drive the middleware directly so the raw ASGI messages can be inspected
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    messages, requested = [], []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # StreamingResponse listens for a disconnect while it streams; never send one
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await CompressionMiddleware(app, minimum_size=1024)(scope, receive, send)
+    start, bodies = messages[0], [message for message in messages[1:] if message["type"] == "http.response.body"]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    return headers, bodies
+
+def test_negotiate_encoding(no_brotli):
+    assert negotiate_encoding("gzip") == "gzip"
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("GZIP;q=0.5") == "gzip"
+    assert negotiate_encoding("*") == "gzip"
+    # Without brotli installed, "br" is never offered
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("br, gzip;q=0.1") == "gzip"
+
+def test_negotiate_encoding_refusals(no_brotli):
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("*;q=0") is None
+    # An explicit q=0 beats the wildcard
+    assert negotiate_encoding("*, gzip;q=0") is None
+    assert negotiate_encoding("gzip;q=bogus") is None
+
+def test_negotiate_encoding_prefers_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding("br;q=0.5, gzip") == "gzip"
+    assert negotiate_encoding("*, br;q=0") == "gzip"
+
+@pytest.mark.asyncio
+async def test_compresses_large_body(no_brotli):
+    body = b"".join(ROWS)
+    headers, bodies = await run(Response(body, media_type="application/json"))
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(bodies[0]["body"])
+    assert gzip.decompress(bodies[0]["body"]) == body
+
+@pytest.mark.asyncio
+async def test_passes_through(no_brotli):
+    small = Response(b'{"id": 1}', media_type="application/json")
+    headers, bodies = await run(small)
+    assert "content-encoding" not in headers
+    assert bodies[0]["body"] == b'{"id": 1}'
+
+    refused = Response(b"".join(ROWS), media_type="application/json")
+    headers, bodies = await run(refused, accept_encoding="identity")
+    assert "content-encoding" not in headers
+    assert bodies[0]["body"] == b"".join(ROWS)
+
+    parquet = Response(b"PAR1" * 1000, media_type="application/vnd.apache.parquet")
+    headers, bodies = await run(parquet)
+    assert "content-encoding" not in headers
+
+    precompressed = Response(gzip.compress(b"".join(ROWS)), headers={"Content-Encoding": "gzip"})
+    headers, bodies = await run(precompressed)
+    assert gzip.decompress(bodies[0]["body"]) == b"".join(ROWS)
+
+@pytest.mark.asyncio
+async def test_streams_one_compressed_stream(no_brotli):
+    async def rows():
+        for start in range(0, len(ROWS), 50):
+            yield b"".join(ROWS[start:start + 50])
+
+    headers, bodies = await run(StreamingResponse(rows(), media_type="application/x-ndjson"))
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert [message["more_body"] for message in bodies] == [True] * 4 + [False]
+
+    # Each chunk is flushed, so a client can decode rows as they arrive...
+    decoder = zlib.decompressobj(31)
+    received = b""
+    for message, start in zip(bodies, range(0, len(ROWS), 50)):
+        received += decoder.decompress(message["body"])
+        assert received == b"".join(ROWS[:start + 50])
+    # ...and all chunks together are a single gzip member
+    stream = b"".join(message["body"] for message in bodies)
+    assert gzip.decompress(stream) == b"".join(ROWS)
+    decoder = zlib.decompressobj(31)
+    decoder.decompress(stream)
+    assert decoder.eof and decoder.unused_data == b""
+
+def test_snapshot_cache_rebuilds_on_new_version():
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b"body %d" % len(builds)
+
+    cache = SnapshotCache()
+    first = cache.get(1, build)
+    assert cache.get(1, build) is first
+    assert len(builds) == 1
+
+    second = cache.get(2, build)
+    assert second is not first
+    assert second.version == 2 and second.body == b"body 2"
+    assert len(builds) == 2
+    # Going back to an older version is a change too
+    assert cache.get(1, build).body == b"body 3"
+
+def test_snapshot_compresses_once_per_version():
+    cache = SnapshotCache()
+    snapshot = cache.get(1, lambda: b"".join(ROWS))
+    encoded = snapshot.encoded_body("gzip")
+    assert snapshot.encoded_body("gzip") is encoded
+    assert gzip.decompress(encoded) == b"".join(ROWS)
+    # A new version starts without compressed bodies
+    assert cache.get(2, lambda: b"".join(ROWS))._encoded == {}
+
+@pytest.mark.asyncio
+async def test_snapshot_response(no_brotli):
+    snapshot = SnapshotCache().get(1, lambda: b"".join(ROWS))
+    response = await snapshot_response(snapshot, "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.body) == b"".join(ROWS)
+
+    response = await snapshot_response(snapshot, None)
+    assert "content-encoding" not in response.headers
+    assert response.body == b"".join(ROWS)
+
+    small = SnapshotCache().get(1, lambda: b"[]")
+    response = await snapshot_response(small, "gzip")
+    assert "content-encoding" not in response.headers
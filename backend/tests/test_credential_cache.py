@@ -0,0 +1,39 @@
+import time
+
+from app.utils.security import VerifiedCredentialCache
+
+def test_hit_after_add():
+    cache = VerifiedCredentialCache(ttl_seconds=60, max_entries=10)
+    assert not cache.contains(1, "secret", "hash-1")
+    cache.add(1, "secret", "hash-1")
+    assert cache.contains(1, "secret", "hash-1")
+    assert not cache.contains(1, "wrong", "hash-1")
+    assert not cache.contains(2, "secret", "hash-1")
+
+def test_password_change_misses():
+    cache = VerifiedCredentialCache(ttl_seconds=60, max_entries=10)
+    cache.add(1, "secret", "hash-1")
+    # A new stored hash is a different key, so the old verification no longer counts
+    assert not cache.contains(1, "secret", "hash-2")
+    cache.invalidate_client(1)
+    assert not cache.contains(1, "secret", "hash-1")
+    assert len(cache._entries) == 0 and not cache._by_client
+
+def test_expired_entry_misses():
+    cache = VerifiedCredentialCache(ttl_seconds=0, max_entries=10)
+    cache.add(1, "secret", "hash-1")
+    time.sleep(0.001)
+    assert not cache.contains(1, "secret", "hash-1")
+    assert len(cache._entries) == 0
+
+def test_eviction_is_least_recently_used():
+    cache = VerifiedCredentialCache(ttl_seconds=60, max_entries=2)
+    cache.add(1, "a", "hash-1")
+    cache.add(2, "b", "hash-2")
+    # Touch client 1 so client 2 becomes the least recently used
+    assert cache.contains(1, "a", "hash-1")
+    cache.add(3, "c", "hash-3")
+    assert cache.contains(1, "a", "hash-1")
+    assert not cache.contains(2, "b", "hash-2")
+    assert cache.contains(3, "c", "hash-3")
+    assert 2 not in cache._by_client
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+from app.utils import denylist as denylist_module
+from app.utils.denylist import TokenDenylist
+
+from fake_supabase import FakeSupabase
+
+def iso(seconds_from_now):
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds_from_now)).isoformat()
+
+def test_revoke_and_lookup():
+    denylist = TokenDenylist(bucket_seconds=60)
+    exp = denylist_module.time.time() + 300
+    denylist.revoke("a", exp)
+    assert denylist.is_revoked("a", exp)
+    assert not denylist.is_revoked("b", exp)
+    # The lookup is keyed by the token's own exp bucket
+    assert not denylist.is_revoked("a", exp + 3600)
+
+def test_already_expired_tokens_are_not_stored():
+    denylist = TokenDenylist()
+    denylist.revoke("a", denylist_module.time.time() - 1)
+    assert len(denylist) == 0
+
+def test_buckets_are_dropped_once_expired(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(denylist_module.time, "time", lambda: now)
+    denylist = TokenDenylist(bucket_seconds=60)
+    denylist.revoke("soon", now + 30)
+    denylist.revoke("later", now + 600)
+    assert len(denylist) == 2
+
+    # Past the first bucket's window, any write prunes it
+    now += 120
+    denylist.revoke("new", now + 300)
+    assert not denylist.is_revoked("soon", 1_000_030.0)
+    assert denylist.is_revoked("later", 1_000_600.0)
+    assert len(denylist) == 2
+
+def test_initial_sync_is_paginated():
+    rows = [{"jti": f"t{i}", "expires_at": iso(600), "revoked_at": iso(-100 + i * 0.01)} for i in range(25)]
+    rows.append({"jti": "expired", "expires_at": iso(-10), "revoked_at": iso(-200)})
+    supabase = FakeSupabase(RevokedTokens=rows, Clients=[])
+    denylist = TokenDenylist(page_size=10)
+    denylist.sync(supabase)
+    assert len(denylist) == 25
+    assert supabase.calls.count(("RevokedTokens", "select")) == 3
+    assert denylist.last_synced_at == rows[24]["revoked_at"]
+
+def test_incremental_sync_rereads_overlap_window():
+    expires_at = iso(600)
+    exp = datetime.fromisoformat(expires_at).timestamp()
+    supabase = FakeSupabase(RevokedTokens=[
+        {"jti": "first", "expires_at": expires_at, "revoked_at": iso(-5)},
+    ], Clients=[])
+    denylist = TokenDenylist(sync_overlap_seconds=30)
+    denylist.sync(supabase)
+
+    # Committed after the last sync but stamped before its cursor
+    supabase.tables["RevokedTokens"].append({"jti": "late", "expires_at": expires_at, "revoked_at": iso(-10)})
+    # Too old to be in flight; an incremental sync does not scan the whole table
+    supabase.tables["RevokedTokens"].append({"jti": "ancient", "expires_at": expires_at, "revoked_at": iso(-3600)})
+    denylist.sync(supabase)
+    assert denylist.is_revoked("late", exp)
+    assert not denylist.is_revoked("ancient", exp)
+
+def test_generation_revocation_is_forgotten_after_token_lifetime(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(denylist_module.time, "time", lambda: now)
+    denylist = TokenDenylist(token_lifetime_seconds=900)
+    denylist.revoke_generation(7, 3)
+    assert denylist.is_generation_revoked(7, 2)
+    assert not denylist.is_generation_revoked(7, 3)
+    # A stale (lower) generation never rolls the entry back
+    denylist.revoke_generation(7, 1)
+    assert denylist.is_generation_revoked(7, 2)
+
+    now += 901
+    denylist.sync(FakeSupabase(RevokedTokens=[], Clients=[]))
+    assert 7 not in denylist._generations
+
+def test_generation_sync_is_paginated_and_bounded():
+    clients = [
+        {"id": i, "session_generation": 1, "sessions_revoked_at": iso(-60 - i * 0.01)} for i in range(12)
+    ]
+    # Revoked long ago: every token it could reject has expired
+    clients.append({"id": 99, "session_generation": 5, "sessions_revoked_at": iso(-7200)})
+    clients.append({"id": 100, "session_generation": 0, "sessions_revoked_at": None})
+    supabase = FakeSupabase(RevokedTokens=[], Clients=clients)
+    denylist = TokenDenylist(page_size=5, token_lifetime_seconds=900)
+    denylist.sync(supabase)
+    assert set(denylist._generations) == set(range(12))
+    assert supabase.calls.count(("Clients", "select")) == 3
+    assert denylist.is_generation_revoked(3, 0)
+    assert not denylist.is_generation_revoked(99, 0)
@@ -0,0 +1,38 @@
+from email.message import EmailMessage
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from app.utils.smtp_pool import SMTPConnectionPool
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=8025)
+    controller.start()
+    yield handler
+    controller.stop()
+
+def make_message(recipient):
+    message = EmailMessage()
+    message["From"] = "no-reply@example.com"
+    message["To"] = recipient
+    message["Subject"] = "Password Reset Request"
+    message.set_content("Hello")
+    return message
+
+def test_pool_reuses_connection(smtp_server):
+    pool = SMTPConnectionPool("127.0.0.1", 8025, size=1)
+    for i in range(3):
+        pool.send(make_message(f"user{i}@example.com"))
+    pool.close()
+    assert len(smtp_server.messages) == 3
+    assert pool.connections_opened == 1
@@ -0,0 +1,121 @@
+import pytest
+
+from app.config.settings import settings
+from app.services import imports
+from app.services.imports import import_chunk, parse_rows, run_import
+
+class InlinePool:
+    def map(self, function, iterable, chunksize=1):
+        return map(function, iterable)
+
+@pytest.fixture
+def import_db(fake_supabase, monkeypatch):
+    monkeypatch.setattr(imports, "supabase", fake_supabase)
+    # bcrypt in a process pool is what production wants, not what a unit test needs
+    monkeypatch.setattr(imports, "get_hash_pool", lambda: InlinePool())
+    monkeypatch.setattr(imports, "_hash_password", lambda password: f"hashed:{password}")
+    fake_supabase.tables["Clients"] = [{"id": 1, "email": "taken@example.com"}]
+
+    def import_clients(p_rows):
+        registered = {row["email"] for row in fake_supabase.tables["Clients"]}
+        created = [row for row in p_rows if row["email"] not in registered]
+        for row in created:
+            fake_supabase.tables["Clients"].append({"id": len(fake_supabase.tables["Clients"]) + 1, **row})
+        return [row["email"] for row in created]
+
+    fake_supabase.rpcs["import_clients"] = import_clients
+    return fake_supabase
+
+def test_parse_csv():
+    text = "client_name,email,password\nAda,ada@example.com,pw1\nBob,bob@example.com\nCy,cy@example.com,pw3,extra\n"
+    rows = list(parse_rows(text, "csv"))
+    assert rows[0] == (1, {"client_name": "Ada", "email": "ada@example.com", "password": "pw1"})
+    # Missing fields come through as None and fail validation later
+    assert rows[1] == (2, {"client_name": "Bob", "email": "bob@example.com", "password": None})
+    assert rows[2] == (3, "Row has more fields than the header")
+
+def test_parse_ndjson():
+    text = '{"client_name": "Ada", "email": "ada@example.com", "password": "pw"}\n\n[1, 2]\n{not json\n'
+    rows = list(parse_rows(text, "ndjson"))
+    assert rows[0][1]["email"] == "ada@example.com"
+    # Blank lines are not rows
+    assert rows[1] == (2, "Row is not a JSON object")
+    assert rows[2][0] == 3 and rows[2][1].startswith("Invalid JSON")
+
+def test_import_chunk_reports_errors_per_row(import_db):
+    chunk = [
+        (1, {"client_name": "Ada", "email": "ADA@example.com", "password": "pw1"}),
+        (2, {"client_name": "Bad", "email": "not-an-email", "password": "pw2"}),
+        (3, {"client_name": "Ada again", "email": "ada@example.com", "password": "pw3"}),
+        (4, {"client_name": "Taken", "email": "taken@example.com", "password": "pw4"}),
+        (5, "Row has more fields than the header"),
+        (6, {"client_name": "Cy", "email": "cy@example.com", "password": None}),
+        (7, {"client_name": "Dee", "email": "dee@example.com", "password": "pw7"}),
+    ]
+    created, errors = import_chunk(chunk)
+
+    assert created == 2
+    assert [error["row"] for error in errors] == [2, 3, 4, 5, 6]
+    assert "Invalid email format" in errors[0]["error"]
+    assert errors[1]["error"] == "Duplicate email in import"
+    assert errors[2]["error"] == "Email already registered"
+    assert errors[3]["error"] == "Row has more fields than the header"
+    [(_, params)] = import_db.rpc_calls
+    # Valid rows go to the database in input order, with emails lower-cased and passwords hashed
+    assert params["p_rows"] == [
+        {"client_name": "Ada", "email": "ada@example.com", "password_hash": "hashed:pw1"},
+        {"client_name": "Taken", "email": "taken@example.com", "password_hash": "hashed:pw4"},
+        {"client_name": "Dee", "email": "dee@example.com", "password_hash": "hashed:pw7"},
+    ]
+
+def test_import_chunk_rejects_unexpected_row_shapes(import_db):
+    # Keys that are not keyword arguments must become a row error, not a crash
+    created, errors = import_chunk([(1, {None: "x", "client_name": "Ada", "email": "ada@example.com", "password": "pw"})])
+    assert created == 0
+    assert errors[0]["row"] == 1
+    assert import_db.rpc_calls == []
+
+def test_run_import_checkpoints_and_resumes(import_db, monkeypatch):
+    monkeypatch.setattr(settings, "CLIENT_IMPORT_CHUNK_SIZE", 2)
+    text = "client_name,email,password\n" + "".join(f"User{i},user{i}@example.com,pw{i}\n" for i in range(1, 6))
+    checkpoints = []
+
+    progress = run_import(text, "csv", start_row=1, on_chunk=lambda p: checkpoints.append(p["checkpoint_row"]))
+
+    assert checkpoints == [3, 5]
+    assert (progress["rows_processed"], progress["clients_created"], progress["errors"]) == (4, 4, [])
+    assert "user1@example.com" not in {row["email"] for row in import_db.tables["Clients"]}
+
+def test_hash_pool_does_not_fork():
+    pool = imports.get_hash_pool()
+    try:
+        assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert imports.get_hash_pool() is pool
+    finally:
+        imports.shutdown_hash_pool()
+    assert imports._hash_pool is None
+    # Nothing to stop once shut down
+    imports.shutdown_hash_pool()
+
+def test_import_upload_must_be_utf8(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routes import admin
+
+    started = []
+
+    async def start_import(text, fmt, start_row):
+        started.append(text)
+
+    monkeypatch.setattr(admin.ClientImportService, "start_import", start_import)
+    app = FastAPI()
+    app.include_router(admin.router)
+    app.dependency_overrides[admin.require_admin] = lambda: {"sub": "1"}
+    client = TestClient(app)
+
+    latin1 = "client_name,email,password\nJos\u00e9,jose@example.com,Secret123\n".encode("latin-1")
+    response = client.post("/admin/clients/import", files={"file": ("clients.csv", latin1, "text/csv")})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Import file must be UTF-8 encoded"}
+    assert started == []
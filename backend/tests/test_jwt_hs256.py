@@ -0,0 +1,73 @@
+import base64
+import time
+
+import orjson
+import pytest
+from jose import jwt
+
+from app.utils.jwt_hs256 import HS256Codec, TokenError
+
+SECRET = "unit-test-secret"
+
+def b64(data: dict) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(data)).rstrip(b"=").decode()
+
+def test_round_trip():
+    codec = HS256Codec(SECRET)
+    claims = {"sub": "42", "sid": "abc", "jti": "t1", "gen": 0}
+    token = codec.encode(claims, expires_in=60)
+    decoded = codec.decode(token)
+    assert {key: decoded[key] for key in claims} == claims
+    assert isinstance(decoded["exp"], int) and decoded["exp"] > time.time()
+    assert "exp" not in claims
+
+def test_interoperates_with_jose():
+    codec = HS256Codec(SECRET)
+    token = codec.encode({"sub": "42"}, expires_in=60)
+    assert jwt.decode(token, SECRET, algorithms=["HS256"])["sub"] == "42"
+
+    jose_token = jwt.encode({"sub": "7", "exp": int(time.time()) + 60}, SECRET, algorithm="HS256")
+    assert codec.decode(jose_token)["sub"] == "7"
+
+def test_rejects_expired():
+    codec = HS256Codec(SECRET)
+    token = codec.encode({"sub": "42", "exp": int(time.time()) - 1})
+    with pytest.raises(TokenError, match="expired"):
+        codec.decode(token)
+    assert codec.decode(token, verify_exp=False)["sub"] == "42"
+
+def test_rejects_non_numeric_exp():
+    codec = HS256Codec(SECRET)
+    with pytest.raises(TokenError):
+        codec.decode(codec.encode({"sub": "42", "exp": "never"}))
+
+def test_rejects_bad_signature():
+    token = HS256Codec("another-secret").encode({"sub": "42"}, expires_in=60)
+    with pytest.raises(TokenError, match="Signature"):
+        HS256Codec(SECRET).decode(token)
+
+def test_rejects_tampered_payload():
+    codec = HS256Codec(SECRET)
+    header, _, signature = codec.encode({"sub": "42"}, expires_in=60).split(".")
+    forged = f"{header}.{b64({'sub': '1', 'exp': int(time.time()) + 60})}.{signature}"
+    with pytest.raises(TokenError):
+        codec.decode(forged)
+
+def test_rejects_alg_none():
+    token = f"{b64({'alg': 'none', 'typ': 'JWT'})}.{b64({'sub': '42'})}."
+    with pytest.raises(TokenError, match="header"):
+        HS256Codec(SECRET).decode(token)
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b", "a.b.c", "é.é.é", "..."])
+def test_rejects_malformed(token):
+    with pytest.raises(TokenError):
+        HS256Codec(SECRET).decode(token)
+
+def test_rejects_non_object_claims():
+    codec = HS256Codec(SECRET)
+    header = codec._header.decode()
+    payload = base64.urlsafe_b64encode(b"[1,2]").rstrip(b"=").decode()
+    signing_input = f"{header}.{payload}".encode()
+    signature = base64.urlsafe_b64encode(codec._sign(signing_input)).rstrip(b"=").decode()
+    with pytest.raises(TokenError, match="Malformed"):
+        codec.decode(f"{header}.{payload}.{signature}")
@@ -0,0 +1,95 @@
+import time
+
+import orjson
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils import security
+from app.utils.jwt_hs256 import TokenError
+from app.utils.jwt_keys import AsymmetricKeyRing, _SigningKey, _b64decode
+
+def ed25519_key(kid):
+    return _SigningKey(kid, private_key=ed25519.Ed25519PrivateKey.generate())
+
+def es256_key(kid):
+    return _SigningKey(kid, private_key=ec.generate_private_key(ec.SECP256R1()))
+
+def public_only(key):
+    return _SigningKey(key.kid, public_key=key.public_key)
+
+@pytest.mark.parametrize("make_key, alg", [(ed25519_key, "EdDSA"), (es256_key, "ES256")])
+def test_sign_and_verify(make_key, alg):
+    ring = AsymmetricKeyRing([make_key("k1")])
+    token = ring.encode({"sub": "42"}, expires_in=60)
+    header = orjson.loads(_b64decode(token.split(".")[0].encode()))
+    assert header == {"alg": alg, "kid": "k1", "typ": "JWT"}
+    assert ring.decode(token)["sub"] == "42"
+
+@pytest.mark.parametrize("make_key", [ed25519_key, es256_key])
+def test_rejects_forged_and_expired(make_key):
+    ring = AsymmetricKeyRing([make_key("k1")])
+    other = AsymmetricKeyRing([make_key("k1")])
+    with pytest.raises(TokenError):
+        ring.decode(other.encode({"sub": "42"}, expires_in=60))
+    with pytest.raises(TokenError, match="expired"):
+        ring.decode(ring.encode({"sub": "42", "exp": int(time.time()) - 1}))
+
+def test_verifies_previous_key_after_rotation():
+    old, new = ed25519_key("2024-01"), es256_key("2024-02")
+    old_token = AsymmetricKeyRing([old]).encode({"sub": "1"}, expires_in=60)
+
+    # New key signs; the old one is kept public-only until its tokens expire
+    rotated = AsymmetricKeyRing([public_only(old), new], signing_kid="2024-02")
+    assert rotated.signing_kid == "2024-02"
+    assert rotated.decode(old_token)["sub"] == "1"
+    new_token = rotated.encode({"sub": "2"}, expires_in=60)
+    assert rotated.decode(new_token)["sub"] == "2"
+
+    # Once the old key is dropped its tokens no longer verify
+    with pytest.raises(TokenError, match="Unknown signing key"):
+        AsymmetricKeyRing([new]).decode(old_token)
+
+def test_signing_kid_must_have_private_key():
+    old = ed25519_key("old")
+    with pytest.raises(ValueError):
+        AsymmetricKeyRing([public_only(old), ed25519_key("new")], signing_kid="old")
+    with pytest.raises(ValueError):
+        AsymmetricKeyRing([public_only(old)])
+
+def test_from_directory(tmp_path):
+    private = ed25519.Ed25519PrivateKey.generate()
+    (tmp_path / "a-retired.pem").write_bytes(ec.generate_private_key(ec.SECP256R1()).public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ))
+    (tmp_path / "b-current.pem").write_bytes(private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    ring = AsymmetricKeyRing.from_directory(str(tmp_path))
+    assert ring.signing_kid == "b-current"
+    assert [key["kid"] for key in orjson.loads(ring.jwks_json)["keys"]] == ["a-retired", "b-current"]
+
+def test_jwks_shape():
+    ring = AsymmetricKeyRing([ed25519_key("ed"), es256_key("ec")])
+    keys = {key["kid"]: key for key in orjson.loads(ring.jwks_json)["keys"]}
+    assert set(keys["ed"]) == {"kty", "crv", "x", "kid", "alg", "use"}
+    assert (keys["ed"]["kty"], keys["ed"]["crv"], keys["ed"]["alg"], keys["ed"]["use"]) == ("OKP", "Ed25519", "EdDSA", "sig")
+    assert set(keys["ec"]) == {"kty", "crv", "x", "y", "kid", "alg", "use"}
+    assert (keys["ec"]["kty"], keys["ec"]["crv"], keys["ec"]["alg"]) == ("EC", "P-256", "ES256")
+    # No private material is ever published
+    assert all("d" not in key for key in keys.values())
+
+def test_jwks_endpoint(monkeypatch):
+    client = TestClient(app)
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert "max-age=" in response.headers["cache-control"]
+    if not isinstance(security.token_codec, AsymmetricKeyRing):
+        assert response.json() == {"keys": []}
+
+    ring = AsymmetricKeyRing([ed25519_key("k1")])
+    monkeypatch.setattr(security, "token_codec", ring)
+    response = client.get("/.well-known/jwks.json")
+    assert response.json()["keys"][0]["kid"] == "k1"
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import HTTPException
+
+from app.config.settings import settings
+from app.models.auth import LoginRequest
+from app.services import auth as auth_service
+from app.services.auth import AuthService
+from app.utils.security import decode_access_token, get_password_hash, hash_refresh_token
+
+@pytest.fixture
+def client(fake_supabase, monkeypatch):
+    monkeypatch.setattr(auth_service, "supabase", fake_supabase)
+    fake_supabase.tables["Clients"] = [{
+        "id": 7, "email": "ada@example.com", "deleted_at": None, "session_generation": 3
+    }]
+    fake_supabase.tables["Authentication"] = [{
+        "auth_id": 1, "client_id": 7, "password_hash": get_password_hash("correct horse"), "last_login": None
+    }]
+    # A revoke-all committed between reading the client and locking it bumped the generation to 5
+    fake_supabase.rpcs["create_session"] = lambda p_session, p_max_sessions: [{"evicted": 2, "generation": 5}]
+    return fake_supabase
+
+async def login(password):
+    return await AuthService.login_user(LoginRequest(email="ada@example.com", password=password))
+
+@pytest.mark.asyncio
+async def test_login_creates_capped_session(client):
+    token = await login("correct horse")
+
+    [(name, params)] = client.rpc_calls
+    assert name == "create_session"
+    assert params["p_max_sessions"] == settings.MAX_SESSIONS_PER_CLIENT
+    session = params["p_session"]
+    assert session["client_id"] == 7
+    # The database function stamps the generation from the row it locks
+    assert "generation" not in session
+    # Only the hash of the refresh token is stored
+    assert session["refresh_token_hash"] == hash_refresh_token(token.refresh_token)
+    claims = decode_access_token(token.access_token)
+    assert (claims["sub"], claims["sid"], claims["gen"]) == ("7", session["session_id"], 5)
+    assert client.tables["Authentication"][0]["last_login"] is not None
+
+@pytest.mark.asyncio
+async def test_wrong_password_creates_no_session(client):
+    with pytest.raises(HTTPException) as exc:
+        await login("wrong")
+    assert exc.value.status_code == 401
+    assert client.rpc_calls == []
+
+@pytest.mark.asyncio
+async def test_logout_twice(client):
+    token = await login("correct horse")
+    session_id = decode_access_token(token.access_token)["sid"]
+    client.tables["Sessions"] = [{"session_id": session_id, "client_id": 7}]
+
+    for _ in range(2):
+        assert await AuthService.logout_user(token.access_token) == {"message": "Successfully logged out"}
+    [revoked] = client.tables["RevokedTokens"]
+    assert revoked["jti"] == decode_access_token(token.access_token)["jti"]
+    assert client.tables["Sessions"] == []
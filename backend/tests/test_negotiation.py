@@ -0,0 +1,131 @@
+from datetime import datetime
+
+import orjson
+import pytest
+from fastapi import APIRouter, BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.utils import negotiation
+from app.utils.negotiation import MsgPackRoute, prefers_msgpack
+from app.utils.responses import TrustedJSONResponse, trusted_json_response
+
+msgpack = pytest.importorskip("msgpack")
+
+ROWS = [{"id": 1, "email": "ada@example.com", "created_at": datetime(2024, 1, 2, 3, 4, 5)}]
+
+class Login(BaseModel):
+    email: str
+    password: str
+
+def make_client(events=None):
+    router = APIRouter(route_class=MsgPackRoute)
+
+    @router.post("/echo")
+    async def echo(login: Login):
+        return {"email": login.email}
+
+    @router.get("/trusted")
+    async def trusted():
+        response = trusted_json_response(ROWS, status_code=201, headers={"X-Total-Count": "1"})
+        response.set_cookie("seen", "1")
+        response.set_cookie("theme", "dark")
+        return response
+
+    @router.get("/background")
+    async def background(background_tasks: BackgroundTasks):
+        background_tasks.add_task(events.append, "sent")
+        return trusted_json_response(ROWS)
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+def test_prefers_msgpack():
+    assert prefers_msgpack("application/msgpack")
+    assert prefers_msgpack("application/x-msgpack, application/json;q=0.9")
+    assert prefers_msgpack("application/json;q=0.5, application/vnd.msgpack;q=0.8")
+    assert prefers_msgpack("*/*;q=0.1, application/msgpack")
+
+def test_prefers_json():
+    assert not prefers_msgpack(None)
+    assert not prefers_msgpack("")
+    assert not prefers_msgpack("application/json")
+    assert not prefers_msgpack("*/*")
+    assert not prefers_msgpack("application/msgpack;q=0.5, application/json")
+    assert not prefers_msgpack("application/msgpack;q=0")
+    assert not prefers_msgpack("application/msgpack;q=bogus")
+    # Ties go to JSON
+    assert not prefers_msgpack("application/msgpack, application/json")
+    assert not prefers_msgpack("application/msgpack;q=0.8, application/*;q=0.8")
+    assert not prefers_msgpack("application/msgpack, */*")
+
+def test_prefers_json_without_msgpack(monkeypatch):
+    monkeypatch.setattr(negotiation, "msgpack", None)
+    assert not prefers_msgpack("application/msgpack")
+
+def test_msgpack_request_and_response():
+    client = make_client()
+    response = client.post(
+        "/echo",
+        content=msgpack.packb({"email": "ada@example.com", "password": "secret"}),
+        headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    assert msgpack.unpackb(response.content) == {"email": "ada@example.com"}
+
+def test_msgpack_body_validated_like_json():
+    response = make_client().post(
+        "/echo", content=msgpack.packb({"email": "ada@example.com"}), headers={"Content-Type": "application/msgpack"}
+    )
+    assert response.status_code == 422
+    # Errors stay JSON
+    assert response.json()["detail"][0]["loc"] == ["body", "password"]
+
+def test_malformed_msgpack_body():
+    response = make_client().post("/echo", content=b"\xc1", headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid MessagePack body"}
+
+def test_msgpack_body_refused_without_msgpack(monkeypatch):
+    body = msgpack.packb({"email": "ada@example.com", "password": "secret"})
+    monkeypatch.setattr(negotiation, "msgpack", None)
+    response = make_client().post(
+        "/echo", content=body, headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+    )
+    assert response.status_code == 415
+    assert response.json() == {"detail": "MessagePack is not supported by this server"}
+
+def test_trusted_response_as_msgpack(monkeypatch):
+    def fail(self, content):
+        raise AssertionError("rendered as JSON")
+
+    # The trusted rows go straight to MessagePack, never through orjson
+    monkeypatch.setattr(TrustedJSONResponse, "render", fail)
+    response = make_client().get("/trusted", headers={"Accept": "application/msgpack"})
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["content-length"] == str(len(response.content))
+    assert response.headers["x-total-count"] == "1"
+    assert response.headers.get_list("set-cookie") == [
+        "seen=1; Path=/; SameSite=lax", "theme=dark; Path=/; SameSite=lax"
+    ]
+    assert msgpack.unpackb(response.content) == [
+        {"id": 1, "email": "ada@example.com", "created_at": "2024-01-02T03:04:05"}
+    ]
+
+def test_trusted_response_as_json():
+    response = make_client().get("/trusted")
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["x-total-count"] == "1"
+    assert response.headers["vary"] == "Accept"
+    assert response.content == orjson.dumps(ROWS)
+
+def test_trusted_response_keeps_background_task():
+    events = []
+    response = make_client(events).get("/background", headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert events == ["sent"]
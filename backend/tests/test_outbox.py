@@ -0,0 +1,152 @@
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+from fake_supabase import _coerce
+
+from app.utils import outbox
+from app.utils.outbox import EmailOutboxWorker, build_message, enqueue_email
+from app.utils.smtp_pool import LoggingTransport
+
+class RecordingTransport:
+    def __init__(self, fail_for=()):
+        self.fail_for = set(fail_for)
+        self.sent = []
+
+    def send(self, message):
+        if message["To"] in self.fail_for:
+            raise OSError("connection refused")
+        self.sent.append(message["To"])
+
+@pytest.fixture
+def outbox_db(fake_supabase):
+    fake_supabase.tables["EmailOutbox"] = []
+
+    def claim_email_batch(p_limit, p_lease_seconds):
+        # Same selection as the database function, minus the row locks
+        now = datetime.utcnow()
+        due = [
+            row for row in fake_supabase.tables["EmailOutbox"]
+            if row["status"] == "pending" and _coerce(row["next_attempt_at"]) <= now
+            and (row["locked_until"] is None or _coerce(row["locked_until"]) < now)
+        ]
+        due.sort(key=lambda row: (_coerce(row["next_attempt_at"]), row["id"]))
+        for row in due[:p_limit]:
+            row["locked_until"] = now + timedelta(seconds=p_lease_seconds)
+        return [dict(row) for row in due[:p_limit]]
+
+    fake_supabase.rpcs["claim_email_batch"] = claim_email_batch
+    return fake_supabase
+
+def queue(db, *recipients, attempts=0):
+    for recipient in recipients:
+        db.tables["EmailOutbox"].append({
+            "id": len(db.tables["EmailOutbox"]) + 1,
+            "recipient": recipient,
+            "subject": "Password Reset Request",
+            "body_text": "Hello",
+            "body_html": None,
+            "status": "pending",
+            "attempts": attempts,
+            "next_attempt_at": datetime.utcnow() - timedelta(seconds=1),
+            "locked_until": None,
+            "last_error": None,
+            "expires_at": None,
+        })
+
+def rows(db):
+    return {row["recipient"]: row for row in db.tables["EmailOutbox"]}
+
+def test_enqueue_only_inserts(fake_supabase):
+    enqueue_email(fake_supabase, "ada@example.com", "Subject", "Text", "<p>Html</p>")
+    assert fake_supabase.calls == [("EmailOutbox", "insert")]
+    assert fake_supabase.tables["EmailOutbox"][0]["recipient"] == "ada@example.com"
+
+def test_drain_claims_in_batches_and_marks_sent(outbox_db):
+    queue(outbox_db, *(f"user{i}@example.com" for i in range(5)))
+    transport = RecordingTransport()
+    worker = EmailOutboxWorker(transport, "no-reply@example.com", batch_size=2)
+
+    assert worker.drain(outbox_db) == 5
+    assert transport.sent == [f"user{i}@example.com" for i in range(5)]
+    assert all(row["status"] == "sent" and row["locked_until"] is None for row in rows(outbox_db).values())
+    # Three claims (2 + 2 + 1), and one update per batch for all its successes
+    assert [name for name, _ in outbox_db.rpc_calls] == ["claim_email_batch"] * 3
+    assert outbox_db.calls.count(("EmailOutbox", "update")) == 3
+    assert worker.metrics == {"sent": 5, "retried": 0, "failed": 0}
+
+def test_claimed_messages_are_not_claimed_again(outbox_db):
+    queue(outbox_db, "a@example.com")
+    outbox_db.rpcs["claim_email_batch"](p_limit=10, p_lease_seconds=300)
+    worker = EmailOutboxWorker(RecordingTransport(), "no-reply@example.com")
+    # Leased by another worker
+    assert worker.drain(outbox_db) == 0
+
+def test_failure_is_rescheduled_with_backoff(outbox_db, monkeypatch):
+    monkeypatch.setattr(outbox.random, "uniform", lambda low, high: 1.0)
+    queue(outbox_db, "ok@example.com", "down@example.com")
+    queue(outbox_db, "flaky@example.com", attempts=2)
+    worker = EmailOutboxWorker(
+        RecordingTransport(fail_for={"down@example.com", "flaky@example.com"}),
+        "no-reply@example.com",
+        backoff_base_seconds=30
+    )
+    before = datetime.utcnow()
+
+    assert worker.drain(outbox_db) == 1
+    down, flaky = rows(outbox_db)["down@example.com"], rows(outbox_db)["flaky@example.com"]
+    assert (down["status"], down["attempts"], down["last_error"]) == ("pending", 1, "connection refused")
+    assert down["locked_until"] is None
+    # 30s after the first failure, doubling per attempt
+    assert timedelta(seconds=29) < _coerce(down["next_attempt_at"]) - before < timedelta(seconds=31)
+    assert timedelta(seconds=119) < _coerce(flaky["next_attempt_at"]) - before < timedelta(seconds=121)
+    assert worker.metrics == {"sent": 1, "retried": 2, "failed": 0}
+
+    # Not due yet, so a second drain leaves them alone
+    assert worker.drain(outbox_db) == 0
+    assert rows(outbox_db)["down@example.com"]["attempts"] == 1
+
+def test_backoff_is_capped_and_jittered():
+    worker = EmailOutboxWorker(None, "no-reply@example.com", backoff_base_seconds=30, backoff_max_seconds=3600)
+    for attempts, expected in [(1, 30), (2, 60), (5, 480), (20, 3600)]:
+        assert expected * 0.8 <= worker.backoff(attempts) <= expected * 1.2
+
+def test_gives_up_after_max_attempts(outbox_db):
+    queue(outbox_db, "gone@example.com", attempts=2)
+    worker = EmailOutboxWorker(RecordingTransport(fail_for={"gone@example.com"}), "no-reply@example.com", max_attempts=3)
+
+    worker.drain(outbox_db)
+    row = rows(outbox_db)["gone@example.com"]
+    assert (row["status"], row["attempts"]) == ("failed", 3)
+    assert worker.metrics == {"sent": 0, "retried": 0, "failed": 1}
+    assert worker.drain(outbox_db) == 0
+
+def test_finished_messages_expire_after_retention(outbox_db):
+    queue(outbox_db, "ok@example.com", "down@example.com", "gone@example.com")
+    rows(outbox_db)["gone@example.com"]["attempts"] = 2
+    worker = EmailOutboxWorker(
+        RecordingTransport(fail_for={"down@example.com", "gone@example.com"}),
+        "no-reply@example.com",
+        max_attempts=3,
+        retention_days=7
+    )
+    before = datetime.utcnow()
+    worker.drain(outbox_db)
+    # Sent and failed rows get swept after the retention period; retried ones are still pending
+    for recipient in ("ok@example.com", "gone@example.com"):
+        expires_in = _coerce(rows(outbox_db)[recipient]["expires_at"]) - before
+        assert timedelta(days=7) <= expires_in < timedelta(days=7, seconds=5)
+    assert rows(outbox_db)["down@example.com"]["expires_at"] is None
+
+def test_logging_transport_logs_the_body(caplog):
+    message = build_message("no-reply@example.com", {
+        "recipient": "ada@example.com",
+        "subject": "Password Reset Request",
+        "body_text": "Reset here: https://app.example.com/reset-password?token=abc",
+        "body_html": "<a href=\"https://app.example.com/reset-password?token=abc\">Reset</a>"
+    })
+    with caplog.at_level(logging.INFO, logger="app.utils.smtp_pool"):
+        LoggingTransport().send(message)
+    assert "To: ada@example.com" in caplog.text
+    assert "https://app.example.com/reset-password?token=abc" in caplog.text
+    assert "<a href" not in caplog.text
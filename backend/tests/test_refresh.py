@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.auth import RefreshRequest
+from app.services import auth as auth_service
+from app.services.auth import AuthService
+from app.utils.security import create_refresh_token, decode_access_token
+
+@pytest.fixture
+def session(fake_supabase, monkeypatch):
+    monkeypatch.setattr(auth_service, "supabase", fake_supabase)
+    refresh_token, refresh_token_hash = create_refresh_token("s1")
+    now = datetime.utcnow()
+    fake_supabase.tables["Sessions"] = [{
+        "session_id": "s1",
+        "client_id": 7,
+        "created_at": now.isoformat(),
+        "expires_at": (now + timedelta(hours=1)).isoformat(),
+        "last_activity": None,
+        "refresh_token_hash": refresh_token_hash,
+        "previous_refresh_token_hash": None,
+        "generation": 2,
+    }]
+    return refresh_token
+
+async def refresh(token):
+    return await AuthService.refresh_session(RefreshRequest(refresh_token=token))
+
+def sessions(fake_supabase):
+    return fake_supabase.tables["Sessions"]
+
+@pytest.mark.asyncio
+async def test_rotation(fake_supabase, session):
+    first = await refresh(session)
+    assert first.refresh_token != session
+    assert first.refresh_token.startswith("s1.")
+    claims = decode_access_token(first.access_token)
+    assert (claims["sub"], claims["sid"], claims["gen"]) == ("7", "s1", 2)
+
+    # The rotated token chains on; the old one is remembered for reuse detection
+    second = await refresh(first.refresh_token)
+    assert second.refresh_token not in (session, first.refresh_token)
+    assert len(sessions(fake_supabase)) == 1
+
+@pytest.mark.asyncio
+async def test_reuse_of_rotated_token_revokes_session(fake_supabase, session):
+    rotated = await refresh(session)
+    with pytest.raises(HTTPException) as exc:
+        await refresh(session)
+    assert exc.value.status_code == 401
+    assert sessions(fake_supabase) == []
+    # Whoever held the legitimate token is logged out too
+    with pytest.raises(HTTPException):
+        await refresh(rotated.refresh_token)
+
+@pytest.mark.asyncio
+async def test_unknown_token_does_not_revoke_session(fake_supabase, session):
+    # The session id is in every access token, so it alone must not end the session
+    for token in ("s1.garbage", "s1.", "garbage", "other.secret"):
+        with pytest.raises(HTTPException) as exc:
+            await refresh(token)
+        assert exc.value.status_code == 401
+    assert len(sessions(fake_supabase)) == 1
+    assert (await refresh(session)).refresh_token
+
+@pytest.mark.asyncio
+async def test_expired_or_idle_session_is_rejected(fake_supabase, session, monkeypatch):
+    row = sessions(fake_supabase)[0]
+    row["expires_at"] = (datetime.utcnow() - timedelta(seconds=1)).isoformat()
+    with pytest.raises(HTTPException):
+        await refresh(session)
+
+    row["expires_at"] = (datetime.utcnow() + timedelta(hours=1)).isoformat()
+    row["last_activity"] = (datetime.utcnow() - timedelta(minutes=auth_service.settings.SESSION_IDLE_TIMEOUT_MINUTES + 1)).isoformat()
+    with pytest.raises(HTTPException):
+        await refresh(session)
@@ -0,0 +1,139 @@
+import pytest
+from fastapi import HTTPException
+
+from app.config.settings import settings
+from app.models.auth import PasswordReset, PasswordResetRequest
+from app.services import auth as auth_service
+from app.services.auth import AuthService
+from app.utils import reset_tokens
+from app.utils.reset_tokens import (
+    ResetTokenError, ResetTokenSigner, _b64decode, _b64encode, is_stateless_reset_token, password_hash_fingerprint
+)
+from app.utils.security import reset_token_signer
+
+PASSWORD_HASH = "$2b$12$abcdefghijklmnopqrstuv"
+
+@pytest.fixture
+def signer():
+    return ResetTokenSigner("secret")
+
+def test_round_trip(signer):
+    token = signer.create(42, PASSWORD_HASH, 60)
+    assert is_stateless_reset_token(token)
+    assert signer.verify(token) == (42, password_hash_fingerprint(PASSWORD_HASH))
+
+def test_database_tokens_are_not_stateless():
+    assert not is_stateless_reset_token("0b1c3e6a-8f5d-4a57-9a8e-1f0f5b0c2d3e")
+
+def test_other_secret_is_rejected(signer):
+    token = ResetTokenSigner("other").create(42, PASSWORD_HASH, 60)
+    with pytest.raises(ResetTokenError, match="Signature"):
+        signer.verify(token)
+
+def test_tampered_payload_is_rejected(signer):
+    payload, signature = signer.create(42, PASSWORD_HASH, 60).split(".")
+    forged = _b64encode(_b64decode(payload).replace(b"42:", b"43:", 1))
+    with pytest.raises(ResetTokenError, match="Signature"):
+        signer.verify(f"{forged}.{signature}")
+
+@pytest.mark.parametrize("token", ["", ".", "abc", "abc.def", "!!!.???"])
+def test_malformed_tokens(signer, token):
+    with pytest.raises(ResetTokenError):
+        signer.verify(token)
+
+def test_signed_but_malformed_payload(signer):
+    payload = b"not-a-number:0:abc"
+    with pytest.raises(ResetTokenError, match="Malformed"):
+        signer.verify(f"{_b64encode(payload)}.{_b64encode(signer._sign(payload))}")
+
+def test_expiry(signer, monkeypatch):
+    now = 1_700_000_000
+    monkeypatch.setattr(reset_tokens.time, "time", lambda: now)
+    token = signer.create(42, PASSWORD_HASH, 60)
+    monkeypatch.setattr(reset_tokens.time, "time", lambda: now + 59)
+    assert signer.verify(token)[0] == 42
+    monkeypatch.setattr(reset_tokens.time, "time", lambda: now + 60)
+    with pytest.raises(ResetTokenError, match="expired"):
+        signer.verify(token)
+
+@pytest.fixture
+def stateless_db(fake_supabase, monkeypatch):
+    monkeypatch.setattr(auth_service, "supabase", fake_supabase)
+    fake_supabase.tables["Authentication"] = [{"client_id": 42, "password_hash": PASSWORD_HASH}]
+
+    def reset_password_stateless(p_client_id, p_fingerprint, p_password_hash):
+        # Same contract as the database function: only while the fingerprint still matches
+        for row in fake_supabase.tables["Authentication"]:
+            if row["client_id"] == p_client_id and password_hash_fingerprint(row["password_hash"]) == p_fingerprint:
+                row["password_hash"] = p_password_hash
+                return True
+        return False
+
+    fake_supabase.rpcs["reset_password_stateless"] = reset_password_stateless
+    return fake_supabase
+
+@pytest.mark.asyncio
+async def test_stateless_token_is_single_use(stateless_db):
+    token = reset_token_signer.create(42, PASSWORD_HASH, 60)
+    await AuthService.reset_password(PasswordReset(token=token, new_password="new password"))
+    assert stateless_db.tables["Authentication"][0]["password_hash"] != PASSWORD_HASH
+
+    with pytest.raises(HTTPException) as exc:
+        await AuthService.reset_password(PasswordReset(token=token, new_password="again"))
+    assert exc.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_forged_token_never_reaches_the_database(stateless_db):
+    token = ResetTokenSigner("other").create(42, PASSWORD_HASH, 60)
+    with pytest.raises(HTTPException) as exc:
+        await AuthService.reset_password(PasswordReset(token=token, new_password="new password"))
+    assert exc.value.status_code == 400
+    assert stateless_db.rpc_calls == []
+
+@pytest.fixture
+def database_db(fake_supabase, monkeypatch):
+    monkeypatch.setattr(auth_service, "supabase", fake_supabase)
+    return fake_supabase
+
+@pytest.mark.asyncio
+async def test_database_token_reset(database_db):
+    database_db.rpcs["consume_reset_token"] = lambda p_token, p_password_hash: 42
+    result = await AuthService.reset_password(PasswordReset(token="t1", new_password="new password"))
+    assert result == {"message": "Password has been reset successfully"}
+    [(name, params)] = database_db.rpc_calls
+    assert name == "consume_reset_token" and params["p_token"] == "t1"
+    # Hashed before the call, never sent in the clear
+    assert params["p_password_hash"] != "new password"
+
+@pytest.mark.asyncio
+async def test_database_token_unknown_or_used(database_db):
+    database_db.rpcs["consume_reset_token"] = lambda p_token, p_password_hash: None
+    with pytest.raises(HTTPException) as exc:
+        await AuthService.reset_password(PasswordReset(token="t1", new_password="new password"))
+    assert (exc.value.status_code, exc.value.detail) == (400, "Invalid or expired token")
+
+@pytest.mark.asyncio
+async def test_database_token_failure(database_db):
+    database_db.fail_next = RuntimeError("Authentication record not found for client 42")
+    with pytest.raises(HTTPException) as exc:
+        await AuthService.reset_password(PasswordReset(token="t1", new_password="new password"))
+    assert (exc.value.status_code, exc.value.detail) == (400, "Failed to reset password")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("issued", [None, 42])
+async def test_reset_email_only_when_token_issued(database_db, monkeypatch, issued):
+    sent = []
+
+    async def send_password_reset_email(email, token, locale=None):
+        sent.append((email, token))
+        return True
+
+    monkeypatch.setattr(auth_service, "send_password_reset_email", send_password_reset_email)
+    database_db.rpcs["issue_reset_token"] = lambda **params: issued
+    result = await AuthService.request_password_reset(PasswordResetRequest(email="ada@example.com"))
+
+    # Throttled, unknown and successful requests all look the same to the caller
+    assert result == {"message": "If your email is registered, you will receive a password reset link"}
+    [(name, params)] = database_db.rpc_calls
+    assert params["p_min_interval_seconds"] == settings.PASSWORD_RESET_MIN_INTERVAL_SECONDS
+    assert sent == ([] if issued is None else [("ada@example.com", params["p_token"])])
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.utils.responses import TrustedJSONResponse, trusted_json_response
+
+ROWS = [{"id": 1, "email": "ada@example.com", "created_at": datetime(2024, 1, 2, 3, 4, 5)}]
+
+class Row(BaseModel):
+    id: int
+    email: str
+    created_at: datetime
+
+def test_renders_with_orjson():
+    response = trusted_json_response(ROWS, status_code=201)
+    assert isinstance(response, TrustedJSONResponse)
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    # Rendered only when needed
+    assert response.body is None
+    assert "content-length" not in response.headers
+    assert response.render_body() == orjson.dumps(ROWS)
+    assert response.headers["content-length"] == str(len(orjson.dumps(ROWS)))
+    # Kept for re-rendering in other formats
+    assert response.content is ROWS
+
+def test_skips_response_model_validation():
+    app = FastAPI()
+
+    @app.get("/trusted", response_model=list[Row])
+    async def trusted():
+        # Not a valid Row; returned as-is because the handler vouches for it
+        return trusted_json_response([{"id": "x"}])
+
+    @app.get("/validated", response_model=list[Row])
+    async def validated():
+        return ROWS
+
+    client = TestClient(app)
+    assert client.get("/trusted").json() == [{"id": "x"}]
+    # Same wire format as the validated path
+    assert client.get("/validated").content == orjson.dumps(ROWS)
+    # The schema still documents the response model
+    schema = client.get("/openapi.json").json()
+    assert schema["paths"]["/trusted"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]["items"] == {
+        "$ref": "#/components/schemas/Row"
+    }
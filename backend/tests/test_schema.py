@@ -0,0 +1,334 @@
+"""
+Schema tests: apply daddybase.sql to a scratch database and call its functions.
+
+Set TEST_DATABASE_URL to a PostgreSQL server (pg_trgm available) whose user
+may create databases; each run creates its own database and drops it after.
+Skipped when the variable is unset.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+import psycopg2.extensions
+import psycopg2.extras
+
+from app.utils.reset_tokens import password_hash_fingerprint
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA = Path(__file__).resolve().parents[2] / "daddybase.sql"
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+@pytest.fixture(scope="module")
+def connection():
+    name = f"daddybase_test_{os.getpid()}"
+    admin = psycopg2.connect(DATABASE_URL)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {name}")
+        cur.execute(f"CREATE DATABASE {name}")
+    connection = psycopg2.connect(psycopg2.extensions.make_dsn(DATABASE_URL, dbname=name))
+    try:
+        with connection.cursor() as cur:
+            # The whole file must apply to an empty database
+            cur.execute(SCHEMA.read_text())
+        connection.commit()
+        yield connection
+    finally:
+        connection.close()
+        with admin.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS {name}")
+        admin.close()
+
+@pytest.fixture
+def db(connection):
+    # Every test runs in its own transaction and is rolled back
+    with connection.cursor() as cur:
+        yield cur
+    connection.rollback()
+
+def scalar(db, query, *params):
+    db.execute(query, params)
+    return db.fetchone()[0]
+
+def add_client(db, email, name=None):
+    return scalar(
+        db,
+        'INSERT INTO public."Clients" (client_name, email) VALUES (%s, %s) RETURNING id',
+        name or email.split("@")[0], email
+    )
+
+def add_session(db, session_id, client_id, created_offset="0 seconds", expires_offset="1 hour"):
+    db.execute(
+        'INSERT INTO public."Sessions" (session_id, client_id, created_at, expires_at) '
+        "VALUES (%s, %s, now() + %s::interval, now() + %s::interval)",
+        (session_id, client_id, created_offset, expires_offset)
+    )
+
+def test_touch_sessions_keeps_newest_activity(db):
+    client_id = add_client(db, "touch@example.com")
+    add_session(db, "a", client_id)
+    add_session(db, "b", client_id)
+    db.execute(
+        "SELECT public.touch_sessions(%s, %s::timestamptz[])",
+        (["a", "b"], ["2030-01-01T00:00:10+00", "2030-01-01T00:00:05+00"])
+    )
+    # A flush that arrives late must not move last_activity backwards
+    db.execute("SELECT public.touch_sessions(%s, %s::timestamptz[])", (["a"], ["2030-01-01T00:00:00+00"]))
+    db.execute('SELECT session_id, last_activity::text FROM public."Sessions" ORDER BY session_id')
+    assert db.fetchall() == [("a", "2030-01-01 00:00:10+00"), ("b", "2030-01-01 00:00:05+00")]
+
+def test_sweep_expired_deletes_in_batches(db):
+    client_id = add_client(db, "sweep@example.com")
+    for i in range(5):
+        add_session(db, f"expired-{i}", client_id, expires_offset=f"-{i + 1} minutes")
+    add_session(db, "live", client_id)
+    assert scalar(db, "SELECT public.sweep_expired('Sessions', 3)") == 3
+    assert scalar(db, "SELECT public.sweep_expired('Sessions', 3)") == 2
+    assert scalar(db, "SELECT public.sweep_expired('Sessions', 3)") == 0
+    assert scalar(db, 'SELECT array_agg(session_id) FROM public."Sessions"') == ["live"]
+    assert scalar(db, "SELECT public.sweep_expired('ResetTokens', 10)") == 0
+
+def test_sweep_expired_deletes_finished_emails_after_retention(db):
+    db.execute(
+        'INSERT INTO public."EmailOutbox" (recipient, subject, body_text, status, expires_at) VALUES '
+        "('sent-old', 's', 'b', 'sent', now() - interval '1 minute'), "
+        "('failed-old', 's', 'b', 'failed', now() - interval '2 minutes'), "
+        "('sent-new', 's', 'b', 'sent', now() + interval '7 days'), "
+        "('pending', 's', 'b', 'pending', NULL)"
+    )
+    assert scalar(db, "SELECT public.sweep_expired('EmailOutbox', 10)") == 2
+    db.execute('SELECT recipient FROM public."EmailOutbox" ORDER BY recipient')
+    assert db.fetchall() == [("pending",), ("sent-new",)]
+
+def test_sweep_expired_rejects_other_tables(db):
+    with pytest.raises(psycopg2.Error, match="not swept"):
+        db.execute("SELECT public.sweep_expired('Clients', 10)")
+
+def create_session(db, session_id, client_id, max_sessions, created_at="now()"):
+    db.execute(
+        f"SELECT evicted, generation FROM public.create_session(jsonb_build_object("
+        f"'session_id', %s::text, 'client_id', %s::bigint, 'created_at', {created_at}, "
+        f"'expires_at', now() + interval '1 hour', 'refresh_token_hash', 'h'), %s)",
+        (session_id, client_id, max_sessions)
+    )
+    return db.fetchone()
+
+def test_create_session_evicts_oldest_beyond_cap(db):
+    client_id = add_client(db, "cap@example.com")
+    other_id = add_client(db, "other@example.com")
+    add_session(db, "other", other_id, created_offset="-1 day")
+    for i in range(3):
+        assert create_session(db, f"s{i}", client_id, 3, f"now() + interval '{i} seconds'") == (0, 0)
+    assert create_session(db, "s3", client_id, 3, "now() + interval '3 seconds'") == (1, 0)
+    assert create_session(db, "s4", client_id, 3, "now() + interval '4 seconds'") == (1, 0)
+    db.execute('SELECT session_id FROM public."Sessions" ORDER BY session_id')
+    # Other clients' sessions are never counted against the cap
+    assert [row[0] for row in db.fetchall()] == ["other", "s2", "s3", "s4"]
+    assert scalar(db, 'SELECT generation FROM public."Sessions" WHERE session_id = %s', "s4") == 0
+
+def test_create_session_stamps_current_generation(db):
+    client_id = add_client(db, "gen@example.com")
+    db.execute('UPDATE public."Clients" SET session_generation = 4 WHERE id = %s', (client_id,))
+    # Whatever the caller read earlier, the session gets the generation seen under the lock
+    db.execute(
+        "SELECT generation FROM public.create_session(jsonb_build_object("
+        "'session_id', 's1', 'client_id', %s::bigint, 'created_at', now(), 'expires_at', now() + interval '1 hour', "
+        "'refresh_token_hash', 'h', 'generation', 1), 0)",
+        (client_id,)
+    )
+    # ...and returns it for the access token
+    assert db.fetchone()[0] == 4
+    assert scalar(db, 'SELECT generation FROM public."Sessions" WHERE session_id = %s', "s1") == 4
+
+def test_create_session_refuses_deleted_client(db):
+    client_id = add_client(db, "deleted-login@example.com")
+    db.execute('UPDATE public."Clients" SET deleted_at = now() WHERE id = %s', (client_id,))
+    with pytest.raises(psycopg2.Error, match="does not exist"):
+        create_session(db, "s1", client_id, 0)
+
+def test_create_session_without_cap(db):
+    client_id = add_client(db, "nocap@example.com")
+    for i in range(5):
+        assert create_session(db, f"s{i}", client_id, 0) == (0, 0)
+    assert scalar(db, 'SELECT count(*) FROM public."Sessions" WHERE client_id = %s', client_id) == 5
+
+def add_authentication(db, client_id, password_hash):
+    db.execute(
+        'INSERT INTO public."Authentication" (client_id, password_hash) VALUES (%s, %s)',
+        (client_id, password_hash)
+    )
+
+def test_reset_password_stateless_is_single_use(db):
+    client_id = add_client(db, "stateless@example.com")
+    add_authentication(db, client_id, "old-hash")
+    fingerprint = password_hash_fingerprint("old-hash")
+    reset = "SELECT public.reset_password_stateless(%s, %s, %s)"
+    assert scalar(db, reset, client_id, fingerprint, "new-hash") is True
+    # The hash changed, so the same token no longer matches
+    assert scalar(db, reset, client_id, fingerprint, "newer-hash") is False
+    assert scalar(db, 'SELECT password_hash FROM public."Authentication" WHERE client_id = %s', client_id) == "new-hash"
+
+def add_reset_token(db, token, client_id, expires_offset="30 minutes"):
+    db.execute(
+        'INSERT INTO public."ResetTokens" (token, client_id, expires_at) VALUES (%s, %s, now() + %s::interval)',
+        (token, client_id, expires_offset)
+    )
+
+def test_consume_reset_token_is_single_use(db):
+    client_id = add_client(db, "consume@example.com")
+    add_authentication(db, client_id, "old-hash")
+    add_reset_token(db, "t1", client_id)
+    consume = "SELECT public.consume_reset_token(%s, %s)"
+    assert scalar(db, consume, "t1", "new-hash") == client_id
+    assert scalar(db, consume, "t1", "newer-hash") is None
+    assert scalar(db, 'SELECT password_hash FROM public."Authentication" WHERE client_id = %s', client_id) == "new-hash"
+
+def test_consume_reset_token_rejects_unknown_and_expired(db):
+    client_id = add_client(db, "expired@example.com")
+    add_authentication(db, client_id, "old-hash")
+    add_reset_token(db, "old", client_id, expires_offset="-1 second")
+    assert scalar(db, "SELECT public.consume_reset_token(%s, %s)", "old", "new-hash") is None
+    assert scalar(db, "SELECT public.consume_reset_token(%s, %s)", "missing", "new-hash") is None
+    assert scalar(db, 'SELECT password_hash FROM public."Authentication" WHERE client_id = %s', client_id) == "old-hash"
+
+def test_consume_reset_token_without_authentication_raises(db):
+    client_id = add_client(db, "noauth@example.com")
+    add_reset_token(db, "t1", client_id)
+    db.execute("SAVEPOINT consume")
+    with pytest.raises(psycopg2.Error, match="Authentication record not found"):
+        db.execute("SELECT public.consume_reset_token(%s, %s)", ("t1", "new-hash"))
+    db.execute("ROLLBACK TO SAVEPOINT consume")
+    # The failed call must not have used up the token
+    assert scalar(db, 'SELECT count(*) FROM public."ResetTokens" WHERE token = %s', "t1") == 1
+
+def issue_reset_token(db, email, token, min_interval=60):
+    return scalar(db, "SELECT public.issue_reset_token(%s, %s, 1800, %s)", email, token, min_interval)
+
+def test_issue_reset_token_throttles_per_client(db):
+    client_id = add_client(db, "throttle@example.com")
+    assert issue_reset_token(db, "throttle@example.com", "t1") == client_id
+    # Within the window nothing is written and the first token stays valid
+    assert issue_reset_token(db, "throttle@example.com", "t2") is None
+    assert scalar(db, 'SELECT array_agg(token) FROM public."ResetTokens" WHERE client_id = %s', client_id) == ["t1"]
+
+    db.execute('UPDATE public."ResetTokens" SET created_at = now() - interval \'61 seconds\' WHERE client_id = %s', (client_id,))
+    assert issue_reset_token(db, "throttle@example.com", "t3") == client_id
+    # Still one token per client; the new one replaces the old
+    assert scalar(db, 'SELECT array_agg(token) FROM public."ResetTokens" WHERE client_id = %s', client_id) == ["t3"]
+    assert scalar(db, 'SELECT expires_at - created_at FROM public."ResetTokens" WHERE token = %s', "t3").total_seconds() == 1800
+
+def test_issue_reset_token_unknown_email(db):
+    assert issue_reset_token(db, "nobody@example.com", "t1") is None
+    assert scalar(db, 'SELECT count(*) FROM public."ResetTokens"') == 0
+
+def test_claim_email_batch_leases_due_messages(db):
+    db.execute(
+        'INSERT INTO public."EmailOutbox" (recipient, subject, body_text, status, next_attempt_at) VALUES '
+        "('due1', 's', 'b', 'pending', now() - interval '2 minutes'), "
+        "('due2', 's', 'b', 'pending', now() - interval '1 minute'), "
+        "('later', 's', 'b', 'pending', now() + interval '1 minute'), "
+        "('done', 's', 'b', 'sent', now() - interval '1 minute')"
+    )
+    db.execute("SELECT recipient FROM public.claim_email_batch(1, 300)")
+    assert db.fetchall() == [("due1",)]
+    # The first message is leased, so the next claim moves on
+    db.execute("SELECT recipient FROM public.claim_email_batch(10, 300)")
+    assert db.fetchall() == [("due2",)]
+    db.execute("SELECT recipient FROM public.claim_email_batch(10, 300)")
+    assert db.fetchall() == []
+
+def test_import_clients_skips_registered_emails(db):
+    add_client(db, "taken@example.com")
+    rows = [
+        {"client_name": "New", "email": "new@example.com", "password_hash": "h1"},
+        {"client_name": "Taken", "email": "taken@example.com", "password_hash": "h2"},
+        {"client_name": "Other", "email": "other@example.com", "password_hash": "h3"},
+    ]
+    created = scalar(db, "SELECT public.import_clients(%s::jsonb)", psycopg2.extras.Json(rows))
+    assert sorted(created) == ["new@example.com", "other@example.com"]
+    # One statement, one timestamp for the whole chunk
+    assert scalar(db, 'SELECT count(DISTINCT created_at) FROM public."Clients" WHERE email <> %s', "taken@example.com") == 1
+    db.execute(
+        'SELECT c.email, a.password_hash FROM public."Clients" c JOIN public."Authentication" a ON a.client_id = c.id ORDER BY c.id'
+    )
+    assert db.fetchall() == [("new@example.com", "h1"), ("other@example.com", "h3")]
+
+def test_soft_delete_clients_ends_sessions_and_resets(db):
+    client_id = add_client(db, "gone@example.com")
+    other_id = add_client(db, "stays@example.com")
+    add_authentication(db, client_id, "old-hash")
+    add_session(db, "s1", client_id)
+    add_session(db, "s2", other_id)
+    add_reset_token(db, "t1", client_id)
+
+    db.execute("SELECT * FROM public.soft_delete_clients(%s)", ([client_id, other_id + 100],))
+    assert db.fetchall() == [(client_id, 1)]
+    assert scalar(db, 'SELECT array_agg(session_id) FROM public."Sessions"') == ["s2"]
+    assert scalar(db, 'SELECT count(*) FROM public."ResetTokens"') == 0
+    # Already deleted: nothing changes the second time
+    db.execute("SELECT * FROM public.soft_delete_clients(%s)", ([client_id],))
+    assert db.fetchall() == []
+
+def test_reset_paths_ignore_deleted_clients(db):
+    client_id = add_client(db, "deleted@example.com")
+    add_authentication(db, client_id, "old-hash")
+    # A token that survived the deletion, e.g. issued by a request racing it
+    add_reset_token(db, "t1", client_id)
+    db.execute('UPDATE public."Clients" SET deleted_at = now() WHERE id = %s', (client_id,))
+
+    assert scalar(db, "SELECT public.consume_reset_token(%s, %s)", "t1", "new-hash") is None
+    assert scalar(
+        db, "SELECT public.reset_password_stateless(%s, %s, %s)",
+        client_id, password_hash_fingerprint("old-hash"), "new-hash"
+    ) is False
+    assert scalar(db, 'SELECT password_hash FROM public."Authentication" WHERE client_id = %s', client_id) == "old-hash"
+    assert issue_reset_token(db, "deleted@example.com", "t2", min_interval=0) is None
+
+def test_purge_deleted_clients(db):
+    ids = [add_client(db, f"purge{i}@example.com") for i in range(3)]
+    live_id = add_client(db, "live@example.com")
+    for client_id in ids + [live_id]:
+        add_authentication(db, client_id, "hash")
+    add_session(db, "s-live", live_id)
+    db.execute("SELECT * FROM public.soft_delete_clients(%s)", (ids,))
+
+    assert scalar(db, "SELECT public.purge_deleted_clients(2)") == 2
+    assert scalar(db, "SELECT public.purge_deleted_clients(2)") == 1
+    assert scalar(db, "SELECT public.purge_deleted_clients(2)") == 0
+    assert scalar(db, 'SELECT array_agg(id) FROM public."Clients"') == [live_id]
+    assert scalar(db, 'SELECT array_agg(client_id) FROM public."Authentication"') == [live_id]
+    assert scalar(db, 'SELECT array_agg(session_id) FROM public."Sessions"') == ["s-live"]
+    # Mirrors following the change feed learn about the purge
+    assert sorted(scalar(db, 'SELECT array_agg(client_id) FROM public."ClientTombstones"')) == ids
+
+SEARCH_CLIENTS = [
+    ("Ada Lovelace", "ada@example.com"),
+    ("Adam Smith", "smith@example.com"),
+    ("Grace Hopper", "adalovelace-fan@example.com"),
+    ("Ada", "countess@example.com"),
+    ("Ada", "ada.byron@example.org"),
+    ("Alan Turing", "alan@example.com"),
+    (None, "adele@example.com"),
+    ("Zoe Adahl", "zoe@example.se"),
+    ("adam_s", "adam.s@example.com"),
+    ("Lovelace Fan Club", "club@example.net"),
+]
+
+@pytest.mark.parametrize("query", ["ada", "ad", "Ada L", "lovelace", "alen turing", "adam_", "example", "zz", "  "])
+def test_search_index_ranks_like_search_clients(db, query):
+    from app.utils.search_index import ClientSearchIndex
+
+    clients = []
+    for name, email in SEARCH_CLIENTS:
+        client_id = add_client(db, email, name)
+        db.execute('UPDATE public."Clients" SET client_name = %s WHERE id = %s', (name, client_id))
+        clients.append({"id": client_id, "client_name": name, "email": email})
+    index = ClientSearchIndex(similarity_threshold=0.3)
+    index.build(clients)
+
+    db.execute("SELECT id FROM public.search_clients(%s, 100, 0, 0.3)", (query,))
+    assert [row["id"] for row in index.search(query, limit=100)] == [row[0] for row in db.fetchall()]
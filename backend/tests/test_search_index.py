@@ -0,0 +1,156 @@
+import pytest
+
+from app.utils import search_index
+from app.utils.search_index import ClientSearchIndex, trigrams
+
+CLIENTS = [
+    {"id": 1, "client_name": "Ada Lovelace", "email": "ada@example.com"},
+    {"id": 2, "client_name": "Adam Smith", "email": "smith@example.com"},
+    {"id": 3, "client_name": "Grace Hopper", "email": "adalovelace-fan@example.com"},
+    {"id": 4, "client_name": "Ada", "email": "countess@example.com"},
+    {"id": 5, "client_name": "Alan Turing", "email": "alan@example.com"},
+    {"id": 6, "client_name": None, "email": "adele@example.com"},
+]
+
+@pytest.fixture
+def index():
+    index = ClientSearchIndex(similarity_threshold=0.3)
+    index.build(CLIENTS)
+    return index
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+def test_trigrams_match_pg_trgm():
+    # pg_trgm: show_trgm('Ada@ex') = {"  a","  e"," ad"," ex","ad ","ada","ex ","da "}
+    assert trigrams("Ada@ex") == {"  a", " ad", "ada", "da ", "  e", " ex", "ex "}
+    assert trigrams("a_b") == {"  a", " a ", "  b", " b "}
+
+def test_prefix_matches_rank_by_matching_field_then_id(index):
+    # "ada", "ada lovelace", "adalovelace-fan@...", "adam smith"
+    assert ids(index.search("ada", limit=10))[:4] == [4, 1, 3, 2]
+
+def test_fuzzy_matches_follow_prefix_matches(index):
+    # "lovelace" is no prefix of anything; trigram similarity finds client 1
+    assert ids(index.search("lovelace")) == [1]
+    # Typo: nothing starts with "alen", but "alan" is close enough
+    assert ids(index.search("Alen Turing")) == [5]
+
+def test_fuzzy_matches_share_values():
+    index = ClientSearchIndex()
+    index.build([
+        {"id": 9, "client_name": "Ada Lovelace", "email": "a9@example.com"},
+        {"id": 3, "client_name": "ada lovelace", "email": "a3@example.com"},
+        {"id": 5, "client_name": "Ada Lovelac", "email": "a5@example.com"},
+    ])
+    # Same value, same score: ordered by id; the closer value first
+    assert ids(index.search("Ada Lovelance")) == [3, 9, 5]
+    index.apply([{"op": "delete", "id": 3}, {"op": "delete", "id": 9}])
+    assert ids(index.search("Ada Lovelance")) == [5]
+
+def test_fuzzy_candidates_are_capped(monkeypatch):
+    index = ClientSearchIndex()
+    index.build(
+        [{"id": i, "client_name": f"Ada Lovelace X{i}", "email": None} for i in range(1, 50)]
+        + [{"id": 50, "client_name": "Ada Lovelace Zq", "email": None}]
+    )
+    assert len(index.search("Ada Lovelace Zqx", limit=100)) == 50
+    monkeypatch.setattr(search_index, "MAX_CANDIDATES", 5)
+    # Candidates come from the query's rarest trigrams first, so the strong
+    # match survives the cap
+    matches = ids(index.search("Ada Lovelace Zqx", limit=100))
+    assert matches[0] == 50 and len(matches) == 5
+
+def test_threshold(index):
+    index.similarity_threshold = 0.9
+    assert index.search("lovelace") == []
+
+def test_pagination(index):
+    everything = ids(index.search("ad", limit=10))
+    assert len(everything) == 5
+    pages = [ids(index.search("ad", limit=2, offset=offset)) for offset in (0, 2, 4, 6)]
+    assert pages == [everything[0:2], everything[2:4], everything[4:6], []]
+
+def test_empty_query(index):
+    assert index.search("   ") == []
+
+def test_incremental_updates(index):
+    index.apply([
+        {"op": "upsert", "id": 4, "client": {"id": 4, "client_name": "Zed", "email": "zed@example.com"}},
+        {"op": "delete", "id": 1},
+        {"op": "upsert", "id": 7, "client": {"id": 7, "client_name": "Adaline", "email": "a7@example.com"}},
+    ])
+    assert ids(index.search("ada", limit=10))[:3] == [7, 3, 2]
+    assert ids(index.search("zed")) == [4]
+    assert len(index) == 6
+
+def page(changes, cursor, has_more=False):
+    return {"changes": changes, "next_cursor": cursor, "has_more": has_more}
+
+def test_initial_sync_builds_once():
+    feed = {
+        None: page([{"op": "upsert", "id": c["id"], "client": c} for c in CLIENTS[:4]], "c1", has_more=True),
+        "c1": page([{"op": "upsert", "id": c["id"], "client": c} for c in CLIENTS[4:]] + [{"op": "delete", "id": 2}], "c2"),
+        "c2": page([{"op": "upsert", "id": 8, "client": {"id": 8, "client_name": "Ada Byron", "email": None}}], "c3"),
+    }
+    index = ClientSearchIndex()
+    index.sync(lambda cursor, page_size: feed[cursor])
+    assert index.ready and index.cursor == "c2"
+    assert len(index) == 5
+    # Later syncs apply changes incrementally
+    index.sync(lambda cursor, page_size: feed[cursor])
+    assert index.cursor == "c3"
+    # Prefix match first, then client 4 ("Ada") by similarity
+    assert ids(index.search("ada b")) == [8, 4]
+
+def test_failed_initial_sync_starts_over():
+    calls = []
+
+    def fetch_changes(cursor, page_size):
+        calls.append(cursor)
+        if cursor == "c1":
+            raise ConnectionError("database unavailable")
+        return page([{"op": "upsert", "id": 1, "client": CLIENTS[0]}], "c1", has_more=True)
+
+    index = ClientSearchIndex()
+    with pytest.raises(ConnectionError):
+        index.sync(fetch_changes)
+    assert (index.ready, index.cursor, len(index)) == (False, None, 0)
+    with pytest.raises(ConnectionError):
+        index.sync(fetch_changes)
+    assert calls == [None, "c1", None, "c1"]
+
+@pytest.mark.asyncio
+async def test_service_pages_with_one_extra_row(index, monkeypatch):
+    from app.config.settings import settings
+    from app.services import clients as client_service
+    from app.services.clients import ClientService
+
+    monkeypatch.setattr(settings, "CLIENT_SEARCH_BACKEND", "memory")
+    monkeypatch.setattr(client_service, "client_search_index", index)
+    index.ready = True
+
+    first = await ClientService.search_clients("ad", limit=3)
+    assert ids(first["clients"]) == ids(index.search("ad", limit=3))
+    assert first["next_offset"] == 3
+    last = await ClientService.search_clients("ad", limit=3, offset=3)
+    assert len(last["clients"]) == 2 and last["next_offset"] is None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "database"])
+async def test_service_rejects_blank_query(index, monkeypatch, fake_supabase, backend):
+    from fastapi import HTTPException
+
+    from app.config.settings import settings
+    from app.services import clients as client_service
+    from app.services.clients import ClientService
+
+    monkeypatch.setattr(settings, "CLIENT_SEARCH_BACKEND", backend)
+    monkeypatch.setattr(client_service, "client_search_index", index)
+    monkeypatch.setattr(client_service, "supabase", fake_supabase)
+    index.ready = True
+
+    with pytest.raises(HTTPException) as error:
+        await ClientService.search_clients("   ")
+    assert error.value.status_code == 400
+    assert fake_supabase.calls == []
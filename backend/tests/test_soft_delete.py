@@ -0,0 +1,62 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models.client import ClientUpdate
+from app.services import clients as client_service
+from app.services.clients import ClientService
+from app.utils.denylist import TokenDenylist
+
+@pytest.fixture
+def delete_db(fake_supabase, monkeypatch):
+    monkeypatch.setattr(client_service, "supabase", fake_supabase)
+    monkeypatch.setattr(client_service, "token_denylist", TokenDenylist())
+    fake_supabase.tables["Clients"] = [
+        {"id": 1, "deleted_at": None, "session_generation": 0},
+        {"id": 2, "deleted_at": None, "session_generation": 4},
+    ]
+
+    def soft_delete_clients(p_ids):
+        deleted = []
+        for row in fake_supabase.tables["Clients"]:
+            if row["id"] in p_ids and row["deleted_at"] is None:
+                row["deleted_at"] = "2024-01-01T00:00:00+00:00"
+                row["session_generation"] += 1
+                deleted.append({"id": row["id"], "session_generation": row["session_generation"]})
+        return deleted
+
+    fake_supabase.rpcs["soft_delete_clients"] = soft_delete_clients
+    return fake_supabase
+
+@pytest.mark.asyncio
+async def test_delete_revokes_tokens_locally(delete_db):
+    await ClientService.delete_client(2)
+    # This worker rejects the client's old tokens without waiting for a denylist sync
+    denylist = client_service.token_denylist
+    assert denylist.is_generation_revoked(2, 4)
+    assert not denylist.is_generation_revoked(2, 5)
+    assert delete_db.rpc_calls == [("soft_delete_clients", {"p_ids": [2]})]
+
+@pytest.mark.asyncio
+async def test_delete_twice_is_not_found(delete_db):
+    await ClientService.delete_client(1)
+    with pytest.raises(HTTPException) as exc:
+        await ClientService.delete_client(1)
+    assert exc.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_batch_delete_reports_per_id(delete_db):
+    result = await ClientService.batch_delete_clients([2, 3, 2])
+    assert result == {"results": [{"id": 2, "status": 200}, {"id": 3, "status": 404, "detail": "Client not found"}]}
+    # Duplicates are collapsed before the call
+    assert delete_db.rpc_calls == [("soft_delete_clients", {"p_ids": [2, 3]})]
+
+@pytest.mark.asyncio
+async def test_update_deleted_client_is_not_found(delete_db):
+    await ClientService.delete_client(1)
+    with pytest.raises(HTTPException) as exc:
+        await ClientService.update_client(1, ClientUpdate(client_name="Ada"))
+    assert exc.value.status_code == 404
+    assert "client_name" not in delete_db.tables["Clients"][0]
+
+    updated = await ClientService.update_client(2, ClientUpdate(client_name="Grace"))
+    assert updated["client_name"] == "Grace"
@@ -0,0 +1,102 @@
+import pytest
+
+from app.utils import sweeper as sweeper_module
+from app.utils.sweeper import DeletedClientPurger, ExpirySweeper, SWEPT_TABLES
+
+from fake_supabase import FakeSupabase
+
+def sweeper_db(expired):
+    # expired: table -> rows left to delete
+    supabase = FakeSupabase()
+
+    def sweep_expired(p_table, p_limit):
+        count = min(expired[p_table], p_limit)
+        expired[p_table] -= count
+        return count
+
+    supabase.rpcs["sweep_expired"] = sweep_expired
+    return supabase
+
+def test_sweeps_every_table_in_batches():
+    expired = {"Sessions": 25, "ResetTokens": 0, "RevokedTokens": 10, "EmailOutbox": 3}
+    supabase = sweeper_db(expired)
+    sweeper = ExpirySweeper(batch_size=10, time_budget_seconds=60)
+    assert sweeper.run(supabase) == 38
+    assert expired == {"Sessions": 0, "ResetTokens": 0, "RevokedTokens": 0, "EmailOutbox": 0}
+    # 10 + 10 + 5 for Sessions, one empty call for ResetTokens, 10 + 0 for RevokedTokens, 3 for EmailOutbox
+    assert [params["p_table"] for _, params in supabase.rpc_calls] == (
+        ["Sessions"] * 3 + ["ResetTokens"] + ["RevokedTokens"] * 2 + ["EmailOutbox"]
+    )
+    assert sweeper.metrics["rows_deleted"] == {"Sessions": 25, "ResetTokens": 0, "RevokedTokens": 10, "EmailOutbox": 3}
+    assert sweeper.metrics["runs"] == 1 and sweeper.metrics["budget_exhausted_runs"] == 0
+    assert sweeper.metrics["last_run_rows_deleted"] == 38
+
+def test_stops_when_budget_is_spent(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(sweeper_module.time, "monotonic", lambda: clock[0])
+    expired = {table: 100 for table in SWEPT_TABLES}
+    supabase = sweeper_db(expired)
+    original = supabase.rpcs["sweep_expired"]
+
+    def slow_sweep(p_table, p_limit):
+        clock[0] += 1
+        return original(p_table, p_limit)
+
+    supabase.rpcs["sweep_expired"] = slow_sweep
+    sweeper = ExpirySweeper(batch_size=10, time_budget_seconds=3)
+    assert sweeper.run(supabase) == 30
+    assert expired["Sessions"] == 70 and expired["RevokedTokens"] == 100
+    assert sweeper.metrics["budget_exhausted_runs"] == 1
+
+def test_failed_run_is_counted():
+    supabase = sweeper_db({table: 5 for table in SWEPT_TABLES})
+    supabase.fail_next = ConnectionError("database unavailable")
+    sweeper = ExpirySweeper(batch_size=10, time_budget_seconds=60)
+    with pytest.raises(ConnectionError):
+        sweeper.run(supabase)
+    assert sweeper.metrics["failed_runs"] == 1 and sweeper.metrics["runs"] == 1
+
+def purger_db(deleted):
+    supabase = FakeSupabase()
+
+    def purge_deleted_clients(p_limit):
+        count = min(deleted[0], p_limit)
+        deleted[0] -= count
+        return count
+
+    supabase.rpcs["purge_deleted_clients"] = purge_deleted_clients
+    return supabase
+
+def test_purger_drains_in_batches():
+    deleted = [25]
+    supabase = purger_db(deleted)
+    purger = DeletedClientPurger(batch_size=10, time_budget_seconds=60)
+    assert purger.run(supabase) == 25
+    assert deleted == [0]
+    # A short batch means the queue is empty
+    assert len(supabase.rpc_calls) == 3
+    assert purger.metrics["clients_purged"] == 25 and purger.metrics["runs"] == 1
+
+def test_purger_stops_when_budget_is_spent(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(sweeper_module.time, "monotonic", lambda: clock[0])
+    deleted = [100]
+    supabase = purger_db(deleted)
+    original = supabase.rpcs["purge_deleted_clients"]
+
+    def slow_purge(p_limit):
+        clock[0] += 1
+        return original(p_limit)
+
+    supabase.rpcs["purge_deleted_clients"] = slow_purge
+    purger = DeletedClientPurger(batch_size=10, time_budget_seconds=2)
+    assert purger.run(supabase) == 20
+    assert deleted == [80]
+
+def test_purger_failed_run_is_counted():
+    supabase = purger_db([5])
+    supabase.fail_next = ConnectionError("database unavailable")
+    purger = DeletedClientPurger(batch_size=10, time_budget_seconds=60)
+    with pytest.raises(ConnectionError):
+        purger.run(supabase)
+    assert purger.metrics["failed_runs"] == 1 and purger.metrics["clients_purged"] == 0
@@ -0,0 +1,64 @@
+import pytest
+
+from app.utils.email import render_password_reset_email
+from app.utils.templates import CompiledTemplate, EmailTemplateRegistry
+
+def write_templates(root, locale, subject, text, html=None):
+    directory = root / locale
+    directory.mkdir()
+    (directory / "greeting.subject.txt").write_text(subject, encoding="utf-8")
+    (directory / "greeting.txt").write_text(text, encoding="utf-8")
+    if html is not None:
+        (directory / "greeting.html").write_text(html, encoding="utf-8")
+
+@pytest.fixture
+def registry(tmp_path):
+    write_templates(tmp_path, "en", "Hello {user}\n", "Hi {user}, see {site}", "<p>Hi {user}, see {site}</p>")
+    write_templates(tmp_path, "es", "Hola {user}\n", "Hola {user}")
+    write_templates(tmp_path, "pt-BR", "Olá {user}\n", "Olá {user}")
+    return EmailTemplateRegistry("en", static_context={"site": "https://example.com/?a=1&b=2"}, template_dir=tmp_path)
+
+def test_html_body_escapes_values(registry):
+    subject, text, html = registry.render("greeting", user="<Ada & Bob>")
+    assert subject == "Hello <Ada & Bob>"
+    assert text == "Hi <Ada & Bob>, see https://example.com/?a=1&b=2"
+    # Static values are escaped too, once, when the template is compiled
+    assert html == "<p>Hi &lt;Ada &amp; Bob&gt;, see https://example.com/?a=1&amp;b=2</p>"
+
+@pytest.mark.parametrize("locale, subject", [
+    ("es", "Hola Ada"),
+    ("ES", "Hola Ada"),
+    ("es-ES", "Hola Ada"),
+    ("es_MX", "Hola Ada"),
+    (" Es-es ", "Hola Ada"),
+    ("pt-br", "Olá Ada"),
+    ("PT_BR", "Olá Ada"),
+    # Only pt-BR exists, so plain "pt" has nothing to fall back to
+    ("pt", "Hello Ada"),
+    ("fr-FR", "Hello Ada"),
+    ("", "Hello Ada"),
+    (None, "Hello Ada"),
+])
+def test_locale_fallback(registry, locale, subject):
+    assert registry.render("greeting", locale, user="Ada")[0] == subject
+
+def test_missing_html_body(registry):
+    assert registry.render("greeting", "es", user="Ada")[2] is None
+
+def test_static_context_is_folded_into_literals():
+    template = CompiledTemplate("a {static} b {dynamic} c {static}", {"static": "S"})
+    # Only the dynamic placeholder is left to fill in at render time
+    assert template._parts == ["a S b ", "", " c S"]
+    assert template.render({"dynamic": "D"}) == "a S b D c S"
+
+def test_literal_braces():
+    assert CompiledTemplate("{{ {value} }}").render({"value": 1}) == "{ 1 }"
+
+def test_format_specs_are_rejected():
+    with pytest.raises(ValueError, match="Format specs"):
+        CompiledTemplate("{value!r}")
+
+def test_password_reset_email_contains_link():
+    subject, text, html = render_password_reset_email("abc&def", "ES")
+    assert "reset-password?token=abc&def" in text
+    assert "reset-password?token=abc&amp;def" in html
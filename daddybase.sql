@@ -29,14 +29,599 @@ CREATE TABLE public."Authentication" (
 -- It tracks session creation, expiration, and last activity timestamps, ensuring time-limited and secure access.
 -- Each session is uniquely identified and linked to a client via a foreign key.
 CREATE TABLE public."Sessions" (
-  ssesion_id TEXT NOT NULL, -- Primary key for the Sessions table, a unique identifier for the session.
+  session_id TEXT NOT NULL, -- Primary key for the Sessions table, a unique identifier for the session.
   client_id BIGINT NULL, -- Foreign key linking to the Clients table, can be null.
   created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), -- Timestamp for when the session was created, defaults to the current time.
   expires_at TIMESTAMP WITH TIME ZONE NULL, -- Timestamp for when the session expires, can be null.
   last_activity TIMESTAMP WITH TIME ZONE NULL, -- Timestamp for the last activity in the session, can be null.
-  CONSTRAINT Sessions_pkey PRIMARY KEY (ssesion_id), -- Primary key constraint on the "ssesion_id" column.
+  CONSTRAINT Sessions_pkey PRIMARY KEY (session_id), -- Primary key constraint on the "session_id" column.
   CONSTRAINT Sessions_client_id_fkey FOREIGN KEY (client_id) REFERENCES "Clients" (id) -- Foreign key constraint linking "client_id" to "id" in the Clients table.
 ) TABLESPACE pg_default;
 
 
 
+-- Refresh token rotation.
+-- Each session stores the SHA-256 of its current refresh token; a refresh swaps it with a conditional update,
+-- so a token that has already been rotated no longer matches. Presenting exactly the previous token is
+-- detected as reuse and revokes the session; any other mismatch is simply rejected.
+ALTER TABLE public."Sessions"
+  ADD COLUMN refresh_token_hash TEXT NULL, -- SHA-256 hex digest of the session's current refresh token, can be null.
+  ADD COLUMN previous_refresh_token_hash TEXT NULL; -- SHA-256 hex digest of the token it replaced, used for reuse detection.
+
+-- The RevokedTokens table records access tokens revoked by logout before their natural expiry.
+-- Every API worker polls it for rows newer than its last sync and keeps the ids in memory until expires_at.
+-- Rows are useless once expires_at has passed and can be deleted.
+CREATE TABLE public."RevokedTokens" (
+  jti TEXT NOT NULL, -- The "jti" claim of the revoked access token.
+  expires_at TIMESTAMP WITH TIME ZONE NOT NULL, -- The token's own expiry; the revocation is irrelevant after this.
+  revoked_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), -- When the token was revoked, used as the sync cursor.
+  CONSTRAINT RevokedTokens_pkey PRIMARY KEY (jti) -- Primary key constraint on the "jti" column.
+) TABLESPACE pg_default;
+
+CREATE INDEX RevokedTokens_revoked_at_idx ON public."RevokedTokens" (revoked_at); -- Supports the incremental sync query.
+
+-- Per-client session listing and "logout everywhere".
+-- Access tokens embed the client's session_generation at issue time; bumping it revokes every outstanding token at once.
+ALTER TABLE public."Clients"
+  ADD COLUMN session_generation INTEGER NOT NULL DEFAULT 0, -- Incremented on revoke-all; tokens with a lower "gen" claim are rejected.
+  ADD COLUMN sessions_revoked_at TIMESTAMP WITH TIME ZONE NULL; -- When the generation was last bumped, used by workers to sync it.
+
+ALTER TABLE public."Sessions"
+  ADD COLUMN generation INTEGER NOT NULL DEFAULT 0; -- The client's session_generation when the session was created.
+
+CREATE INDEX Sessions_client_id_created_at_idx ON public."Sessions" (client_id, created_at, session_id); -- Keyset pagination and bulk deletes by client.
+CREATE INDEX Clients_sessions_revoked_at_idx ON public."Clients" (sessions_revoked_at) WHERE sessions_revoked_at IS NOT NULL; -- Generation sync.
+
+-- Revokes all sessions of a client in one transaction and returns the new generation (NULL if the client does not exist).
+CREATE OR REPLACE FUNCTION public.revoke_client_sessions(p_client_id BIGINT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  new_generation INTEGER;
+BEGIN
+  UPDATE public."Clients"
+     SET session_generation = session_generation + 1,
+         sessions_revoked_at = now()
+   WHERE id = p_client_id
+  RETURNING session_generation INTO new_generation;
+
+  IF new_generation IS NOT NULL THEN
+    DELETE FROM public."Sessions" WHERE client_id = p_client_id;
+  END IF;
+
+  RETURN new_generation;
+END;
+$$;
+
+-- Batched last_activity updates. API workers buffer activity in memory and flush it with one call per interval.
+-- GREATEST keeps the newest timestamp when workers flush out of order.
+CREATE OR REPLACE FUNCTION public.touch_sessions(p_session_ids TEXT[], p_activity TIMESTAMP WITH TIME ZONE[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  UPDATE public."Sessions" AS s
+     SET last_activity = GREATEST(COALESCE(s.last_activity, a.activity), a.activity)
+    FROM unnest(p_session_ids, p_activity) AS a(session_id, activity)
+   WHERE s.session_id = a.session_id;
+$$;
+
+-- The ResetTokens table holds outstanding password reset tokens, one per client.
+-- It predates this file's migrations; IF NOT EXISTS lets the schema apply both from scratch and to existing projects.
+CREATE TABLE IF NOT EXISTS public."ResetTokens" (
+  token TEXT NOT NULL, -- The reset token sent to the client by email.
+  client_id BIGINT NULL, -- Foreign key linking to the Clients table, can be null.
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), -- When the token was issued, used for throttling.
+  expires_at TIMESTAMP WITH TIME ZONE NULL, -- When the token stops being accepted.
+  CONSTRAINT ResetTokens_pkey PRIMARY KEY (token), -- Primary key constraint on the "token" column.
+  CONSTRAINT ResetTokens_client_id_fkey FOREIGN KEY (client_id) REFERENCES "Clients" (id) -- Foreign key constraint linking "client_id" to "id" in the Clients table.
+) TABLESPACE pg_default;
+
+-- Expired row sweeping. The API deletes expired rows in small batches so no single statement holds locks for long.
+CREATE INDEX Sessions_expires_at_idx ON public."Sessions" (expires_at);
+CREATE INDEX IF NOT EXISTS ResetTokens_expires_at_idx ON public."ResetTokens" (expires_at);
+CREATE INDEX RevokedTokens_expires_at_idx ON public."RevokedTokens" (expires_at);
+
+-- Deletes up to p_limit expired rows from one of the swept tables and returns how many were deleted.
+-- EmailOutbox rows only get an expires_at once they are sent or failed (the retention period).
+CREATE OR REPLACE FUNCTION public.sweep_expired(p_table TEXT, p_limit INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  deleted INTEGER;
+BEGIN
+  IF p_table NOT IN ('Sessions', 'ResetTokens', 'RevokedTokens', 'EmailOutbox') THEN
+    RAISE EXCEPTION 'Table % is not swept', p_table;
+  END IF;
+
+  EXECUTE format(
+    'DELETE FROM public.%I WHERE ctid IN (SELECT ctid FROM public.%I WHERE expires_at < now() ORDER BY expires_at LIMIT %s)',
+    p_table, p_table, p_limit
+  );
+  GET DIAGNOSTICS deleted = ROW_COUNT;
+  RETURN deleted;
+END;
+$$;
+
+-- Creates a session and evicts the client's oldest sessions beyond p_max_sessions (0 = unlimited).
+-- Locking the client row serializes concurrent logins of the same client, so the cap holds under races.
+-- The session's generation is read from the locked row, so a concurrent revoke-all (or soft delete) either
+-- happens first and is seen, or waits and then revokes this session too. Raises if the client is gone.
+-- Eviction walks Sessions_client_id_created_at_idx. Returns the number of evicted sessions and the generation
+-- the session was stamped with, which the caller embeds in the access token.
+-- Earlier versions returned only the eviction count; the return type cannot be changed in place.
+DROP FUNCTION IF EXISTS public.create_session(JSONB, INTEGER);
+CREATE OR REPLACE FUNCTION public.create_session(p_session JSONB, p_max_sessions INTEGER)
+RETURNS TABLE (evicted INTEGER, generation INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_client_id BIGINT := (p_session->>'client_id')::BIGINT;
+  v_generation INTEGER;
+  v_evicted INTEGER := 0;
+BEGIN
+  SELECT session_generation INTO v_generation
+    FROM public."Clients"
+   WHERE id = v_client_id AND deleted_at IS NULL
+     FOR UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Client % does not exist', v_client_id;
+  END IF;
+
+  INSERT INTO public."Sessions" (session_id, client_id, created_at, expires_at, refresh_token_hash, generation)
+  VALUES (
+    p_session->>'session_id',
+    v_client_id,
+    (p_session->>'created_at')::TIMESTAMP WITH TIME ZONE,
+    (p_session->>'expires_at')::TIMESTAMP WITH TIME ZONE,
+    p_session->>'refresh_token_hash',
+    v_generation
+  );
+
+  IF p_max_sessions > 0 THEN
+    DELETE FROM public."Sessions"
+     WHERE session_id IN (
+       SELECT session_id FROM public."Sessions"
+        WHERE client_id = v_client_id
+        ORDER BY created_at DESC, session_id DESC
+        OFFSET p_max_sessions
+     );
+    GET DIAGNOSTICS v_evicted = ROW_COUNT;
+  END IF;
+
+  RETURN QUERY SELECT v_evicted, v_generation;
+END;
+$$;
+
+-- Stateless password reset. The token carries a fingerprint (first 16 hex digits of SHA-256) of the password hash it was issued against.
+-- The update only applies while the stored hash still matches, and it changes the hash, so each token works once.
+-- Returns TRUE if the password was changed.
+CREATE OR REPLACE FUNCTION public.reset_password_stateless(p_client_id BIGINT, p_fingerprint TEXT, p_password_hash TEXT)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE public."Authentication"
+       SET password_hash = p_password_hash,
+           updated_at = now()
+     WHERE client_id = p_client_id
+       AND left(encode(sha256(convert_to(password_hash, 'UTF8')), 'hex'), 16) = p_fingerprint
+    RETURNING 1
+  )
+  SELECT EXISTS (SELECT 1 FROM updated);
+$$;
+
+-- Consumes a reset token and sets the new password hash atomically.
+-- Deleting the token row first means concurrent calls with the same token cannot both succeed.
+-- Returns the client ID, or NULL if the token is unknown or expired.
+-- Raises if the client has no authentication record; the error rolls back the token deletion, so nothing is changed.
+CREATE OR REPLACE FUNCTION public.consume_reset_token(p_token TEXT, p_password_hash TEXT)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_client_id BIGINT;
+BEGIN
+  DELETE FROM public."ResetTokens"
+   WHERE token = p_token
+     AND expires_at > now()
+  RETURNING client_id INTO v_client_id;
+
+  IF v_client_id IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  UPDATE public."Authentication"
+     SET password_hash = p_password_hash,
+         updated_at = now()
+   WHERE client_id = v_client_id;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Authentication record not found for client %', v_client_id;
+  END IF;
+
+  RETURN v_client_id;
+END;
+$$;
+
+-- Each client has at most one outstanding reset token; issuing a new one replaces it.
+CREATE UNIQUE INDEX IF NOT EXISTS ResetTokens_client_id_key ON public."ResetTokens" (client_id);
+
+-- Issues a reset token for the client with the given email as one conditional upsert.
+-- Returns the client ID, or NULL if no client has that email or a token was issued less than p_min_interval_seconds ago.
+CREATE OR REPLACE FUNCTION public.issue_reset_token(p_email TEXT, p_token TEXT, p_ttl_seconds INTEGER, p_min_interval_seconds INTEGER)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+  INSERT INTO public."ResetTokens" AS r (token, client_id, created_at, expires_at)
+  SELECT p_token, c.id, now(), now() + make_interval(secs => p_ttl_seconds)
+    FROM public."Clients" AS c
+   WHERE c.email = p_email
+   LIMIT 1
+  ON CONFLICT (client_id) DO UPDATE
+     SET token = EXCLUDED.token,
+         created_at = EXCLUDED.created_at,
+         expires_at = EXCLUDED.expires_at
+   WHERE r.created_at < now() - make_interval(secs => p_min_interval_seconds)
+  RETURNING r.client_id;
+$$;
+
+-- The EmailOutbox table is a durable queue of outgoing emails.
+-- Requests only insert rows; API workers claim due rows in batches, send them and record the outcome.
+CREATE TABLE public."EmailOutbox" (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY NOT NULL, -- Primary key, also the delivery order.
+  recipient TEXT NOT NULL, -- Destination email address.
+  subject TEXT NOT NULL, -- Email subject line.
+  body_text TEXT NOT NULL, -- Plain text body.
+  body_html TEXT NULL, -- Optional HTML alternative body.
+  status TEXT NOT NULL DEFAULT 'pending', -- 'pending', 'sent' or 'failed'.
+  attempts INTEGER NOT NULL DEFAULT 0, -- Number of failed delivery attempts so far.
+  next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), -- Earliest time of the next attempt (backoff).
+  locked_until TIMESTAMP WITH TIME ZONE NULL, -- Lease held by the worker currently sending the message.
+  last_error TEXT NULL, -- Error from the most recent failed attempt.
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), -- When the email was queued.
+  sent_at TIMESTAMP WITH TIME ZONE NULL, -- When the email was delivered to the SMTP server.
+  expires_at TIMESTAMP WITH TIME ZONE NULL, -- When a sent or failed email is deleted; NULL while pending.
+  CONSTRAINT EmailOutbox_pkey PRIMARY KEY (id) -- Primary key constraint on the "id" column.
+) TABLESPACE pg_default;
+
+CREATE INDEX EmailOutbox_pending_idx ON public."EmailOutbox" (next_attempt_at, id) WHERE status = 'pending'; -- Due message lookup.
+CREATE INDEX EmailOutbox_expires_at_idx ON public."EmailOutbox" (expires_at) WHERE expires_at IS NOT NULL; -- Retention sweep; bodies hold reset links.
+
+-- Leases up to p_limit due messages to the caller for p_lease_seconds.
+-- SKIP LOCKED lets several workers drain the outbox without sending anything twice.
+CREATE OR REPLACE FUNCTION public.claim_email_batch(p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF public."EmailOutbox"
+LANGUAGE sql
+AS $$
+  UPDATE public."EmailOutbox"
+     SET locked_until = now() + make_interval(secs => p_lease_seconds)
+   WHERE id IN (
+     SELECT id FROM public."EmailOutbox"
+      WHERE status = 'pending'
+        AND next_attempt_at <= now()
+        AND (locked_until IS NULL OR locked_until < now())
+      ORDER BY next_attempt_at, id
+      LIMIT p_limit
+      FOR UPDATE SKIP LOCKED
+   )
+  RETURNING *;
+$$;
+
+-- Batch client endpoints. Each runs as one set-based statement or transaction regardless of the number of items.
+
+-- Applies partial updates given as a JSON array of {"id", "client_name"?, "email"?}; keys that are absent keep their value.
+-- Returns the updated rows; ids that do not exist are simply missing from the result.
+CREATE OR REPLACE FUNCTION public.batch_update_clients(p_updates JSONB)
+RETURNS SETOF public."Clients"
+LANGUAGE sql
+AS $$
+  UPDATE public."Clients" AS c
+     SET client_name = CASE WHEN u ? 'client_name' THEN u->>'client_name' ELSE c.client_name END,
+         email = CASE WHEN u ? 'email' THEN u->>'email' ELSE c.email END,
+         update_at = now()
+    FROM jsonb_array_elements(p_updates) AS u
+   WHERE c.id = (u->>'id')::BIGINT
+  RETURNING c.*;
+$$;
+
+-- Deletes clients with their sessions, credentials and reset tokens. Returns the ids that existed and were deleted.
+CREATE OR REPLACE FUNCTION public.batch_delete_clients(p_ids BIGINT[])
+RETURNS BIGINT[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  deleted BIGINT[];
+BEGIN
+  DELETE FROM public."Sessions" WHERE client_id = ANY (p_ids);
+  DELETE FROM public."ResetTokens" WHERE client_id = ANY (p_ids);
+  DELETE FROM public."Authentication" WHERE client_id = ANY (p_ids);
+  WITH removed AS (
+    DELETE FROM public."Clients" WHERE id = ANY (p_ids) RETURNING id
+  )
+  SELECT COALESCE(array_agg(id), '{}') INTO deleted FROM removed;
+  RETURN deleted;
+END;
+$$;
+
+-- Clients_created_at_key made every insert in the same microsecond collide, and nothing relies on created_at being unique:
+-- ordering and pagination use id. Bulk imports insert a whole chunk with one now().
+ALTER TABLE public."Clients" DROP CONSTRAINT IF EXISTS Clients_created_at_key;
+
+-- Bulk client import. Inserts one chunk of {"client_name", "email", "password_hash"} rows as two multi-row statements in one transaction.
+-- Emails that are already registered are skipped.
+-- Returns the emails that were created.
+CREATE OR REPLACE FUNCTION public.import_clients(p_rows JSONB)
+RETURNS TEXT[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  created TEXT[];
+BEGIN
+  CREATE TEMP TABLE import_rows ON COMMIT DROP AS
+  SELECT r.client_name, r.email, r.password_hash, r.ordinality
+    FROM ROWS FROM (jsonb_to_recordset(p_rows) AS (client_name TEXT, email TEXT, password_hash TEXT))
+         WITH ORDINALITY AS r(client_name, email, password_hash, ordinality)
+   WHERE NOT EXISTS (SELECT 1 FROM public."Clients" AS c WHERE c.email = r.email);
+
+  WITH new_clients AS (
+    INSERT INTO public."Clients" (client_name, email, created_at)
+    SELECT client_name, email, now()
+      FROM import_rows
+     ORDER BY ordinality
+    RETURNING id, email
+  ), new_auth AS (
+    INSERT INTO public."Authentication" (password_hash, created_at, client_id)
+    SELECT i.password_hash, now(), n.id
+      FROM new_clients AS n
+      JOIN import_rows AS i ON i.email = n.email
+    RETURNING client_id
+  )
+  SELECT COALESCE(array_agg(n.email), '{}') INTO created
+    FROM new_clients AS n
+   WHERE n.id IN (SELECT client_id FROM new_auth);
+
+  RETURN created;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS Clients_email_idx ON public."Clients" (email); -- Email lookups at login, reset and import.
+
+-- Incremental change feed (GET /clients/changes).
+-- update_at is maintained by trigger on every insert and update so it can act as the feed's ordering key,
+-- and deletions leave a row in ClientTombstones.
+UPDATE public."Clients" SET update_at = created_at WHERE update_at IS NULL; -- Backfill so existing rows appear in the feed.
+
+CREATE OR REPLACE FUNCTION public.set_clients_update_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.update_at := now();
+  RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER Clients_set_update_at
+BEFORE INSERT OR UPDATE ON public."Clients"
+FOR EACH ROW EXECUTE FUNCTION public.set_clients_update_at();
+
+CREATE INDEX Clients_update_at_id_idx ON public."Clients" (update_at, id); -- Keyset scans of the change feed.
+
+-- The ClientTombstones table records deleted clients so mirrors can remove them.
+CREATE TABLE public."ClientTombstones" (
+  client_id BIGINT NOT NULL, -- ID of the deleted client (no foreign key, the client is gone).
+  deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), -- When the client was deleted, the feed's ordering key.
+  CONSTRAINT ClientTombstones_pkey PRIMARY KEY (client_id, deleted_at) -- One row per deletion; leads with client_id, so the feed uses ClientTombstones_deleted_at_idx.
+) TABLESPACE pg_default;
+
+CREATE INDEX ClientTombstones_deleted_at_idx ON public."ClientTombstones" (deleted_at, client_id); -- Keyset scans of the change feed.
+
+CREATE OR REPLACE FUNCTION public.record_client_tombstone()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public."ClientTombstones" (client_id) VALUES (OLD.id);
+  RETURN OLD;
+END;
+$$;
+
+CREATE TRIGGER Clients_record_tombstone
+AFTER DELETE ON public."Clients"
+FOR EACH ROW EXECUTE FUNCTION public.record_client_tombstone();
+
+-- Soft delete. DELETE /clients/{id} sets deleted_at, bumps the session generation (revoking all access tokens) and
+-- deletes the client's sessions and reset tokens (so nothing can be refreshed or reset) in one transaction;
+-- a background purger hard-deletes the rows later.
+ALTER TABLE public."Clients"
+  ADD COLUMN deleted_at TIMESTAMP WITH TIME ZONE NULL; -- When the client was soft deleted; NULL for live clients.
+
+-- Lookups only ever want live clients, so the hot indexes skip deleted rows.
+DROP INDEX IF EXISTS Clients_email_idx;
+CREATE INDEX Clients_email_live_idx ON public."Clients" (email) WHERE deleted_at IS NULL;
+CREATE INDEX Clients_deleted_at_idx ON public."Clients" (deleted_at) WHERE deleted_at IS NOT NULL; -- Purge queue.
+
+-- Soft deletes live clients, drops their sessions and reset tokens, and returns their id and new session_generation.
+CREATE OR REPLACE FUNCTION public.soft_delete_clients(p_ids BIGINT[])
+RETURNS TABLE (id BIGINT, session_generation INTEGER)
+LANGUAGE sql
+AS $$
+  WITH deleted AS (
+    UPDATE public."Clients" AS c
+       SET deleted_at = now(),
+           session_generation = c.session_generation + 1,
+           sessions_revoked_at = now()
+     WHERE c.id = ANY (p_ids)
+       AND c.deleted_at IS NULL
+    RETURNING c.id, c.session_generation
+  ), sessions AS (
+    DELETE FROM public."Sessions" AS s USING deleted AS d WHERE s.client_id = d.id
+  ), reset_tokens AS (
+    DELETE FROM public."ResetTokens" AS r USING deleted AS d WHERE r.client_id = d.id
+  )
+  SELECT d.id, d.session_generation FROM deleted AS d;
+$$;
+
+-- Hard-deletes up to p_limit soft-deleted clients and their dependent rows; returns how many clients were purged.
+CREATE OR REPLACE FUNCTION public.purge_deleted_clients(p_limit INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  batch BIGINT[];
+BEGIN
+  SELECT array_agg(id) INTO batch
+    FROM (
+      SELECT id FROM public."Clients"
+       WHERE deleted_at IS NOT NULL
+       ORDER BY deleted_at
+       LIMIT p_limit
+       FOR UPDATE SKIP LOCKED
+    ) AS due;
+
+  IF batch IS NULL THEN
+    RETURN 0;
+  END IF;
+
+  RETURN cardinality(public.batch_delete_clients(batch));
+END;
+$$;
+
+-- Reset tokens must not be issued to soft-deleted clients.
+CREATE OR REPLACE FUNCTION public.issue_reset_token(p_email TEXT, p_token TEXT, p_ttl_seconds INTEGER, p_min_interval_seconds INTEGER)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+  INSERT INTO public."ResetTokens" AS r (token, client_id, created_at, expires_at)
+  SELECT p_token, c.id, now(), now() + make_interval(secs => p_ttl_seconds)
+    FROM public."Clients" AS c
+   WHERE c.email = p_email
+     AND c.deleted_at IS NULL
+   LIMIT 1
+  ON CONFLICT (client_id) DO UPDATE
+     SET token = EXCLUDED.token,
+         created_at = EXCLUDED.created_at,
+         expires_at = EXCLUDED.expires_at
+   WHERE r.created_at < now() - make_interval(secs => p_min_interval_seconds)
+  RETURNING r.client_id;
+$$;
+
+-- Neither reset path may change the password of a soft-deleted client; same contracts as above otherwise.
+CREATE OR REPLACE FUNCTION public.consume_reset_token(p_token TEXT, p_password_hash TEXT)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_client_id BIGINT;
+BEGIN
+  DELETE FROM public."ResetTokens" AS r
+   WHERE r.token = p_token
+     AND r.expires_at > now()
+     AND EXISTS (SELECT 1 FROM public."Clients" AS c WHERE c.id = r.client_id AND c.deleted_at IS NULL)
+  RETURNING r.client_id INTO v_client_id;
+
+  IF v_client_id IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  UPDATE public."Authentication"
+     SET password_hash = p_password_hash,
+         updated_at = now()
+   WHERE client_id = v_client_id;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Authentication record not found for client %', v_client_id;
+  END IF;
+
+  RETURN v_client_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.reset_password_stateless(p_client_id BIGINT, p_fingerprint TEXT, p_password_hash TEXT)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE public."Authentication"
+       SET password_hash = p_password_hash,
+           updated_at = now()
+     WHERE client_id = p_client_id
+       AND left(encode(sha256(convert_to(password_hash, 'UTF8')), 'hex'), 16) = p_fingerprint
+       AND EXISTS (SELECT 1 FROM public."Clients" WHERE id = p_client_id AND deleted_at IS NULL)
+    RETURNING 1
+  )
+  SELECT EXISTS (SELECT 1 FROM updated);
+$$;
+
+-- Batch updates skip soft-deleted clients.
+CREATE OR REPLACE FUNCTION public.batch_update_clients(p_updates JSONB)
+RETURNS SETOF public."Clients"
+LANGUAGE sql
+AS $$
+  UPDATE public."Clients" AS c
+     SET client_name = CASE WHEN u ? 'client_name' THEN u->>'client_name' ELSE c.client_name END,
+         email = CASE WHEN u ? 'email' THEN u->>'email' ELSE c.email END,
+         update_at = now()
+    FROM jsonb_array_elements(p_updates) AS u
+   WHERE c.id = (u->>'id')::BIGINT
+     AND c.deleted_at IS NULL
+  RETURNING c.*;
+$$;
+
+-- Client search: trigram indexes for fuzzy matches and pattern indexes for
+-- prefix matches, both over live clients only.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS Clients_name_trgm_idx ON public."Clients" USING gin (lower(client_name) gin_trgm_ops) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS Clients_email_trgm_idx ON public."Clients" USING gin (lower(email) gin_trgm_ops) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS Clients_name_prefix_idx ON public."Clients" (lower(client_name) text_pattern_ops) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS Clients_email_prefix_idx ON public."Clients" (lower(email) text_pattern_ops) WHERE deleted_at IS NULL;
+
+-- Prefix matches on name or email rank first, ordered by the matching field
+-- (code point order) and id; then fuzzy matches by trigram similarity and id.
+-- app/utils/search_index.py ranks the same way. The LIKE and % predicates are
+-- what let the planner use the indexes above; similarity() alone would scan
+-- the table. A blank query matches nothing (its pattern would match every
+-- client).
+CREATE OR REPLACE FUNCTION public.search_clients(p_query TEXT, p_limit INTEGER, p_offset INTEGER, p_min_similarity REAL DEFAULT 0.3)
+RETURNS SETOF public."Clients"
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  q TEXT := lower(p_query);
+  pattern TEXT := replace(replace(replace(lower(p_query), '\', '\\'), '%', '\%'), '_', '\_') || '%';
+BEGIN
+  IF btrim(coalesce(p_query, '')) = '' THEN
+    RETURN;
+  END IF;
+
+  PERFORM set_config('pg_trgm.similarity_threshold', p_min_similarity::TEXT, true);
+
+  RETURN QUERY
+  SELECT c.*
+    FROM public."Clients" AS c
+   CROSS JOIN LATERAL (
+     -- COALESCE: a NULL name or email must not sort as a match (NULLs come first in DESC order)
+     SELECT COALESCE(lower(c.client_name) LIKE pattern, FALSE) AS name_prefix,
+            COALESCE(lower(c.email) LIKE pattern, FALSE) AS email_prefix
+   ) AS m
+   WHERE c.deleted_at IS NULL
+     AND (lower(c.client_name) LIKE pattern
+          OR lower(c.email) LIKE pattern
+          OR lower(c.client_name) % q
+          OR lower(c.email) % q)
+   ORDER BY (m.name_prefix OR m.email_prefix) DESC,
+            CASE WHEN m.name_prefix AND m.email_prefix THEN least(lower(c.client_name) COLLATE "C", lower(c.email) COLLATE "C")
+                 WHEN m.name_prefix THEN lower(c.client_name) COLLATE "C"
+                 WHEN m.email_prefix THEN lower(c.email) COLLATE "C"
+            END,
+            CASE WHEN m.name_prefix OR m.email_prefix THEN c.id END,
+            greatest(similarity(lower(c.client_name), q), similarity(lower(c.email), q)) DESC,
+            c.id
+   LIMIT p_limit
+  OFFSET p_offset;
+END;
+$$;
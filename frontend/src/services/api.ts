@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { authService } from './auth';
 
 const API_BASE_URL = 'http://127.0.0.1:8000';
 
@@ -16,6 +17,9 @@ api.interceptors.request.use(request => {
   return request;
 });
 
+// Send the access token and refresh it transparently when it expires
+authService.installTokenRefresh(api);
+
 // Add response interceptor for debugging
 api.interceptors.response.use(
   response => {
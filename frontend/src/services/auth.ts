@@ -17,7 +17,8 @@
  * - For integration with existing auth systems, consider these modifications:
  *   1. Replace localStorage with your preferred state management (Redux, Context API, etc.)
  *   2. Update the token format and authentication headers to match your backend requirements
- *   3. Add support for refresh tokens and token expiration
+ *   3. Access tokens are short-lived; instances passed through installTokenRefresh() rotate them
+ *      on the first 401 and replay the request, so callers never see the expiry
  *   4. Extend user information to include roles, permissions, or other profile data
  *   5. Add methods for additional auth flows (social login, multi-factor authentication)
  * - Example custom environment configuration:
@@ -26,16 +27,27 @@
  *   const TOKEN_KEY = process.env.REACT_APP_TOKEN_KEY || 'auth_token';
  *   ```
  */
-import axios from 'axios';
+import axios, { AxiosError, AxiosInstance, InternalAxiosRequestConfig } from 'axios';
 
 // Constants
 const TOKEN_KEY = 'auth_token';
+const REFRESH_TOKEN_KEY = 'refresh_token';
 const API_URL = 'http://127.0.0.1:8000';
 
+// Endpoints whose 401 means bad credentials, not an expired access token
+const NO_REFRESH_PATHS = ['/auth/login', '/auth/refresh', '/auth/signup'];
+
+// The refresh currently in progress, shared by every request that needs it
+let refreshInFlight: Promise<string> | null = null;
+
+type RetryableRequestConfig = InternalAxiosRequestConfig & { _retried?: boolean };
+
 // Response type definitions
 export interface LoginResponse {
   access_token: string;
   token_type: string;
+  expires_in?: number;
+  refresh_token?: string;
 }
 
 export interface AuthError {
@@ -66,9 +78,7 @@ export const authService = {
         }
       );
       
-      if (response.data && response.data.access_token) {
-        localStorage.setItem(TOKEN_KEY, response.data.access_token);
-      }
+      this.storeTokens(response.data);
       
       return response.data;
     } catch (error) {
@@ -77,6 +87,123 @@ export const authService = {
     }
   },
   
+  /**
+   * Exchanges the stored refresh token for a new access token
+   * 
+   * Refresh tokens are single use, so the rotated refresh token
+   * returned by the server replaces the stored one.
+   * 
+   * @returns Promise with the new tokens
+   * @throws Error if there is no refresh token or the server rejects it
+   */
+  async refresh(): Promise<LoginResponse> {
+    const refreshToken = localStorage.getItem(REFRESH_TOKEN_KEY);
+    if (!refreshToken) {
+      throw new Error('No refresh token available');
+    }
+    
+    try {
+      const response = await axios.post<LoginResponse>(`${API_URL}/auth/refresh`, {
+        refresh_token: refreshToken
+      });
+      this.storeTokens(response.data);
+      return response.data;
+    } catch (error) {
+      console.error('Refresh error:', error);
+      this.clearTokens();
+      window.dispatchEvent(new Event('storage'));
+      throw error;
+    }
+  },
+  
+  /**
+   * Refreshes the access token once for all concurrent callers
+   * 
+   * Refresh tokens are single use, so two parallel refreshes would make the
+   * server treat the second as a replayed token and revoke the session.
+   * 
+   * @returns Promise with the new access token
+   */
+  refreshAccessToken(): Promise<string> {
+    if (!refreshInFlight) {
+      refreshInFlight = authService.refresh()
+        .then(data => data.access_token)
+        .finally(() => {
+          refreshInFlight = null;
+        });
+    }
+    return refreshInFlight;
+  },
+  
+  /**
+   * Adds the bearer token to an axios instance's requests and refreshes it on 401
+   * 
+   * Requests made while a refresh is in flight wait for it instead of going out
+   * with the expired token. A request rejected with 401 triggers one refresh and
+   * is retried once with the new token; if the refresh fails the user is logged out.
+   * 
+   * @param instance The axios instance to wire up
+   * @returns The same instance
+   */
+  installTokenRefresh(instance: AxiosInstance): AxiosInstance {
+    instance.interceptors.request.use(async config => {
+      if (refreshInFlight) {
+        await refreshInFlight.catch(() => undefined);
+      }
+      const token = authService.getToken();
+      if (token) {
+        config.headers.Authorization = `Bearer ${token}`;
+      }
+      return config;
+    });
+    
+    instance.interceptors.response.use(undefined, async (error: AxiosError) => {
+      const config = error.config as RetryableRequestConfig | undefined;
+      if (
+        error.response?.status !== 401
+        || !config
+        || config._retried
+        || NO_REFRESH_PATHS.some(path => config.url?.includes(path))
+        || !localStorage.getItem(REFRESH_TOKEN_KEY)
+      ) {
+        return Promise.reject(error);
+      }
+      
+      config._retried = true;
+      try {
+        await authService.refreshAccessToken();
+      } catch {
+        return Promise.reject(error);
+      }
+      // The request interceptor attaches the new token
+      return instance(config);
+    });
+    
+    return instance;
+  },
+  
+  /**
+   * Stores the tokens from a login or refresh response
+   * 
+   * @param data The token response from the server
+   */
+  storeTokens(data: LoginResponse): void {
+    if (data && data.access_token) {
+      localStorage.setItem(TOKEN_KEY, data.access_token);
+    }
+    if (data && data.refresh_token) {
+      localStorage.setItem(REFRESH_TOKEN_KEY, data.refresh_token);
+    }
+  },
+  
+  /**
+   * Removes all stored tokens
+   */
+  clearTokens(): void {
+    localStorage.removeItem(TOKEN_KEY);
+    localStorage.removeItem(REFRESH_TOKEN_KEY);
+  },
+  
   /**
    * Registers a new user
    * 
@@ -124,7 +251,7 @@ export const authService = {
       );
       
       // Remove token regardless of API response
-      localStorage.removeItem(TOKEN_KEY);
+      this.clearTokens();
       console.log('Token removed from localStorage');
       
       // Dispatch a storage event to notify other components
@@ -132,7 +259,7 @@ export const authService = {
     } catch (error) {
       console.error('Logout error:', error);
       // Still remove the token even if API call fails
-      localStorage.removeItem(TOKEN_KEY);
+      this.clearTokens();
       console.log('Token removed from localStorage (after error)');
       
       // Dispatch a storage event to notify other components
@@ -160,18 +287,11 @@ export const authService = {
   },
   
   /**
-   * Creates an authenticated axios instance with the token in headers
+   * Creates an authenticated axios instance
    * 
-   * @returns Axios instance with Authorization header set
+   * @returns Axios instance that sends the current token and refreshes it when it expires
    */
   getAuthenticatedAxios() {
-    const token = this.getToken();
-    
-    return axios.create({
-      baseURL: API_URL,
-      headers: {
-        Authorization: token ? `Bearer ${token}` : '',
-      },
-    });
+    return this.installTokenRefresh(axios.create({ baseURL: API_URL }));
   }
 }; 
\ No newline at end of file